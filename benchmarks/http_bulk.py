@@ -0,0 +1,120 @@
+"""
+Throughput of many small GETs to one host: one request at a time, a thread pool, and
+``GreatValueRequests.bulk_get`` with and without pipelining.
+
+The server is a ``ThreadingHTTPServer`` (one thread per connection) standing in for an index
+such as PyPI's, ``--latency`` adds a per-request server delay to emulate a remote host. It runs
+in its own process so that its threads do not compete with the client for the GIL.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+from dev_toolbox.http import ConnectionPool
+from dev_toolbox.http import RequestTemplate
+from dev_toolbox.http.great_value import GreatValueRequests
+from dev_toolbox.table import markdown
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Sequence
+
+
+def _handler(latency: float) -> type[BaseHTTPRequestHandler]:
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+            pass
+
+        def do_GET(self) -> None:
+            if latency:
+                time.sleep(latency)
+            body = f'{{"proyecto": "{self.path}", "archivos": []}}'.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.pypi.simple.v1+json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return _Handler
+
+
+class _Server(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections opened in a burst, stalling them ~1s.
+    request_queue_size = 128
+
+
+def _serve(latency: float, ports: multiprocessing.Queue[int]) -> None:
+    httpd = _Server(("127.0.0.1", 0), _handler(latency))
+    ports.put(httpd.server_address[1])
+    httpd.serve_forever()
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.0, help="server delay, seconds")
+    args = parser.parse_args(argv)
+
+    ports: multiprocessing.Queue[int] = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(args.latency, ports), daemon=True)
+    server.start()
+    client = GreatValueRequests(base_url=f"http://127.0.0.1:{ports.get()}/", pool=ConnectionPool())
+    urls = [f"simple/proyecto-{i}/" for i in range(args.requests)]
+
+    def sequential() -> int:
+        return sum(len(client.request(method="GET", url=url).read()) for url in urls)
+
+    def threads(workers: int) -> Callable[[], int]:
+        def run() -> int:
+            templates = (RequestTemplate(method="GET", url=url) for url in urls)
+            results = RequestTemplate.map(client, templates, max_workers=workers)
+            return sum(len(r.response.read()) for r in results if r.response is not None)
+
+        return run
+
+    def bulk(connections: int, pipeline: int) -> Callable[[], int]:
+        def run() -> int:
+            responses = client.bulk_get(urls, connections=connections, pipeline=pipeline)
+            return sum(len(r.response.content) for r in responses if r.response is not None)
+
+        return run
+
+    cases: list[tuple[str, Callable[[], int]]] = [
+        ("sequential, 1 connection", sequential),
+        ("map, 8 threads", threads(8)),
+        ("bulk_get, 8 connections", bulk(8, 1)),
+        ("bulk_get, 4 connections x 16 pipelined", bulk(4, 16)),
+        ("bulk_get, 8 connections x 16 pipelined", bulk(8, 16)),
+    ]
+    rows = []
+    try:
+        for name, run in cases:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            rows.append(
+                {
+                    "mode": name,
+                    "requests": args.requests,
+                    "seconds": f"{elapsed:.3f}",
+                    "requests/s": f"{args.requests / elapsed:.0f}",
+                }
+            )
+    finally:
+        server.terminate()
+    print(markdown(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,122 @@
+"""
+Bytes on the wire and download time of a JSON document with and without Content-Encoding.
+
+The local server writes the body in blocks paced to ``--mbps`` to stand in for a real link,
+pass ``--mbps 0`` to measure decompression overhead alone.
+"""
+
+from __future__ import annotations
+
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+from dev_toolbox.http import ConnectionPool
+from dev_toolbox.http._encoding import accept_encoding
+from dev_toolbox.http.great_value import GreatValueRequests
+from dev_toolbox.json_backend import dump_bytes
+from dev_toolbox.table import markdown
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+_BLOCK = 1 << 14
+
+
+def _document(releases: int) -> bytes:
+    return dump_bytes(
+        {
+            "info": {"name": "paquete", "summary": "示例 पैकेज"},
+            "releases": {
+                f"{i // 100}.{i % 100}.0": [
+                    {
+                        "filename": f"paquete-{i // 100}.{i % 100}.0-py3-none-any.whl",
+                        "digests": {"sha256": f"{i:064x}"},
+                        "requires_python": ">=3.9",
+                        "size": 10_000 + i,
+                        "yanked": False,
+                    }
+                ]
+                for i in range(releases)
+            },
+        }
+    )
+
+
+def _handler(bodies: dict[str, bytes], mbps: float) -> type[BaseHTTPRequestHandler]:
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+            pass
+
+        def do_GET(self) -> None:
+            accepted = self.headers.get("Accept-Encoding", "")
+            encoding = next((e for e in ("br", "gzip") if e in accepted), "identity")
+            body = bodies[encoding]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if encoding != "identity":
+                self.send_header("Content-Encoding", encoding)
+            self.end_headers()
+            for i in range(0, len(body), _BLOCK):
+                self.wfile.write(body[i : i + _BLOCK])
+                if mbps:
+                    time.sleep(_BLOCK * 8 / (mbps * 1e6))
+
+    return _Handler
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--releases", type=int, default=5000)
+    parser.add_argument("--mbps", type=float, default=100.0, help="emulated link bandwidth")
+    parser.add_argument("--requests", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    document = _document(args.releases)
+    bodies = {"identity": document, "gzip": gzip.compress(document, compresslevel=6)}
+    encodings = ["identity", "gzip"]
+    if "br" in accept_encoding():
+        import brotli  # type: ignore[import-not-found,unused-ignore]
+
+        bodies["br"] = brotli.compress(document, quality=5)
+        encodings.append("br")
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler(bodies, args.mbps))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    client = GreatValueRequests(
+        base_url=f"http://127.0.0.1:{httpd.server_address[1]}/", pool=ConnectionPool()
+    )
+    rows = []
+    try:
+        for encoding in encodings:
+            headers = {"Accept-Encoding": encoding}
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                assert client.request(method="GET", url="pypi", headers=headers).read() == document  # noqa: S101
+            elapsed = (time.perf_counter() - start) / args.requests
+            rows.append(
+                {
+                    "encoding": encoding,
+                    "wire bytes": len(bodies[encoding]),
+                    "ratio": f"{len(document) / len(bodies[encoding]):.1f}x",
+                    "ms/request": f"{elapsed * 1e3:.1f}",
+                }
+            )
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    print(markdown(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+"""Latency of repeated requests to one host: ``urlopen`` vs ``GreatValueRequests`` with a pool."""
+
+from __future__ import annotations
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+from dev_toolbox.http import ConnectionPool
+from dev_toolbox.http.great_value import GreatValueRequests
+from dev_toolbox.table import markdown
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+_BODY = b'{"nombre": "paquete", "versiones": ["1.0", "2.0"], "resumen": "\xe7\xa4\xba\xe4\xbe\x8b"}'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_BODY)))
+        self.end_headers()
+        self.wfile.write(_BODY)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{httpd.server_address[1]}/"
+    clients = {
+        "urlopen": GreatValueRequests(base_url=base_url),
+        "pooled": GreatValueRequests(base_url=base_url, pool=ConnectionPool()),
+    }
+    rows = []
+    try:
+        for name, client in clients.items():
+            start = time.perf_counter()
+            for i in range(args.requests):
+                client.request(method="GET", url=f"proyecto/{i}").json()
+            elapsed = time.perf_counter() - start
+            rows.append(
+                {
+                    "client": name,
+                    "requests": args.requests,
+                    "seconds": f"{elapsed:.3f}",
+                    "us/request": f"{elapsed / args.requests * 1e6:.0f}",
+                }
+            )
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    print(markdown(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
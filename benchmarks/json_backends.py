@@ -0,0 +1,78 @@
+"""Micro-benchmark of every installed ``dev_toolbox.json_backend`` backend on typical payloads."""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+
+from dev_toolbox import json_backend
+from dev_toolbox.table import markdown
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+def _payloads() -> dict[str, Any]:
+    metadata = {
+        "name": "paquete-de-ejemplo",
+        "version": "1.2.3",
+        "summary": "Una biblioteca de ejemplo 示例库 उदाहरण",
+        "classifiers": [f"Programming Language :: Python :: 3.{i}" for i in range(8, 15)],
+        "requires_dist": [f"dependencia-{i}>=1.{i}" for i in range(30)],
+        "project_urls": {"Homepage": "https://example.org", "Issues": "https://example.org/i"},
+    }
+    record = {"id": 1, "usuario": "李雷", "tags": ["a", "b"], "score": 0.5, "ok": True}
+    simple_index = {
+        "meta": {"api-version": "1.1"},
+        "projects": [{"name": f"proyecto-{i}", "_last-serial": i} for i in range(20_000)],
+    }
+    return {
+        "pypi metadata": metadata,
+        "log record": record,
+        "simple index (20k)": simple_index,
+    }
+
+
+def _per_op_us(func: Callable[[], object], budget: float = 0.2) -> float:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return elapsed / number * 1e6
+        number *= 2
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.parse_args(argv)
+
+    rows = []
+    for payload_name, payload in _payloads().items():
+        baseline: dict[str, float] = {}
+        for name in json_backend.available_backends()[::-1]:  # stdlib first
+            backend = json_backend.get_backend(name)
+            data = backend.dump_bytes(payload)
+            loads_us = _per_op_us(lambda backend=backend, data=data: backend.loads(data))  # type: ignore[misc]
+            dumps_us = _per_op_us(lambda backend=backend, obj=payload: backend.dump_bytes(obj))  # type: ignore[misc]
+            baseline = baseline or {"loads": loads_us, "dumps": dumps_us}
+            rows.append(
+                {
+                    "payload": payload_name,
+                    "backend": name,
+                    "loads us": f"{loads_us:.2f} ({baseline['loads'] / loads_us:.1f}x)",
+                    "dump_bytes us": f"{dumps_us:.2f} ({baseline['dumps'] / dumps_us:.1f}x)",
+                }
+            )
+    print(markdown(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
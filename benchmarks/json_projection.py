@@ -0,0 +1,73 @@
+"""``JsonProjector`` vs a full ``json.loads`` followed by picking the same fields."""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import TYPE_CHECKING
+from typing import Any
+
+from dev_toolbox.file_utils import JsonProjector
+from dev_toolbox.table import markdown
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+def _record(size: int) -> bytes:
+    """A wide record of about ``size`` bytes: small fields first, a big nested payload, a tail."""
+    ret: dict[str, Any] = {"id": 7, "user": {"name": "Zoë Ramírez", "lang": "es"}}
+    i = 0
+    while len(json.dumps(ret, ensure_ascii=False).encode()) < size:
+        ret[f"campo_{i}"] = {"标签": ["नमस्ते", i, 1.5], "nested": {"ok": True, "txt": "x" * 20}}
+        i += 1
+    ret["status"] = "activo"
+    return json.dumps(ret, ensure_ascii=False).encode()
+
+
+def _bench(func: Any, data: bytes, number: int) -> float:  # noqa: ANN401
+    start = time.perf_counter()
+    for _ in range(number):
+        func(data)
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    cases = {
+        "head (id, user.name)": ["id", "user.name"],
+        "head + tail (id, status)": ["id", "status"],
+    }
+    rows = []
+    for size in (1_000, 10_000, 100_000):
+        data = _record(size)
+        number = max(args.number * 1_000 // size, 20)
+        for name, fields in cases.items():
+            projector = JsonProjector(fields)
+
+            def full(data: bytes, projector: JsonProjector = projector) -> tuple[Any, ...]:
+                return projector._pick(json.loads(data))  # noqa: SLF001
+
+            assert full(data) == projector(data)  # noqa: S101
+            loads_us = _bench(full, data, number)
+            projector_us = _bench(projector, data, number)
+            rows.append(
+                {
+                    "record": f"{len(data) / 1000:.0f} KB",
+                    "fields": name,
+                    "json.loads us": f"{loads_us:.1f}",
+                    "JsonProjector us": f"{projector_us:.1f}",
+                    "speedup": f"{loads_us / projector_us:.2f}x",
+                }
+            )
+    print(markdown(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+"""
+Cost of a project lookup against a ``/simple/`` page of ``--projects`` names: parsing the page
+for every lookup, as ``PypiIndexApi.get_all_projects`` does, against a ``PypiMirror``.
+
+The index is an in-memory stand-in, so the page download itself is not counted.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import tempfile
+import time
+from typing import TYPE_CHECKING
+from typing import Any
+
+from dev_toolbox.json_backend import dump_bytes
+from dev_toolbox.pypi_api import PypiIndexApi
+from dev_toolbox.pypi_api import PypiMirror
+from dev_toolbox.table import markdown
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Sequence
+
+
+class _Response:
+    def __init__(self, status_code: int, text: str, etag: str) -> None:
+        self.status_code = status_code
+        self.text = text
+        self.headers = {"ETag": etag}
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class _Client:
+    def __init__(self, projects: int) -> None:
+        self.serials = list(range(projects))
+        self.touch()
+
+    def touch(self) -> None:
+        """Publish a new release of a random project."""
+        self.serials[random.randrange(len(self.serials))] = max(self.serials) + 1  # noqa: S311
+        page = {
+            "meta": {"api-version": "1.1", "_last-serial": max(self.serials)},
+            "projects": [
+                {"name": f"paquete-{i}", "_last-serial": s} for i, s in enumerate(self.serials)
+            ],
+        }
+        self.page = dump_bytes(page).decode()
+        self.etag = f'"{max(self.serials)}"'
+
+    def get(self, url: str, headers: dict[str, str]) -> _Response:  # noqa: ARG002
+        if headers.get("If-None-Match") == self.etag:
+            return _Response(304, "", self.etag)
+        return _Response(200, self.page, self.etag)
+
+
+def _time(run: Callable[[], Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--projects", type=int, default=500_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    client = _Client(args.projects)
+    api = PypiIndexApi(client)  # type: ignore[arg-type,unused-ignore]
+    names = [f"Paquete_{random.randrange(args.projects)}" for _ in range(args.lookups)]  # noqa: S311
+    rows = []
+
+    def row(operation: str, seconds: float) -> None:
+        rows.append({"operation": operation, "ms": f"{seconds * 1000:.4f}"})
+
+    row("parse /simple/ per lookup", _time(lambda: "paquete-1" in api.get_all_projects(), 3))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "mirror.sqlite3")
+        with PypiMirror(api, path) as mirror:
+            row("first sync", _time(mirror.sync, 1))
+            row("sync, unchanged (304)", _time(mirror.sync, 10))
+            client.touch()
+            row("sync, one project changed", _time(mirror.sync, 1))
+            lookups = iter(names)
+            row("mirror lookup", _time(lambda: next(lookups) in mirror, args.lookups))
+        row("open mirror", _time(lambda: PypiMirror(api, path).close(), 10))
+    print(markdown(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
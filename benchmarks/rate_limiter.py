@@ -0,0 +1,67 @@
+"""Throughput achieved under a ``TokenBucket`` quota by threads and by asyncio tasks."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from dev_toolbox.http import TokenBucket
+from dev_toolbox.table import markdown
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+def _threads(rate: float, workers: int, total: int) -> float:
+    bucket = TokenBucket(rate, capacity=1)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        list(executor.map(lambda _: bucket.acquire(), range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def _tasks(rate: float, workers: int, total: int) -> float:
+    bucket = TokenBucket(rate, capacity=1)
+    todo = iter(range(total))
+
+    async def worker() -> None:
+        for _ in todo:
+            await bucket.aacquire()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return total / (time.perf_counter() - start)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=200.0, help="quota, acquisitions/s")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    total = int(args.rate * args.seconds)
+    rows = []
+    for workers in (1, 8, 64):
+        for kind, achieved in (
+            ("threads", _threads(args.rate, workers, total)),
+            ("asyncio", asyncio.run(_tasks(args.rate, workers, total))),
+        ):
+            rows.append(
+                {
+                    "workers": workers,
+                    "kind": kind,
+                    "quota/s": f"{args.rate:.0f}",
+                    "achieved/s": f"{achieved:.1f}",
+                    "of quota": f"{achieved / args.rate:.1%}",
+                }
+            )
+    print(markdown(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
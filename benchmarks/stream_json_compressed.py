@@ -0,0 +1,72 @@
+"""Throughput of ``stream_json_objects`` on plain vs compressed copies of the same file."""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import json
+import lzma
+import os
+import tempfile
+import time
+from typing import TYPE_CHECKING
+from typing import Callable
+
+from dev_toolbox.file_utils import stream_json_objects
+from dev_toolbox.table import markdown
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+def _compressors() -> dict[str, Callable[[bytes], bytes]]:
+    ret: dict[str, Callable[[bytes], bytes]] = {
+        "plain": lambda x: x,
+        "gzip": lambda x: gzip.compress(x, compresslevel=6),
+        "bz2": bz2.compress,
+        "xz": lzma.compress,
+    }
+    try:
+        import zstandard  # type: ignore[import-not-found,unused-ignore]
+
+        ret["zstd"] = zstandard.ZstdCompressor().compress
+    except ImportError:
+        pass
+    return ret
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    payload = b"".join(
+        json.dumps({"id": i, "nombre": f"registro {i}", "标签": ["नमस्ते", "hola"]}).encode() + b"\n"
+        for i in range(args.records)
+    )
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, compress in _compressors().items():
+            path = os.path.join(tmp, f"data.{name}")
+            with open(path, "wb") as f:
+                f.write(compress(payload))
+            start = time.perf_counter()
+            count = sum(1 for _ in stream_json_objects(path))
+            elapsed = time.perf_counter() - start
+            rows.append(
+                {
+                    "codec": name,
+                    "file MiB": f"{os.path.getsize(path) / 2**20:.1f}",
+                    "records": count,
+                    "seconds": f"{elapsed:.3f}",
+                    "MiB/s (decompressed)": f"{len(payload) / 2**20 / elapsed:.1f}",
+                }
+            )
+    print(markdown(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+"""
+Sorting ``--versions`` release strings, the way ``PypiIndexApi.get_versions`` does, with the
+former digit tuple key, ``version_key`` cold and warm, and ``packaging.version.Version``.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import time
+from typing import TYPE_CHECKING
+from typing import Any
+
+from dev_toolbox.pypi_api import version_key
+from dev_toolbox.table import markdown
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Sequence
+
+
+def _digits(x: str) -> tuple[int, ...]:
+    return tuple(map(int, re.findall(r"\d+", x)))
+
+
+def _versions(n: int, distinct: int) -> list[str]:
+    rng = random.Random(0)  # noqa: S311
+    pool = [
+        "{}{}{}{}".format(
+            ".".join(str(rng.randrange(30)) for _ in range(rng.randrange(1, 4))),
+            rng.choice(["", "", "", "a1", "b2", "rc1"]),
+            rng.choice(["", "", "", ".post1"]),
+            rng.choice(["", "", "", ".dev0"]),
+        )
+        for _ in range(distinct)
+    ]
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def _time(key: Callable[[str], Any], versions: list[str]) -> float:
+    start = time.perf_counter()
+    sorted(versions, key=key)
+    return time.perf_counter() - start
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--versions", type=int, default=100_000)
+    parser.add_argument("--distinct", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    versions = _versions(args.versions, args.distinct)
+    cases: list[tuple[str, Callable[[str], Any]]] = [("digit tuples (before)", _digits)]
+    version_key.cache_clear()
+    cases += [("version_key, cold cache", version_key), ("version_key, warm cache", version_key)]
+    try:
+        from packaging.version import Version
+    except ImportError:
+        pass
+    else:
+        cases.append(("packaging Version", Version))
+    reference = sorted(versions, key=cases[-1][1])
+    rows = [
+        {
+            "key": name,
+            "versions": len(versions),
+            "ms": f"{_time(key, versions) * 1000:.1f}",
+            "PEP 440 order": sorted(versions, key=key) == reference,
+        }
+        for name, key in cases
+    ]
+    print(markdown(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
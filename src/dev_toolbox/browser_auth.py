@@ -101,7 +101,8 @@ def browser_auth(  # noqa: PLR0913
 
 if __name__ == "__main__":
     import argparse
-    import json
+
+    from dev_toolbox.json_backend import dumps
 
     logging.basicConfig(
         level=logging.DEBUG,
@@ -135,4 +136,4 @@ if __name__ == "__main__":
     result = browser_auth(
         url=args.url, handler=lambda x: x, port=args.port, host=args.host, timeout=args.timeout
     )
-    print(json.dumps({**result, "content": result["content"].decode("utf-8")}, indent=2))
+    print(dumps({**result, "content": result["content"].decode("utf-8")}, indent=True))
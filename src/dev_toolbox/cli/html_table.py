@@ -66,9 +66,9 @@ def main(argv: Sequence[str] | None = None) -> int:
     with open(args.file) as file:
         tables = TablesParser.parse_tables(file.read())
     if args.json:
-        import json
+        from dev_toolbox.json_backend import dumps
 
-        print(json.dumps(tables, indent=2))
+        print(dumps(tables, indent=True))
         return 0
     for table in tables:
         lengths = get_column_widths(table)
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 import itertools
-import os
 from typing import TYPE_CHECKING
 
 from dev_toolbox.cli.html_table import TablesParser
 from dev_toolbox.cli.html_table import get_column_widths
+from dev_toolbox.http import CachedClient
 from dev_toolbox.http import RequestTemplate
 from dev_toolbox.http.great_value import gv_request
 
@@ -13,7 +13,8 @@ if TYPE_CHECKING:
     from collections.abc import Sequence
 
 RUFF_URL = "https://docs.astral.sh/ruff/rules/"
-_FILE_CACHE = "/tmp/ruff_rules.html"  # noqa: S108
+# The rules page changes with each ruff release, refresh it once a day.
+_CACHE_TTL = 24 * 60 * 60
 
 
 ruff_rules_template = RequestTemplate(
@@ -27,15 +28,8 @@ ruff_rules_template = RequestTemplate(
 
 
 def _get_rules_html() -> str:
-    if not os.path.exists(_FILE_CACHE):
-        with (
-            ruff_rules_template.request(gv_request).response as response,
-            open(_FILE_CACHE, "wb") as f,
-        ):
-            f.write(response.read())
-
-    with open(_FILE_CACHE) as f:
-        return f.read()
+    client = CachedClient(gv_request, default_ttl=_CACHE_TTL)
+    return ruff_rules_template.request(client).content.decode("utf-8")
 
 
 def main(argv: Sequence[str] | None = None) -> int:
@@ -202,9 +202,10 @@ def schema_to_types(schema: JsonSchema) -> str:
 
 def main(argv: Sequence[str] | None = None) -> int:
     import argparse
-    import json
     from textwrap import dedent
 
+    from dev_toolbox.json_backend import loads
+
     class CustomFormatter(argparse.ArgumentDefaultsHelpFormatter, argparse.RawTextHelpFormatter):
         pass
 
@@ -242,8 +243,8 @@ def main(argv: Sequence[str] | None = None) -> int:
     )
     args = parser.parse_args(argv)
 
-    with open(args.input) as f, open(args.output, "w") as out:
-        schema: JsonSchema = json.load(f)
+    with open(args.input, "rb") as f, open(args.output, "w") as out:
+        schema: JsonSchema = loads(f.read())
         out.write(schema_to_types(schema) + "\n")
     return 0
 
@@ -1,9 +1,25 @@
 from __future__ import annotations
 
+from dev_toolbox.file_utils._checkpoint import Checkpoint
+from dev_toolbox.file_utils._compression import open_decompressed
 from dev_toolbox.file_utils._file_slice import FileSlice
+from dev_toolbox.file_utils._json import astream_json_objects
+from dev_toolbox.file_utils._json import scan_json_objects
 from dev_toolbox.file_utils._json import stream_json_objects
+from dev_toolbox.file_utils._json import stream_json_objects_parallel
+from dev_toolbox.file_utils._json import stream_json_objects_with_offsets
+from dev_toolbox.file_utils._json_index import JsonIndex
+from dev_toolbox.file_utils._projection import JsonProjector
 
 __all__ = [
+    "Checkpoint",
     "FileSlice",
+    "JsonIndex",
+    "JsonProjector",
+    "astream_json_objects",
+    "open_decompressed",
+    "scan_json_objects",
     "stream_json_objects",
+    "stream_json_objects_parallel",
+    "stream_json_objects_with_offsets",
 ]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import tempfile
+from typing import TYPE_CHECKING
+
+from dev_toolbox.json_backend import dump_bytes
+from dev_toolbox.json_backend import loads
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+
+class Checkpoint:
+    """
+    Progress of a long job over a file, persisted atomically every ``every`` records.
+
+    Call ``update`` with the offset returned by ``stream_json_objects_with_offsets`` once a record
+    has been fully processed. The checkpoint is written to a temporary file, synced and renamed
+    over ``path``, so a crash leaves either the previous or the new checkpoint, never a torn one.
+    Restarting from ``offset`` replays at most ``every`` records::
+
+        with Checkpoint("ingest.ckpt", every=10_000) as ckpt:
+            for obj, offset in stream_json_objects_with_offsets("data.ndjson", start=ckpt.offset):
+                process(obj)
+                ckpt.update(offset)
+    """
+
+    __slots__ = ("_pending", "every", "offset", "path", "records")
+
+    def __init__(self, path: str, every: int = 1000) -> None:
+        self.path = path
+        self.every = every
+        self.offset = 0
+        self.records = 0
+        self._pending = 0
+        try:
+            with open(path, "rb") as f:
+                state = loads(f.read())
+        except FileNotFoundError:
+            return
+        self.offset = state["offset"]
+        self.records = state["records"]
+
+    def update(self, offset: int, records: int = 1) -> None:
+        """Record that everything up to ``offset`` is done, saving every ``every`` records."""
+        self.offset = offset
+        self.records += records
+        self._pending += records
+        if self._pending >= self.every:
+            self.save()
+
+    def save(self) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(dump_bytes({"offset": self.offset, "records": self.records}))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        self._pending = 0
+
+    def reset(self) -> None:
+        """Forget the progress and remove the checkpoint file."""
+        self.offset = self.records = self._pending = 0
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        # The offset only ever covers processed records, so it is safe to keep it even on error.
+        if self._pending:
+            self.save()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.path!r}, offset={self.offset}, records={self.records})"
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import io
+from typing import IO
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing_extensions import Literal
+
+    Codec = Literal["gzip", "bz2", "xz", "zstd"]
+
+_MAGIC_NUMBERS: tuple[tuple[bytes, Codec], ...] = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+
+def detect_codec(header: bytes) -> Codec | None:
+    """Return the compression codec whose magic number starts ``header``, if any."""
+    return next((codec for magic, codec in _MAGIC_NUMBERS if header.startswith(magic)), None)
+
+
+def _zstd_reader(raw: IO[bytes]) -> io.BufferedIOBase:
+    try:
+        from compression import zstd  # type: ignore[import-not-found,unused-ignore]
+
+        return zstd.ZstdFile(raw)  # type: ignore[no-any-return,unused-ignore]
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore[import-not-found,unused-ignore]
+    except ImportError:
+        msg = "Reading .zst files requires Python 3.14+ or the 'zstandard' package"
+        raise ModuleNotFoundError(msg) from None
+    return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)  # type: ignore[no-any-return,unused-ignore]
+
+
+def open_decompressed(filename: str, buffer_size: int = 1 << 20) -> IO[bytes]:
+    """
+    Open ``filename`` for binary reading, decompressing it on the fly when needed.
+
+    The codec (gzip, bz2, xz or zstd) is detected from the magic bytes, not the file extension.
+    Decompressed data is served through a read-ahead buffer of ``buffer_size`` bytes, so memory
+    stays bounded no matter how large the file is.
+    """
+    raw = io.BufferedReader(io.FileIO(filename, "r"), buffer_size=buffer_size)
+    try:
+        codec = detect_codec(raw.peek(8)[:8])
+        if codec is None:
+            return raw
+        stream: io.BufferedIOBase
+        if codec == "gzip":
+            import gzip
+
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        elif codec == "bz2":
+            import bz2
+
+            stream = bz2.BZ2File(raw)
+        elif codec == "xz":
+            import lzma
+
+            stream = lzma.LZMAFile(raw)  # noqa: SIM115
+        else:
+            stream = _zstd_reader(raw)
+        return io.BufferedReader(_ClosingReader(stream, raw), buffer_size=buffer_size)
+    except BaseException:
+        raw.close()
+        raise
+
+
+class _ClosingReader(io.RawIOBase):
+    """Raw adapter over a decompressing stream that also closes the underlying file."""
+
+    def __init__(self, stream: io.BufferedIOBase, raw: IO[bytes]) -> None:
+        self._stream = stream
+        self._raw = raw
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: memoryview) -> int:  # type: ignore[override]
+        return self._stream.readinto(buffer)
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._raw.close()
+            super().close()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import mmap
+import os
+from typing import TYPE_CHECKING
+from typing import overload
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+
+class FileSlice:
+    """
+    A read-only, zero-copy window over the byte range ``[start, stop)`` of a file.
+
+    The range is mapped with ``mmap`` and exposed through a ``memoryview``, so slicing,
+    ``readline`` and iteration hand out views into the page cache instead of ``bytes`` copies.
+
+    Args:
+    ----
+        filename (str): The file to map.
+        start (int, optional): First byte of the window. Defaults to 0.
+        stop (int | None, optional): End of the window (exclusive). Defaults to the file size.
+
+    """
+
+    __slots__ = ("_mmap", "_pos", "_view", "filename", "start", "stop")
+
+    filename: str
+    start: int
+    stop: int
+    _mmap: mmap.mmap | None
+    _view: memoryview
+    _pos: int
+
+    def __init__(self, filename: str, start: int = 0, stop: int | None = None) -> None:
+        size = os.path.getsize(filename)
+        stop = size if stop is None else min(stop, size)
+        if not 0 <= start <= stop:
+            msg = f"Invalid byte range [{start}, {stop}) for {filename!r} of size {size}"
+            raise ValueError(msg)
+        self.filename = filename
+        self.start = start
+        self.stop = stop
+        self._pos = 0
+        if start == stop:
+            # mmap refuses zero-length mappings.
+            self._mmap = None
+            self._view = memoryview(b"")
+            return
+        # mmap offsets must be aligned to the allocation granularity.
+        offset = start - start % mmap.ALLOCATIONGRANULARITY
+        with open(filename, "rb") as f:
+            self._mmap = mmap.mmap(
+                f.fileno(), stop - offset, access=mmap.ACCESS_READ, offset=offset
+            )
+        self._view = memoryview(self._mmap)[start - offset :]
+
+    @classmethod
+    def split(cls, filename: str, parts: int, sep: bytes = b"\n") -> list[FileSlice]:
+        """
+        Split a file into at most ``parts`` slices of roughly equal size.
+
+        Every boundary is moved forward to just after the next ``sep`` so no line (or record)
+        is cut in half. Empty slices are dropped.
+        """
+        if parts < 1:
+            msg = f"parts must be >= 1, got {parts}"
+            raise ValueError(msg)
+        with cls(filename) as whole:
+            size = len(whole)
+            bounds = [0]
+            for i in range(1, parts):
+                target = max(size * i // parts, bounds[-1])
+                idx = whole.find(sep, target)
+                bounds.append(size if idx == -1 else idx + len(sep))
+            bounds.append(size)
+        return [cls(filename, a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    @overload
+    def __getitem__(self, key: int) -> int: ...
+
+    @overload
+    def __getitem__(self, key: slice) -> memoryview: ...
+
+    def __getitem__(self, key: int | slice) -> int | memoryview:
+        return self._view[key]
+
+    @property
+    def view(self) -> memoryview:
+        """The whole window as a ``memoryview``."""
+        return self._view
+
+    def find(self, sub: bytes, start: int = 0, end: int | None = None) -> int:
+        """Return the lowest index of ``sub`` relative to the window start, or -1."""
+        if self._mmap is None:
+            return -1
+        offset = self._mmap_offset
+        end = len(self) if end is None else min(end, len(self))
+        idx = self._mmap.find(sub, offset + max(start, 0), offset + end)
+        return idx if idx == -1 else idx - offset
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            pos += self._pos
+        elif whence == os.SEEK_END:
+            pos += len(self)
+        self._pos = min(max(pos, 0), len(self))
+        return self._pos
+
+    def read(self, size: int = -1) -> memoryview:
+        end = len(self) if size < 0 else min(self._pos + size, len(self))
+        ret = self._view[self._pos : end]
+        self._pos = end
+        return ret
+
+    def readline(self) -> memoryview:
+        """Return the next line, including its trailing newline, as a ``memoryview``."""
+        idx = self.find(b"\n", self._pos)
+        return self.read(-1 if idx == -1 else idx + 1 - self._pos)
+
+    def __iter__(self) -> Iterator[memoryview]:
+        while line := self.readline():
+            yield line
+
+    def close(self) -> None:
+        """
+        Unmap the file. Raises ``BufferError`` while views handed out are still alive, leaving
+        the slice open and usable.
+        """
+        self._view.release()
+        if self._mmap is None:
+            return
+        try:
+            self._mmap.close()
+        except BufferError:
+            self._view = memoryview(self._mmap)[self._mmap_offset :]
+            raise
+        self._mmap = None
+
+    @property
+    def _mmap_offset(self) -> int:
+        return self.start % mmap.ALLOCATIONGRANULARITY
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.filename!r}, start={self.start}, stop={self.stop})"
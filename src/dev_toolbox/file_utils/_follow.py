@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import io
+    from collections.abc import Generator
+
+    from typing_extensions import Protocol
+
+    class _Watcher(Protocol):
+        def wait(self, timeout: float) -> None: ...
+
+        def close(self) -> None: ...
+
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) event masks.
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_DIR_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+
+
+class _Inotify:
+    """Wake up when anything changes in the directory holding the followed file (Linux only)."""
+
+    def __init__(self, filename: str) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory = os.path.dirname(os.path.abspath(filename)).encode()
+        if libc.inotify_add_watch(fd, directory, _DIR_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, "inotify_add_watch failed")
+        self._fd = fd
+
+    def wait(self, timeout: float) -> None:
+        import select
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if readable:
+            # Drain the pending events, we only care that something happened.
+            try:
+                while os.read(self._fd, 1 << 16):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _Sleeper:
+    def wait(self, timeout: float) -> None:
+        time.sleep(timeout)
+
+    def close(self) -> None:
+        pass
+
+
+def _watcher(filename: str) -> _Watcher:
+    if sys.platform.startswith("linux"):
+        try:
+            return _Inotify(filename)
+        except (OSError, AttributeError):
+            logger.debug("inotify unavailable, falling back to polling", exc_info=True)
+    return _Sleeper()
+
+
+def follow_file(  # noqa: PLR0913
+    filename: str,
+    *,
+    block_size: int = 1 << 16,
+    idle_timeout: float | None = None,
+    start: int = 0,
+    min_interval: float = 0.01,
+    max_interval: float = 1.0,
+) -> Generator[bytes | None]:
+    """
+    Yield the content of ``filename`` as it grows, like ``tail -F``.
+
+    Non-empty ``bytes`` are new data. ``b""`` means the reader caught up with the writer, which
+    is the moment to flush anything that was waiting for more data. ``None`` means the file was
+    truncated or replaced (log rotation) and reading restarts from the beginning of the new
+    file, so any partial data from before must be dropped.
+
+    New data is waited for with inotify when available. Otherwise, and as a safety net for
+    events inotify misses, the file is polled with a backoff that doubles from ``min_interval``
+    to ``max_interval`` and resets whenever data arrives. The generator returns after
+    ``idle_timeout`` seconds without new data, or never when it is None. Reading begins at byte
+    ``start`` of the file that is present when following starts.
+    """
+    watcher = _watcher(filename)
+    f = None
+    try:
+        f = _open_when_present(filename, watcher, max_interval)
+        f.seek(start)
+        interval = min_interval
+        last_data = time.monotonic()
+        while True:
+            block = f.read(block_size)
+            if block:
+                interval = min_interval
+                last_data = time.monotonic()
+                yield block
+                continue
+            yield b""
+            if _replaced_or_truncated(filename, f):
+                f.close()
+                f = _open_when_present(filename, watcher, max_interval)
+                yield None
+                continue
+            if idle_timeout is not None and time.monotonic() - last_data >= idle_timeout:
+                return
+            watcher.wait(interval)
+            interval = min(interval * 2, max_interval)
+    finally:
+        if f is not None:
+            f.close()
+        watcher.close()
+
+
+def _open_when_present(filename: str, watcher: _Watcher, interval: float) -> io.BufferedReader:
+    while True:
+        try:
+            return open(filename, "rb")
+        except FileNotFoundError:  # noqa: PERF203
+            watcher.wait(interval)
+
+
+def _replaced_or_truncated(filename: str, f: io.BufferedReader) -> bool:
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        # Rotated away and not recreated yet, keep reading the old file until it shows up.
+        return False
+    fst = os.fstat(f.fileno())
+    if (st.st_dev, st.st_ino) != (fst.st_dev, fst.st_ino):
+        # Drain whatever the writer appended to the old file before it was rotated.
+        return not f.peek(1)
+    # Truncated: the file is reopened from the start.
+    return st.st_size < f.tell()
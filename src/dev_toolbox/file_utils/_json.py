@@ -1,15 +1,44 @@
 from __future__ import annotations
 
+import os
+import re
+from array import array
 from typing import TYPE_CHECKING
+from typing import Any
 from typing import Callable
-from typing import TypeVar
+from typing import overload
+
+from typing_extensions import TypeVar
+
+from dev_toolbox.file_utils._compression import open_decompressed
+from dev_toolbox.file_utils._file_slice import FileSlice
+from dev_toolbox.file_utils._follow import follow_file
+from dev_toolbox.file_utils._projection import JsonProjector
+from dev_toolbox.json_backend import get_backend
+from dev_toolbox.json_backend import loads
+from dev_toolbox.json_backend import set_backend
 
 if TYPE_CHECKING:
+    import asyncio
+    from collections.abc import AsyncGenerator
+    from collections.abc import AsyncIterable
     from collections.abc import Generator
     from collections.abc import Iterable
     from collections.abc import Iterator
+    from collections.abc import Sequence
+    from concurrent.futures import Future
+    from typing import IO
+
+    from _typeshed import Incomplete
 
-T = TypeVar("T")
+T = TypeVar("T", default="Incomplete")
+
+_RECORD_START = b"\n{"
+# Everything up to the next brace that is not inside a string, skipping complete strings.
+_SKIP_TO_BRACE = re.compile(rb'(?:[^{}"]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+_STRING_REST = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*')
+_QUOTE = ord('"')
+_OPEN_BRACE = ord("{")
 
 
 def partition_by_condition(
@@ -26,16 +55,430 @@ def partition_by_condition(
         yield chunk
 
 
+def _record_boundaries(fs: FileSlice) -> array[int]:
+    """
+    Return the offsets where each record starts, plus the end of the data.
+
+    Records are split the same way as ``stream_json_objects``: a new record begins on every
+    line that starts with ``{``.
+    """
+    boundaries = array("Q")
+    size = len(fs)
+    if not size:
+        return boundaries
+    boundaries.append(0)
+    pos = 0
+    while (idx := fs.find(_RECORD_START, pos)) != -1:
+        pos = idx + 1
+        boundaries.append(pos)
+    boundaries.append(size)
+    return boundaries
+
+
+def _split_at_records(filename: str, parts: int) -> list[tuple[int, int]]:
+    """Split a file into about ``parts`` byte ranges that each start at a record boundary."""
+    with FileSlice(filename) as fs:
+        size = len(fs)
+        bounds = [0]
+        for i in range(1, parts):
+            target = max(size * i // parts, bounds[-1])
+            idx = fs.find(_RECORD_START, target)
+            if idx == -1:
+                break
+            bounds.append(idx + 1)
+        bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def _decode_range(
+    filename: str, start: int, stop: int, json_loader: Callable[[bytes], T]
+) -> list[T]:
+    with FileSlice(filename, start, stop) as fs:
+        boundaries = _record_boundaries(fs)
+        return [json_loader(bytes(fs[a:b])) for a, b in zip(boundaries, boundaries[1:])]
+
+
+def scan_json_objects(blocks: Iterable[bytes]) -> Generator[bytes]:  # noqa: C901
+    """
+    Yield every top-level JSON object found in a stream of byte blocks.
+
+    Object boundaries are found by tracking brace depth outside of strings, so objects do not
+    need to start a line: compact NDJSON, concatenated objects and the elements of a top-level
+    array of objects are all found. Each object is yielded as a single ``bytes`` slice.
+    """
+    buf = bytearray()
+    pos = 0  # next byte to scan
+    start = 0  # start of the current object, only meaningful while depth > 0
+    depth = 0
+    in_string = False  # pos is inside a string that did not end within the data seen so far
+    for block in blocks:
+        keep = start if depth else pos
+        del buf[:keep]
+        buf += block
+        pos -= keep
+        start = 0
+        while True:
+            if in_string:
+                pos = _STRING_REST.match(buf, pos).end()  # type: ignore[union-attr]
+                if pos == len(buf) or buf[pos] != _QUOTE:
+                    # Out of data, possibly right after a backslash: wait for the next block.
+                    break
+                in_string = False
+                pos += 1
+            pos = _SKIP_TO_BRACE.match(buf, pos).end()  # type: ignore[union-attr]
+            if pos == len(buf):
+                break
+            if buf[pos] == _QUOTE:
+                # A string running past the end of the data.
+                in_string = True
+            elif buf[pos] == _OPEN_BRACE:
+                if not depth:
+                    start = pos
+                depth += 1
+            elif depth:
+                depth -= 1
+                if not depth:
+                    yield bytes(buf[start : pos + 1])
+            pos += 1
+    if in_string:
+        msg = "Unterminated JSON string at end of stream"
+        raise ValueError(msg)
+    if depth:
+        msg = "Unterminated JSON object at end of stream"
+        raise ValueError(msg)
+
+
+def _read_blocks(f: IO[bytes], block_size: int) -> Iterator[bytes]:
+    while block := f.read(block_size):
+        yield block
+
+
+@overload
+def stream_json_objects(
+    filename: str,
+    json_loader: None = None,
+    *,
+    buffered: bool = ...,
+    block_size: int = ...,
+    fields: Sequence[str | Sequence[str]],
+    follow: bool = ...,
+    idle_timeout: float | None = ...,
+    start: int = ...,
+) -> Generator[tuple[Any, ...]]: ...
+
+
+@overload
 def stream_json_objects(
     filename: str,
     json_loader: Callable[[bytes], T] | None = None,
-) -> Generator[T]:
-    if json_loader is None:
-        import json
+    *,
+    buffered: bool = ...,
+    block_size: int = ...,
+    fields: None = None,
+    follow: bool = ...,
+    idle_timeout: float | None = ...,
+    start: int = ...,
+) -> Generator[T]: ...
+
+
+def stream_json_objects(  # noqa: PLR0913
+    filename: str,
+    json_loader: Callable[[bytes], T] | None = None,
+    *,
+    buffered: bool = False,
+    block_size: int = 1 << 20,
+    fields: Sequence[str | Sequence[str]] | None = None,
+    follow: bool = False,
+    idle_timeout: float | None = None,
+    start: int = 0,
+) -> Generator[T] | Generator[tuple[Any, ...]]:
+    """
+    Decode the JSON objects stored in ``filename`` one at a time.
 
-        json_loader = json.loads
-    with open(filename, "rb") as f:
+    By default a new object starts on every line that begins with ``{``. With ``buffered=True``
+    the file is read in ``block_size`` blocks and objects are found by ``scan_json_objects``,
+    which also handles compact NDJSON and arrays of objects and avoids building a list of lines
+    per record.
+
+    gzip, bz2, xz and zstd files are decompressed while streaming (see ``open_decompressed``).
+
+    When ``fields`` is given, each record is reduced to a tuple with the value of each key path
+    (see ``JsonProjector``) and the parts of the record that were not asked for are not decoded.
+
+    With ``follow=True`` the file is kept open and new records are yielded as they are appended,
+    like ``tail -F``: rotated and truncated files are reopened from the start, and a record is
+    only yielded once it is complete. The generator runs until it is closed, or until no data
+    arrived for ``idle_timeout`` seconds. Compressed files cannot be followed.
+
+    ``start`` resumes reading at a byte offset, which must be the start of a record such as one
+    returned by ``stream_json_objects_with_offsets``. Offsets of compressed files count
+    decompressed bytes, so resuming them still decompresses, but does not decode, the skipped data.
+    """
+    if fields is not None:
+        if json_loader is not None:
+            msg = "Cannot set both 'json_loader' and 'fields'"
+            raise ValueError(msg)
+        json_loader = JsonProjector(fields)  # type: ignore[assignment]
+    if json_loader is None:
+        json_loader = loads
+    if follow:
+        source = follow_file(
+            filename, block_size=block_size, idle_timeout=idle_timeout, start=start
+        )
+        yield from _follow_records(source, json_loader, buffered)
+        return
+    with open_decompressed(filename, block_size) as f:
+        _skip_to(f, start, block_size)
+        if buffered:
+            yield from map(json_loader, scan_json_objects(_read_blocks(f, block_size)))
+            return
         yield from (
             json_loader(b"".join(chunk))
             for chunk in partition_by_condition(f, lambda x: x.startswith(b"{"))
         )
+
+
+def _skip_to(f: IO[bytes], offset: int, block_size: int) -> None:
+    if not offset:
+        return
+    if f.seekable():
+        f.seek(offset)
+        return
+    while offset:
+        skipped = len(f.read(min(offset, block_size)))
+        if not skipped:
+            msg = "Resume offset is past the end of the file"
+            raise ValueError(msg)
+        offset -= skipped
+
+
+def stream_json_objects_with_offsets(
+    filename: str,
+    json_loader: Callable[[bytes], T] | None = None,
+    *,
+    start: int = 0,
+    block_size: int = 1 << 20,
+) -> Generator[tuple[T, int]]:
+    """
+    Like ``stream_json_objects`` but yield ``(obj, offset)`` pairs.
+
+    ``offset`` is the byte offset just past the record, so passing it back as ``start`` resumes
+    with the next record. Use it with ``Checkpoint`` to make long jobs restartable.
+    """
+    if json_loader is None:
+        json_loader = loads
+    offset = start
+    with open_decompressed(filename, block_size) as f:
+        _skip_to(f, start, block_size)
+        for chunk in partition_by_condition(f, lambda x: x.startswith(b"{")):
+            data = b"".join(chunk)
+            offset += len(data)
+            yield json_loader(data), offset
+
+
+def _follow_records(
+    source: Generator[bytes | None],
+    json_loader: Callable[[bytes], T],
+    buffered: bool,  # noqa: FBT001
+) -> Generator[T]:
+    try:
+        if buffered:
+            yield from _follow_scanned(source, json_loader)
+        else:
+            yield from _follow_lines(source, json_loader)
+    finally:
+        source.close()
+
+
+def _follow_lines(
+    source: Iterator[bytes | None], json_loader: Callable[[bytes], T]
+) -> Generator[T]:
+    chunk: list[bytes] = []
+    tail = b""  # last line, not terminated yet
+    for block in source:
+        if block is None:
+            chunk, tail = [], b""
+        elif block:
+            *lines, tail = (tail + block).split(b"\n")
+            for line in lines:
+                if line.startswith(b"{") and chunk:
+                    yield json_loader(b"".join(chunk))
+                    chunk = []
+                chunk.append(line + b"\n")
+        elif chunk:
+            # Caught up with the writer: the pending record is only complete if it decodes,
+            # otherwise it is still being written and more lines will follow.
+            try:
+                obj = json_loader(b"".join(chunk))
+            except ValueError:
+                continue
+            chunk = []
+            yield obj
+
+
+def _follow_scanned(
+    source: Iterator[bytes | None], json_loader: Callable[[bytes], T]
+) -> Generator[T]:
+    done = False
+
+    def blocks() -> Iterator[bytes]:
+        nonlocal done
+        for block in source:
+            if block is None:
+                return
+            if block:
+                yield block
+        done = True
+
+    while not done:
+        # One scanner per file generation, an object cut by truncation or rotation is dropped.
+        objects = scan_json_objects(blocks())
+        while True:
+            try:
+                raw = next(objects)
+            except (StopIteration, ValueError):
+                break
+            yield json_loader(raw)
+
+
+def stream_json_objects_parallel(
+    filename: str,
+    json_loader: Callable[[bytes], T] | None = None,
+    *,
+    workers: int | None = None,
+    ordered: bool = True,
+    chunk_size: int = 1 << 23,
+) -> Generator[T]:
+    """
+    Decode the records of ``filename`` in a ``ProcessPoolExecutor``.
+
+    The file is cut into ranges of about ``chunk_size`` bytes at record boundaries and each range
+    is decoded by a worker process. At most ``2 * workers`` ranges are in flight, so memory stays
+    bounded for files of any size.
+
+    Args:
+    ----
+        filename (str): The file to read, with the same layout as for ``stream_json_objects``.
+            Ranges are memory-mapped, so the file must not be compressed.
+        json_loader (Callable[[bytes], T] | None, optional): Decoder for a single record. It is
+            sent to the workers, so it must be picklable (a module level function). Workers
+            select the same ``json_backend`` as the calling process.
+        workers (int | None, optional): Number of processes. Defaults to ``os.cpu_count()``.
+        ordered (bool, optional): Yield records in file order. When False, ranges are yielded
+            as soon as they are decoded. Defaults to True.
+        chunk_size (int, optional): Approximate size of a range in bytes.
+
+    """
+    import concurrent.futures
+
+    if json_loader is None:
+        json_loader = loads
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(filename)
+    ranges = iter(_split_at_records(filename, max(workers, -(-size // chunk_size))))
+    max_pending = 2 * workers
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=set_backend, initargs=(get_backend().name,)
+    ) as executor:
+
+        def submit() -> Future[list[T]] | None:
+            rng = next(ranges, None)
+            if rng is None:
+                return None
+            start, stop = rng
+            return executor.submit(_decode_range, filename, start, stop, json_loader)
+
+        pending = [f for f in (submit() for _ in range(max_pending)) if f is not None]
+        while pending:
+            if ordered:
+                done = pending.pop(0)
+            else:
+                finished, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                done = finished.pop()
+                pending.remove(done)
+            if (future := submit()) is not None:
+                pending.append(future)
+            yield from done.result()
+
+
+async def _aread_blocks(reader: asyncio.StreamReader, block_size: int) -> AsyncGenerator[bytes]:
+    # Not ``readline``, which fails on lines longer than the reader's own 64 KiB limit.
+    while block := await reader.read(block_size):
+        yield block
+
+
+async def _aiter_lines(
+    source: asyncio.StreamReader | AsyncIterable[bytes], limit: int
+) -> AsyncGenerator[bytes]:
+    import asyncio
+
+    blocks = _aread_blocks(source, 1 << 16) if isinstance(source, asyncio.StreamReader) else source
+    buf = bytearray()
+    async for block in blocks:
+        buf += block
+        start = 0
+        while (idx := buf.find(b"\n", start)) != -1:
+            yield bytes(buf[start : idx + 1])
+            start = idx + 1
+        del buf[:start]
+        if len(buf) > limit:
+            msg = f"Line exceeds the {limit} byte limit"
+            raise ValueError(msg)
+    if buf:
+        yield bytes(buf)
+
+
+async def astream_json_objects(
+    source: asyncio.StreamReader | AsyncIterable[bytes],
+    json_loader: Callable[[bytes], T] | None = None,
+    *,
+    limit: int = 1 << 24,
+    offload_size: int | None = None,
+) -> AsyncGenerator[T]:
+    """
+    Async version of ``stream_json_objects`` for sockets, pipes and other async byte streams.
+
+    Records are split exactly like ``stream_json_objects``: a new record begins on every line
+    that starts with ``{``. Data is only pulled from ``source`` when the consumer asks for the next
+    record, and a record larger than ``limit`` bytes raises ``ValueError`` instead of growing the
+    buffer without bound.
+
+    Args:
+    ----
+        source (asyncio.StreamReader | AsyncIterable[bytes]): A ``StreamReader`` (e.g. a
+            subprocess stdout) or any async iterable of byte blocks.
+        json_loader (Callable[[bytes], T] | None, optional): Decoder for a single record.
+        limit (int, optional): Maximum size of a buffered record in bytes.
+        offload_size (int | None, optional): Records of at least this many bytes are decoded in
+            the default executor so a slow ``json_loader`` does not block the event loop.
+
+    """
+    import asyncio
+
+    if json_loader is None:
+        json_loader = loads
+    loop = asyncio.get_running_loop()
+
+    async def decode(chunk: list[bytes]) -> T:
+        data = b"".join(chunk)
+        if offload_size is not None and len(data) >= offload_size:
+            return await loop.run_in_executor(None, json_loader, data)
+        return json_loader(data)
+
+    chunk: list[bytes] = []
+    size = 0
+    async for line in _aiter_lines(source, limit):
+        if line.startswith(b"{") and chunk:
+            yield await decode(chunk)
+            chunk = []
+            size = 0
+        chunk.append(line)
+        size += len(line)
+        if size > limit:
+            msg = f"Record exceeds the {limit} byte limit"
+            raise ValueError(msg)
+    if chunk:
+        yield await decode(chunk)
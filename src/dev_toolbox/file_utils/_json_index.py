@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import contextlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from typing import TYPE_CHECKING
+from typing import Callable
+from typing import Generic
+from typing import overload
+
+from typing_extensions import TypeVar
+
+from dev_toolbox.file_utils._file_slice import FileSlice
+from dev_toolbox.file_utils._json import _record_boundaries
+from dev_toolbox.json_backend import loads
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from collections.abc import Sequence
+    from types import TracebackType
+
+    from _typeshed import Incomplete
+    from typing_extensions import Self
+
+T = TypeVar("T", default="Incomplete")
+
+_MAGIC = b"DTJIDX1\0"
+# magic, data file size, data file mtime_ns, number of boundaries
+_HEADER = struct.Struct("=8sQQQ")
+
+
+class JsonIndex(Generic[T]):
+    """
+    Random access by record number into a file read by ``stream_json_objects``.
+
+    The index is the array of byte offsets where each record starts (plus the end of file), so
+    record ``n`` spans ``[offsets[n], offsets[n + 1])``. It is built with a single ``mmap`` scan,
+    can be saved to a sidecar file and is memory-mapped again on load, which makes ``index[n]``
+    O(1) regardless of the file size.
+
+    Args:
+    ----
+        filename (str): The JSON file being indexed.
+        offsets (Sequence[int]): Record boundaries as produced by ``JsonIndex.build``.
+        json_loader (Callable[[bytes], T] | None, optional): Decoder for a single record.
+
+    """
+
+    __slots__ = ("_data", "_index_mmap", "_json_loader", "_offsets", "filename")
+
+    filename: str
+    _offsets: Sequence[int]
+    _data: FileSlice
+    _index_mmap: mmap.mmap | None
+    _json_loader: Callable[[bytes], T]
+
+    def __init__(
+        self,
+        filename: str,
+        offsets: Sequence[int],
+        json_loader: Callable[[bytes], T] | None = None,
+    ) -> None:
+        if json_loader is None:
+            json_loader = loads
+        self.filename = filename
+        self._offsets = offsets
+        self._json_loader = json_loader
+        self._data = FileSlice(filename)
+        self._index_mmap = None
+
+    @staticmethod
+    def sidecar_path(filename: str) -> str:
+        return f"{filename}.idx"
+
+    @classmethod
+    def build(cls, filename: str, json_loader: Callable[[bytes], T] | None = None) -> JsonIndex[T]:
+        with FileSlice(filename) as fs:
+            offsets = _record_boundaries(fs)
+        return cls(filename, offsets, json_loader)
+
+    @classmethod
+    def load(
+        cls,
+        filename: str,
+        index_path: str | None = None,
+        json_loader: Callable[[bytes], T] | None = None,
+    ) -> JsonIndex[T]:
+        """
+        Memory-map a sidecar written by ``save``.
+
+        Raises
+        ------
+            ValueError: If the sidecar is not an index or ``filename`` changed since it was built.
+
+        """
+        index_path = index_path or cls.sidecar_path(filename)
+        st = os.stat(filename)
+        with open(index_path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                msg = f"{index_path!r} is not a JSON index"
+                raise ValueError(msg)
+            magic, size, mtime_ns, count = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                msg = f"{index_path!r} is not a JSON index"
+                raise ValueError(msg)
+            if (size, mtime_ns) != (st.st_size, st.st_mtime_ns):
+                msg = f"{index_path!r} is stale for {filename!r}"
+                raise ValueError(msg)
+            if not count:
+                return cls(filename, array("Q"), json_loader)
+            index_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        offsets = memoryview(index_mmap)[_HEADER.size : _HEADER.size + count * 8].cast("Q")
+        ret = cls(filename, offsets, json_loader)
+        ret._index_mmap = index_mmap
+        return ret
+
+    @classmethod
+    def open(
+        cls,
+        filename: str,
+        index_path: str | None = None,
+        json_loader: Callable[[bytes], T] | None = None,
+    ) -> JsonIndex[T]:
+        """Load the sidecar index, (re)building and saving it when missing or stale."""
+        try:
+            return cls.load(filename, index_path, json_loader)
+        except (OSError, ValueError):
+            ret = cls.build(filename, json_loader)
+            ret.save(index_path)
+            return ret
+
+    def save(self, index_path: str | None = None) -> str:
+        """Atomically write the index next to the data file and return its path."""
+        index_path = index_path or self.sidecar_path(self.filename)
+        st = os.stat(self.filename)
+        offsets = self._offsets if isinstance(self._offsets, array) else array("Q", self._offsets)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(index_path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, st.st_size, st.st_mtime_ns, len(offsets)))
+                offsets.tofile(f)
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        return index_path
+
+    def __len__(self) -> int:
+        return max(len(self._offsets) - 1, 0)
+
+    def span(self, n: int) -> tuple[int, int]:
+        """Return the ``[start, end)`` byte offsets of record ``n``."""
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            msg = f"record {n} out of range"
+            raise IndexError(msg)
+        return self._offsets[n], self._offsets[n + 1]
+
+    def raw(self, n: int) -> memoryview:
+        """Return the undecoded bytes of record ``n`` without copying."""
+        start, end = self.span(n)
+        return self._data[start:end]
+
+    def get(self, n: int) -> T:
+        return self._json_loader(bytes(self.raw(n)))
+
+    @overload
+    def __getitem__(self, key: int) -> T: ...
+
+    @overload
+    def __getitem__(self, key: slice) -> list[T]: ...
+
+    def __getitem__(self, key: int | slice) -> T | list[T]:
+        if isinstance(key, slice):
+            return [self.get(i) for i in range(*key.indices(len(self)))]
+        return self.get(key)
+
+    def __iter__(self) -> Iterator[T]:
+        return (self.get(i) for i in range(len(self)))
+
+    def close(self) -> None:
+        self._data.close()
+        if self._index_mmap is not None:
+            if isinstance(self._offsets, memoryview):
+                self._offsets.release()
+            self._index_mmap.close()
+            self._index_mmap = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
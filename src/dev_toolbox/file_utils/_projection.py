@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import json
+import re
+from json.decoder import scanstring  # type: ignore[attr-defined]
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Union
+
+from dev_toolbox.json_backend import loads
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from typing_extensions import TypeAlias
+
+    # A key maps either to the position of the value in the output tuple or to nested keys.
+    _Trie: TypeAlias = dict[str, Union[int, "_Trie"]]
+
+_WS = re.compile(r"[ \t\n\r]*")
+_SCALAR = re.compile(r"[^,}\]\s]*")
+# Everything up to the next bracket that is not inside a string, skipping complete strings.
+_SKIP_TO_BRACKET = re.compile(r'[^{}\[\]"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^{}\[\]"]*)*')
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+
+
+class _Done(Exception):  # noqa: N818
+    """Raised internally once every requested field has been found."""
+
+
+class _OverBudget(Exception):  # noqa: N818
+    """Raised internally when the member scan budget runs out."""
+
+
+def _skip_value(s: str, idx: int) -> int:
+    """Return the index just after the JSON value starting at ``idx`` without decoding it."""
+    c = s[idx]
+    if c == '"':
+        m = _STRING.match(s, idx)
+        if m is None:
+            msg = "Unterminated string"
+            raise json.JSONDecodeError(msg, s, idx)
+        return m.end()
+    if c not in "{[":
+        return _SCALAR.match(s, idx).end()  # type: ignore[union-attr]
+    depth = 0
+    while True:
+        idx = _SKIP_TO_BRACKET.match(s, idx).end()  # type: ignore[union-attr]
+        c = s[idx]
+        idx += 1
+        if c in "{[":
+            depth += 1
+        elif c in "}]":
+            depth -= 1
+            if not depth:
+                return idx
+        else:
+            msg = "Unterminated string"
+            raise json.JSONDecodeError(msg, s, idx - 1)
+
+
+class JsonProjector:
+    """
+    A ``json_loader`` that only decodes the requested fields of each record.
+
+    Fields are key paths, either dotted strings (``"user.name"``) or sequences of keys
+    (``("user", "name")``). Calling the projector on the bytes of an object returns a tuple with
+    one value per field, ``None`` when the field is missing. Members are walked in order, only
+    requested values are decoded and scanning stops as soon as every field has been found, so
+    fields near the start of wide records are cheap to extract.
+
+    Walking members one by one costs more per byte than a full decode, so once the walk passes
+    ``scan_limit`` (a fraction of the record length) the projector decodes the whole record with
+    the JSON backend instead. That bounds the overhead for fields at the end of wide records.
+
+    The projector is picklable, so it can be passed to ``stream_json_objects_parallel``.
+    """
+
+    __slots__ = ("_decoder", "_size", "_trie", "fields", "scan_limit")
+
+    fields: tuple[tuple[str, ...], ...]
+    scan_limit: float
+    _trie: _Trie
+    _size: int
+
+    def __init__(self, fields: Sequence[str | Sequence[str]], scan_limit: float = 0.1) -> None:
+        self.scan_limit = scan_limit
+        self.fields = tuple(
+            tuple(field.split(".")) if isinstance(field, str) else tuple(field) for field in fields
+        )
+        self._trie = {}
+        for i, path in enumerate(self.fields):
+            node = self._trie
+            for key in path[:-1]:
+                child = node.setdefault(key, {})
+                if isinstance(child, int):
+                    msg = f"Field {'.'.join(path)!r} is nested in another requested field"
+                    raise ValueError(msg)  # noqa: TRY004
+                node = child
+            if path[-1] in node:
+                msg = f"Field {'.'.join(path)!r} is requested twice or overlaps another field"
+                raise ValueError(msg)
+            node[path[-1]] = i
+        self._size = len(self.fields)
+        self._decoder = json.JSONDecoder()
+
+    def __reduce__(self) -> tuple[type[JsonProjector], tuple[tuple[tuple[str, ...], ...], float]]:
+        return (type(self), (self.fields, self.scan_limit))
+
+    def __call__(self, data: bytes | str) -> tuple[Any, ...]:
+        s = data.decode() if isinstance(data, (bytes, bytearray)) else data
+        out: list[Any] = [None] * self._size
+        # [fields found, offset past which to fall back to a full decode, bitmask of found fields]
+        state = [0, int(len(s) * self.scan_limit), 0]
+        idx = _WS.match(s).end()  # type: ignore[union-attr]
+        if s[idx : idx + 1] != "{":
+            msg = "Expecting an object"
+            raise json.JSONDecodeError(msg, s, idx)
+        try:
+            self._object(s, idx + 1, self._trie, out, state)
+        except _Done:
+            pass
+        except _OverBudget:
+            return self._pick(loads(data))
+        except IndexError:
+            msg = "Unexpected end of data"
+            raise json.JSONDecodeError(msg, s, len(s)) from None
+        return tuple(out)
+
+    def _pick(self, obj: Any) -> tuple[Any, ...]:  # noqa: ANN401
+        ret = []
+        for path in self.fields:
+            value = obj
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            ret.append(value)
+        return tuple(ret)
+
+    def _object(self, s: str, idx: int, trie: _Trie, out: list[Any], state: list[int]) -> int:
+        """Walk the members of the object whose ``{`` is just before ``idx``."""
+        idx = _WS.match(s, idx).end()  # type: ignore[union-attr]
+        if s[idx] == "}":
+            return idx + 1
+        while True:
+            if idx > state[1]:
+                raise _OverBudget
+            if s[idx] != '"':
+                msg = "Expecting property name enclosed in double quotes"
+                raise json.JSONDecodeError(msg, s, idx)
+            key, idx = scanstring(s, idx + 1)
+            idx = _WS.match(s, idx).end()  # type: ignore[union-attr]
+            if s[idx] != ":":
+                msg = "Expecting ':' delimiter"
+                raise json.JSONDecodeError(msg, s, idx)
+            idx = _WS.match(s, idx + 1).end()  # type: ignore[union-attr]
+            idx = self._value(s, idx, trie.get(key), out, state)
+            idx = _WS.match(s, idx).end()  # type: ignore[union-attr]
+            c = s[idx]
+            if c == "}":
+                return idx + 1
+            if c != ",":
+                msg = "Expecting ',' delimiter"
+                raise json.JSONDecodeError(msg, s, idx)
+            idx = _WS.match(s, idx + 1).end()  # type: ignore[union-attr]
+
+    def _value(
+        self, s: str, idx: int, node: int | _Trie | None, out: list[Any], state: list[int]
+    ) -> int:
+        """Decode, descend into or skip the value at ``idx`` depending on the trie ``node``."""
+        if node is None:
+            return _skip_value(s, idx)
+        if isinstance(node, int):
+            try:
+                out[node], idx = self._decoder.scan_once(s, idx)  # type: ignore[attr-defined]
+            except StopIteration:
+                msg = "Expecting value"
+                raise json.JSONDecodeError(msg, s, idx) from None
+            # A repeated key fills its slot again but is only counted once.
+            if not state[2] & (bit := 1 << node):
+                state[2] |= bit
+                state[0] += 1
+                if state[0] == self._size:
+                    raise _Done
+            return idx
+        if s[idx] == "{":
+            return self._object(s, idx + 1, node, out, state)
+        return _skip_value(s, idx)
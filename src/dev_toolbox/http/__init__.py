@@ -8,19 +8,70 @@ from typing import overload
 
 from typing_extensions import TypeVar
 
+from dev_toolbox.http._batch import BatchResult
+from dev_toolbox.http._batch import gather_requests
+from dev_toolbox.http._batch import map_requests
+from dev_toolbox.http._bulk import BulkResult
+from dev_toolbox.http._cache import CachedClient
+from dev_toolbox.http._cache import CachedResponse
+from dev_toolbox.http._errors import CircuitOpenError
+from dev_toolbox.http._errors import HTTPError
+from dev_toolbox.http._pool import AsyncConnectionPool
+from dev_toolbox.http._pool import ConnectionPool
+from dev_toolbox.http._ratelimit import AsyncRateLimitedClient
+from dev_toolbox.http._ratelimit import RateLimitedClient
+from dev_toolbox.http._ratelimit import RateLimiter
+from dev_toolbox.http._ratelimit import TokenBucket
+from dev_toolbox.http._retry import AsyncRetryingClient
+from dev_toolbox.http._retry import CircuitBreaker
+from dev_toolbox.http._retry import RetryingClient
+from dev_toolbox.http._retry import RetryPolicy
+from dev_toolbox.http._trace import RequestTrace
+from dev_toolbox.http._trace import TraceHistogram
+from dev_toolbox.http._trace import trace_requests
+
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
     from collections.abc import Awaitable
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+    from collections.abc import Sequence
 
     from _typeshed import Incomplete
     from typing_extensions import Literal
     from typing_extensions import Unpack
 
+    from dev_toolbox.http._trace import TraceHook
     from dev_toolbox.http._types import R_co
     from dev_toolbox.http._types import RequestLike
     from dev_toolbox.http._types import RequestLikeAsync
     from dev_toolbox.http._types import ResponseLike_co
     from dev_toolbox.http._types import _CompleteRequestArgs
+    from dev_toolbox.http._types import _RequestOverrides
+
 
+__all__ = [
+    "AsyncConnectionPool",
+    "AsyncRateLimitedClient",
+    "AsyncRetryingClient",
+    "BatchResult",
+    "BulkResult",
+    "CachedClient",
+    "CachedResponse",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ConnectionPool",
+    "HTTPError",
+    "RateLimitedClient",
+    "RateLimiter",
+    "RequestTemplate",
+    "RequestTrace",
+    "RetryPolicy",
+    "RetryingClient",
+    "TokenBucket",
+    "TraceHistogram",
+    "trace_requests",
+]
 
 S = TypeVar("S", default="Incomplete")
 
@@ -43,6 +94,10 @@ class RequestTemplate(Generic[S]):
     -------
         request: Sends the HTTP request.
         json: Sends the HTTP request and returns the response as JSON.
+        replace: Returns a copy of the template with some arguments overridden.
+        expand: Returns one copy of the template per set of overrides.
+        map: Sends many templates with a thread pool.
+        gather: Sends many templates concurrently from an event loop.
 
     """
 
@@ -52,14 +107,155 @@ class RequestTemplate(Generic[S]):
     def __init__(self, **kwargs: Unpack[_CompleteRequestArgs]) -> None:
         self._request_args = kwargs
 
+    def __repr__(self) -> str:
+        args = ", ".join(f"{k}={v!r}" for k, v in self._request_args.items())
+        return f"{type(self).__name__}({args})"
+
+    def replace(self, /, **overrides: Unpack[_RequestOverrides]) -> RequestTemplate[S]:
+        """
+        Returns a copy of the template with some request arguments overridden.
+
+        Returns
+        -------
+            RequestTemplate[S]: The new template.
+
+        """
+        args = cast("_CompleteRequestArgs", {**self._request_args, **overrides})
+        return type(self)(**args)
+
+    def expand(self, /, overrides: Iterable[_RequestOverrides]) -> Iterator[RequestTemplate[S]]:
+        """
+        Returns one copy of the template per mapping of overrides, see `replace`.
+
+        Returns
+        -------
+            Iterator[RequestTemplate[S]]: The templates, lazily built.
+
+        """
+        return (self.replace(**o) for o in overrides)
+
+    @overload
+    @staticmethod
+    def map(
+        http_client: RequestLike[R_co],
+        templates: Iterable[RequestTemplate],
+        *,
+        max_workers: int = ...,
+        ordered: bool = ...,
+        json: Literal[False] = ...,
+    ) -> Iterator[BatchResult[R_co]]: ...
+
+    @overload
+    @staticmethod
+    def map(
+        http_client: RequestLike[ResponseLike_co],
+        templates: Iterable[RequestTemplate],
+        *,
+        max_workers: int = ...,
+        ordered: bool = ...,
+        json: Literal[True],
+    ) -> Iterator[BatchResult[Incomplete]]: ...
+
+    @staticmethod
+    def map(
+        http_client: RequestLike[R_co],
+        templates: Iterable[RequestTemplate],
+        *,
+        max_workers: int = 8,
+        ordered: bool = False,
+        json: bool = False,
+    ) -> Iterator[BatchResult[R_co]] | Iterator[BatchResult[Incomplete]]:
+        """
+        Sends many templates with a sync client on a thread pool.
+
+        Args:
+        ----
+            http_client (RequestLike[R_co]): The HTTP client to use for every request.
+            templates (Iterable[RequestTemplate]): The requests to send, consumed lazily.
+            max_workers (int, optional): Requests in flight at once. Defaults to 8.
+            ordered (bool, optional): Yield results in submission order instead of as they
+                complete. Defaults to False.
+            json (bool, optional): Call `json` instead of `request` on each template, so each
+                result holds the checked, decoded body. Defaults to False.
+
+        Returns
+        -------
+            Iterator[BatchResult[R_co]]: One result per template. Errors are captured in
+            `BatchResult.error` instead of stopping the batch.
+
+        """
+        return map_requests(
+            http_client, templates, max_workers=max_workers, ordered=ordered, json=json
+        )
+
+    @overload
+    @staticmethod
+    def gather(
+        http_client: RequestLikeAsync[R_co],
+        templates: Iterable[RequestTemplate],
+        *,
+        limit: int = ...,
+        ordered: bool = ...,
+        json: Literal[False] = ...,
+    ) -> AsyncIterator[BatchResult[R_co]]: ...
+
+    @overload
+    @staticmethod
+    def gather(
+        http_client: RequestLikeAsync[ResponseLike_co],
+        templates: Iterable[RequestTemplate],
+        *,
+        limit: int = ...,
+        ordered: bool = ...,
+        json: Literal[True],
+    ) -> AsyncIterator[BatchResult[Incomplete]]: ...
+
+    @staticmethod
+    def gather(
+        http_client: RequestLikeAsync[R_co],
+        templates: Iterable[RequestTemplate],
+        *,
+        limit: int = 32,
+        ordered: bool = False,
+        json: bool = False,
+    ) -> AsyncIterator[BatchResult[R_co]] | AsyncIterator[BatchResult[Incomplete]]:
+        """
+        Sends many templates concurrently with an async client.
+
+        Args:
+        ----
+            http_client (RequestLikeAsync[R_co]): The HTTP client to use for every request.
+            templates (Iterable[RequestTemplate]): The requests to send, consumed lazily.
+            limit (int, optional): Requests in flight at once. Defaults to 32.
+            ordered (bool, optional): Yield results in submission order instead of as they
+                complete. Defaults to False.
+            json (bool, optional): Call `json` instead of `request` on each template. Defaults
+                to False.
+
+        Returns
+        -------
+            AsyncIterator[BatchResult[R_co]]: One result per template, to consume with
+            `async for`. Errors are captured in `BatchResult.error`.
+
+        """
+        return gather_requests(http_client, templates, limit=limit, ordered=ordered, json=json)
+
     @overload
-    def request(self, /, http_client: RequestLike[R_co]) -> R_co: ...
+    def request(
+        self, /, http_client: RequestLike[R_co], *, hooks: Sequence[TraceHook] = ...
+    ) -> R_co: ...
 
     @overload
-    def request(self, /, http_client: RequestLikeAsync[R_co]) -> Awaitable[R_co]: ...  # type: ignore[overload-cannot-match]
+    def request(  # type: ignore[overload-cannot-match]
+        self, /, http_client: RequestLikeAsync[R_co], *, hooks: Sequence[TraceHook] = ...
+    ) -> Awaitable[R_co]: ...
 
     def request(  # type: ignore[misc]
-        self, /, http_client: RequestLike[R_co] | RequestLikeAsync[R_co]
+        self,
+        /,
+        http_client: RequestLike[R_co] | RequestLikeAsync[R_co],
+        *,
+        hooks: Sequence[TraceHook] = (),
     ) -> R_co | Awaitable[R_co]:
         """
         Sends the HTTP request.
@@ -67,13 +263,27 @@ class RequestTemplate(Generic[S]):
         Args:
         ----
             http_client (RequestLike[R_co] | RequestLikeAsync[R_co]): The HTTP client to use for the request.
+            hooks (Sequence[TraceHook], optional): Called with the `RequestTrace` of every request
+                sent by a client supporting tracing, such as `GreatValueRequests`. Defaults to ().
 
         Returns:
         -------
             R_co | Awaitable[R_co]: The response from the HTTP request.
 
         """  # noqa: E501
-        return http_client.request(**self._request_args)
+        if not hooks:
+            return http_client.request(**self._request_args)
+        with trace_requests(*hooks):
+            response = http_client.request(**self._request_args)
+        if isawaitable(response):
+            # The request is only sent once awaited, the hooks must still be active then.
+            return self.__traced(response, hooks)
+        return response
+
+    @staticmethod
+    async def __traced(response: Awaitable[R_co], hooks: Sequence[TraceHook]) -> R_co:
+        with trace_requests(*hooks):
+            return await response
 
     async def __asjon(self, /, response: Awaitable[ResponseLike_co], *, check: bool = True) -> S:
         r = await response
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING
+from typing import Generic
+from typing import Optional
+
+from typing_extensions import NamedTuple
+from typing_extensions import TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+    from concurrent.futures import Future
+
+    from _typeshed import Incomplete
+
+    from dev_toolbox.http import RequestTemplate
+    from dev_toolbox.http._types import RequestLike
+    from dev_toolbox.http._types import RequestLikeAsync
+
+R = TypeVar("R", default="Incomplete")
+
+
+class BatchResult(NamedTuple, Generic[R]):
+    """
+    Outcome of one request of a batch: either ``response`` or ``error`` is set.
+
+    ``position`` is the index of the template in the input.
+    """
+
+    position: int
+    template: RequestTemplate
+    response: Optional[R]  # noqa: UP045
+    error: Optional[BaseException]  # noqa: UP045
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _run(
+    http_client: RequestLike[R], index: int, template: RequestTemplate, *, json: bool
+) -> BatchResult[R]:
+    try:
+        response = template.json(http_client) if json else template.request(http_client)  # type: ignore[type-var]
+    except Exception as e:  # noqa: BLE001
+        return BatchResult(index, template, None, e)
+    return BatchResult(index, template, response, None)
+
+
+def map_requests(
+    http_client: RequestLike[R],
+    templates: Iterable[RequestTemplate],
+    *,
+    max_workers: int = 8,
+    ordered: bool = False,
+    json: bool = False,
+) -> Iterator[BatchResult[R]]:
+    """Run ``templates`` on a thread pool of ``max_workers``, see ``RequestTemplate.map``."""
+    from concurrent.futures import FIRST_COMPLETED
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures import wait
+
+    todo = enumerate(templates)
+    with ThreadPoolExecutor(max_workers) as executor:
+
+        def submit() -> Future[BatchResult[R]] | None:
+            for index, template in todo:
+                return executor.submit(_run, http_client, index, template, json=json)
+            return None
+
+        # Keep a bounded window of requests in flight so huge or lazy inputs stream through.
+        pending = deque(f for f in (submit() for _ in range(max_workers)) if f is not None)
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [f for f in pending if f in finished]
+                pending = deque(f for f in pending if f not in finished)
+            for future in done:
+                yield future.result()
+                nxt = submit()
+                if nxt is not None:
+                    pending.append(nxt)
+
+
+async def _arun(
+    http_client: RequestLikeAsync[R], index: int, template: RequestTemplate, *, json: bool
+) -> BatchResult[R]:
+    try:
+        if json:
+            response = await template.json(http_client)  # type: ignore[type-var]
+        else:
+            response = await template.request(http_client)
+    except Exception as e:  # noqa: BLE001
+        return BatchResult(index, template, None, e)
+    return BatchResult(index, template, response, None)
+
+
+async def gather_requests(
+    http_client: RequestLikeAsync[R],
+    templates: Iterable[RequestTemplate],
+    *,
+    limit: int = 32,
+    ordered: bool = False,
+    json: bool = False,
+) -> AsyncIterator[BatchResult[R]]:
+    """Run ``templates`` with at most ``limit`` in flight, see ``RequestTemplate.gather``."""
+    todo = enumerate(templates)
+
+    def submit() -> asyncio.Task[BatchResult[R]] | None:
+        for index, template in todo:
+            return asyncio.ensure_future(_arun(http_client, index, template, json=json))
+        return None
+
+    pending = deque(t for t in (submit() for _ in range(limit)) if t is not None)
+    try:
+        while pending:
+            if ordered:
+                done = [pending[0]]
+                await asyncio.wait(done)
+                pending.popleft()
+            else:
+                finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                done = [t for t in pending if t in finished]
+                pending = deque(t for t in pending if t not in finished)
+            for task in done:
+                yield task.result()
+                nxt = submit()
+                if nxt is not None:
+                    pending.append(nxt)
+    finally:
+        for task in pending:
+            task.cancel()
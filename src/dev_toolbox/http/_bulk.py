@@ -0,0 +1,347 @@
+"""
+Bulk GETs over a few persistent connections per host, all driven by one selector loop.
+
+Each connection carries up to ``pipeline`` requests written back to back (HTTP/1.1 pipelining)
+and ``ResponseParser`` splits the responses as they arrive. Requests left unanswered when a
+server closes a connection are sent again on another one. Connections and TLS handshakes are
+non-blocking too, only name resolution blocks the loop.
+"""
+
+from __future__ import annotations
+
+import errno
+import http.client
+import os
+import selectors
+import socket
+import ssl
+from collections import deque
+from typing import TYPE_CHECKING
+from typing import NamedTuple
+from typing import Optional
+
+from dev_toolbox.http._http11 import ResponseParser
+from dev_toolbox.http._http11 import build_request
+from dev_toolbox.http._pool import _split_url
+from dev_toolbox.http.great_value import BufferedResponse
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+    from collections.abc import Mapping
+
+    from dev_toolbox.http._http11 import RawResponse
+    from dev_toolbox.http._pool import _Key
+
+# Times a request is sent on a connection closed before answering anything.
+_MAX_ATTEMPTS = 3
+_RECV_SIZE = 1 << 16
+
+
+class BulkResult(NamedTuple):
+    """
+    Outcome of one url of ``bulk_get``: either ``response`` or ``error`` is set.
+
+    ``position`` is the index of the url in the input.
+    """
+
+    position: int
+    url: str
+    response: Optional[BufferedResponse]  # noqa: UP045
+    error: Optional[BaseException]  # noqa: UP045
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _Request(NamedTuple):
+    position: int
+    url: str
+    payload: bytes
+    attempts: int
+
+
+class _Connection:
+    __slots__ = ("answered", "established", "inflight", "key", "out", "parser", "sock", "wants")
+
+    def __init__(self, key: _Key, sock: socket.socket) -> None:
+        self.key = key
+        self.sock = sock
+        self.parser = ResponseParser()
+        self.inflight: deque[_Request] = deque()
+        self.out = bytearray()
+        self.answered = 0
+        self.established = False
+        # Events the connect or the TLS handshake is waiting for, until established.
+        self.wants = selectors.EVENT_WRITE
+
+    def establish(self, context: ssl.SSLContext | None) -> None:
+        """Carry on connecting once the socket is ready, raises ``OSError`` if it failed."""
+        if not isinstance(self.sock, ssl.SSLSocket):
+            err = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err:
+                raise OSError(err, os.strerror(err))
+            if self.key[0] == "http":
+                self.established = True
+                return
+            context = context or ssl.create_default_context()
+            self.sock = context.wrap_socket(
+                self.sock, server_hostname=self.key[1], do_handshake_on_connect=False
+            )
+        try:
+            self.sock.do_handshake()
+        except ssl.SSLWantReadError:
+            self.wants = selectors.EVENT_READ
+        except ssl.SSLWantWriteError:
+            self.wants = selectors.EVENT_WRITE
+        else:
+            self.established = True
+
+    def events(self) -> int:
+        if not self.established:
+            return self.wants
+        return selectors.EVENT_READ | (selectors.EVENT_WRITE if self.out else 0)
+
+    def send(self, request: _Request) -> None:
+        self.inflight.append(request)
+        self.out += request.payload
+        self.parser.expect("GET")
+
+    def flush(self) -> None:
+        try:
+            n = self.sock.send(self.out)
+        except (BlockingIOError, ssl.SSLWantWriteError, ssl.SSLWantReadError):
+            return
+        del self.out[:n]
+
+    def receive(self) -> tuple[bytes, bool]:
+        """Read what is available, return it and whether the server closed the connection."""
+        chunks: list[bytes] = []
+        while True:
+            try:
+                data = self.sock.recv(_RECV_SIZE)
+            except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                break
+            if not data:
+                return b"".join(chunks), True
+            chunks.append(data)
+            # Decrypted bytes buffered by ssl do not make the socket readable again.
+            if not isinstance(self.sock, ssl.SSLSocket) or not self.sock.pending():
+                break
+        return b"".join(chunks), False
+
+
+def _open(key: _Key) -> socket.socket:
+    """Start connecting to ``key`` without waiting, the TLS handshake comes once connected."""
+    scheme, host, port = key
+    if scheme not in ("http", "https"):
+        msg = f"Unsupported URL scheme {scheme!r}"
+        raise ValueError(msg)
+    family, kind, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+    sock = socket.socket(family, kind, proto)
+    sock.setblocking(False)  # noqa: FBT003
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    err = sock.connect_ex(address)
+    if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+        sock.close()
+        raise OSError(err, os.strerror(err))
+    return sock
+
+
+class _BulkGet:
+    __slots__ = (
+        "backlog",
+        "connections",
+        "context",
+        "done",
+        "pipeline",
+        "selector",
+        "timeout",
+        "todo",
+    )
+
+    def __init__(
+        self,
+        requests: Iterable[tuple[str, Mapping[str, str]]],
+        connections: int,
+        pipeline: int,
+        timeout: float | None,
+        context: ssl.SSLContext | None,
+    ) -> None:
+        self.todo = enumerate(requests)
+        self.connections = connections
+        self.pipeline = pipeline
+        self.timeout = timeout
+        self.context = context
+        self.backlog: dict[_Key, deque[_Request]] = {}
+        self.done: deque[BulkResult] = deque()
+        self.selector = selectors.DefaultSelector()
+
+    def _fail(self, request: _Request, error: BaseException) -> None:
+        self.done.append(BulkResult(request.position, request.url, None, error))
+
+    def _answer(self, request: _Request, raw: RawResponse) -> None:
+        try:
+            response = BufferedResponse.from_raw(raw, request.url)
+        except Exception as e:  # noqa: BLE001
+            self._fail(request, e)
+            return
+        self.done.append(BulkResult(request.position, request.url, response, None))
+
+    def _read_ahead(self, queued: int) -> int:
+        """Move requests from the input to the backlog, lazily, return how many are queued."""
+        for position, (url, headers) in self.todo:
+            queued += 1
+            try:
+                key, target, host = _split_url(url)
+                payload = build_request("GET", target, host, headers)
+            except ValueError as e:
+                self.done.append(BulkResult(position, url, None, e))
+                continue
+            self.backlog.setdefault(key, deque()).append(_Request(position, url, payload, 0))
+            if queued >= 2 * self.connections * self.pipeline:
+                break
+        return queued
+
+    def _connect(self, key: _Key, queue: deque[_Request], opened: list[_Connection]) -> int:
+        """Open connections while ``queue`` holds more than they have room for, return the room."""
+        room = sum(self.pipeline - len(c.inflight) for c in opened)
+        while len(queue) > room and len(opened) < self.connections:
+            try:
+                sock = _open(key)
+            except (OSError, ValueError) as e:
+                if not opened:
+                    # Nothing can carry the requests to this host, they all fail.
+                    while queue:
+                        self._fail(queue.popleft(), e)
+                break
+            conn = _Connection(key, sock)
+            self.selector.register(sock.fileno(), conn.wants, conn)
+            opened.append(conn)
+            room += self.pipeline
+        return room
+
+    def _dispatch(self, conns: dict[_Key, list[_Connection]]) -> None:
+        """Open connections and hand them queued requests, spread evenly."""
+        for key, queue in self.backlog.items():
+            if not queue:
+                continue
+            opened = conns.setdefault(key, [])
+            room = self._connect(key, queue, opened)
+            while queue and room:
+                for conn in opened:
+                    if queue and len(conn.inflight) < self.pipeline:
+                        conn.send(queue.popleft())
+                        room -= 1
+        for opened in conns.values():
+            for conn in opened:
+                # Registered by file descriptor, which stays the same once wrapped for TLS.
+                fd, events = conn.sock.fileno(), conn.events()
+                if self.selector.get_key(fd).events != events:
+                    self.selector.modify(fd, events, conn)
+
+    def _drop(self, conns: dict[_Key, list[_Connection]], conn: _Connection) -> None:
+        self.selector.unregister(conn.sock.fileno())
+        conn.sock.close()
+        conns[conn.key].remove(conn)
+
+    def _close(
+        self, conns: dict[_Key, list[_Connection]], conn: _Connection, error: Exception | None
+    ) -> None:
+        """Drop ``conn`` and queue its unanswered requests again."""
+        self._drop(conns, conn)
+        if not conn.established:
+            # Could not connect: the requests it was given fail rather than hammer the host.
+            for request in conn.inflight:
+                self._fail(request, error or ConnectionError(f"Could not connect to {request.url}"))
+            return
+        if not conn.inflight:
+            return
+        retry = list(conn.inflight)
+        if not conn.answered:
+            # Only the first request can be blamed for a connection that answered nothing.
+            first = retry.pop(0)
+            if first.attempts + 1 >= _MAX_ATTEMPTS:
+                self._fail(
+                    first, error or http.client.RemoteDisconnected(f"No response for {first.url}")
+                )
+            else:
+                retry.insert(0, first._replace(attempts=first.attempts + 1))
+        self.backlog[conn.key].extendleft(reversed(retry))
+
+    def _expire(self, conns: dict[_Key, list[_Connection]]) -> None:
+        """Fail the requests in flight after ``timeout`` seconds without any progress."""
+        for opened in conns.values():
+            for conn in list(opened):
+                self._drop(conns, conn)
+                for request in conn.inflight:
+                    self._fail(request, TimeoutError(f"No response in {self.timeout}s"))
+
+    def _progress(self, conns: dict[_Key, list[_Connection]], conn: _Connection, mask: int) -> None:
+        """Send and receive what the selector reported possible, collect the answered requests."""
+        try:
+            if not conn.established:
+                conn.establish(self.context)
+                return
+            if mask & selectors.EVENT_WRITE:
+                conn.flush()
+            if not mask & selectors.EVENT_READ:
+                return
+            data, eof = conn.receive()
+            responses = conn.parser.feed(data)
+        except (OSError, http.client.HTTPException) as e:
+            self._close(conns, conn, e)
+            return
+        error = None
+        if eof:
+            try:
+                responses += conn.parser.feed_eof()
+            except http.client.HTTPException as e:
+                error = e
+        for raw in responses:
+            self._answer(conn.inflight.popleft(), raw)
+        conn.answered += len(responses)
+        if eof or (responses and not responses[-1].keep_alive):
+            self._close(conns, conn, error)
+
+    def run(self) -> Iterator[BulkResult]:
+        conns: dict[_Key, list[_Connection]] = {}
+        queued = self._read_ahead(0)
+        try:
+            while queued:
+                self._dispatch(conns)
+                if not self.done:
+                    events = self.selector.select(self.timeout)
+                    if not events:
+                        self._expire(conns)
+                    for selector_key, mask in events:
+                        self._progress(conns, selector_key.data, mask)
+                while self.done:
+                    queued -= 1
+                    yield self.done.popleft()
+                queued = self._read_ahead(queued)
+        finally:
+            for opened in conns.values():
+                for conn in opened:
+                    conn.sock.close()
+            self.selector.close()
+
+
+def bulk_get(
+    requests: Iterable[tuple[str, Mapping[str, str]]],
+    *,
+    connections: int = 4,
+    pipeline: int = 8,
+    timeout: float | None = 30.0,
+    context: ssl.SSLContext | None = None,
+) -> Iterator[BulkResult]:
+    """
+    GET every ``(url, headers)`` of ``requests``, yield a ``BulkResult`` for each as they end.
+
+    At most ``connections`` connections are opened per host, each with up to ``pipeline``
+    requests in flight. ``timeout`` bounds the wait for any progress at all, the requests in
+    flight when it runs out fail with ``TimeoutError``. A url whose host cannot be connected to,
+    or that gets no response after a few attempts, fails alone. Redirects are not followed.
+    """
+    return _BulkGet(requests, connections, pipeline, timeout, context).run()
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import calendar
+import contextlib
+import email.utils
+import hashlib
+import http.client
+import os
+import tempfile
+import time
+import urllib.parse
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import NamedTuple
+
+from dev_toolbox.http._errors import _raise_for_status
+from dev_toolbox.json_backend import dump_bytes
+from dev_toolbox.json_backend import loads
+
+if TYPE_CHECKING:
+    from _typeshed import Incomplete
+    from typing_extensions import Unpack
+
+    from dev_toolbox.http._types import RequestLike
+    from dev_toolbox.http._types import _CompleteRequestArgs
+    from dev_toolbox.http._types import _Params
+
+_CACHEABLE_STATUS = frozenset((200, 203, 300, 301, 308, 404, 410))
+# Headers of a 304 that describe its own (empty) body rather than the stored one.
+_BODY_HEADERS = frozenset(("content-length", "content-encoding", "transfer-encoding"))
+
+
+def default_cache_dir() -> str:
+    """``$XDG_CACHE_HOME/dev-toolbox/http``, defaulting to ``~/.cache/dev-toolbox/http``."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "dev-toolbox", "http")
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    headers: http.client.HTTPMessage
+    content: bytes
+    url: str
+    from_cache: bool
+
+    def read(self) -> bytes:
+        return self.content
+
+    def json(self) -> Incomplete:
+        return loads(self.content)
+
+    def raise_for_status(self) -> None:
+        reason = http.client.responses.get(self.status_code, "")
+        _raise_for_status(self.status_code, reason, self.url, self.headers)
+
+
+class _Entry(NamedTuple):
+    status_code: int
+    headers: list[tuple[str, str]]
+    url: str
+    expires: float
+    body_offset: int
+
+
+def _message(pairs: list[tuple[str, str]]) -> http.client.HTTPMessage:
+    msg = http.client.HTTPMessage()
+    for k, v in pairs:
+        msg[k] = v
+    return msg
+
+
+def _cache_control(headers: http.client.HTTPMessage) -> dict[str, str | None]:
+    ret: dict[str, str | None] = {}
+    for value in headers.get_all("Cache-Control") or ():
+        for directive in value.split(","):
+            name, sep, arg = directive.strip().partition("=")
+            ret[name.lower()] = arg.strip('"') if sep else None
+    return ret
+
+
+def _http_date(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        parsed = email.utils.parsedate_tz(value)
+    except (TypeError, ValueError):
+        return None
+    return None if parsed is None else float(calendar.timegm(parsed[:9]) - (parsed[9] or 0))
+
+
+def _expires(headers: http.client.HTTPMessage, now: float, default_ttl: float) -> float | None:
+    """When the response stops being fresh, or None when it must not be stored."""
+    directives = _cache_control(headers)
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return now
+    max_age = directives.get("max-age")
+    if max_age is not None and max_age.isdigit():
+        return now + int(max_age) - int(headers.get("Age", "0") or 0)
+    expires = _http_date(headers.get("Expires"))
+    if expires is not None:
+        date = _http_date(headers.get("Date")) or now
+        return now + expires - date
+    return now + default_ttl
+
+
+def _normalized_params(params: _Params) -> str:
+    if not params:
+        return ""
+    items = params.items() if isinstance(params, dict) else params
+    return urllib.parse.urlencode(sorted((str(k), str(v)) for k, v in items))
+
+
+class CachedClient:
+    """
+    Wraps any ``RequestLike`` client with an HTTP cache stored on disk.
+
+    ``GET`` responses are stored under ``directory`` keyed by the client's base url, the url,
+    normalized params and the ``Accept`` header. They are served without touching the network
+    while fresh according to ``Cache-Control: max-age`` or ``Expires``, or for ``default_ttl``
+    seconds when the server gave neither. Stale entries with an ``ETag`` or ``Last-Modified``
+    are revalidated with a conditional request and a ``304 Not Modified`` answer reuses the
+    stored body. ``no-store`` responses are never written. The least recently used entries are
+    evicted once the cache grows past ``max_size`` bytes.
+
+    Every request returns a ``CachedResponse``, with ``from_cache`` telling whether the body
+    came from disk. Other methods are passed through to the wrapped client.
+    """
+
+    __slots__ = ("client", "default_ttl", "directory", "max_size")
+
+    def __init__(
+        self,
+        client: RequestLike[Any],
+        directory: str | None = None,
+        *,
+        max_size: int = 256 << 20,
+        default_ttl: float = 0,
+    ) -> None:
+        self.client = client
+        self.directory = directory or default_cache_dir()
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        return getattr(self.client, name)
+
+    def _path(self, kwargs: _CompleteRequestArgs) -> str:
+        headers = {k.lower(): v for k, v in (kwargs.get("headers") or {}).items()}
+        key = "\n".join(
+            (
+                kwargs["method"],
+                # Relative urls are resolved by the client, against its base url if it has one.
+                str(getattr(self.client, "base_url", None) or ""),
+                kwargs["url"],
+                _normalized_params(kwargs.get("params")),
+                str(headers.get("accept", "")),
+            )
+        )
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def _load(self, path: str) -> _Entry | None:
+        try:
+            with open(path, "rb") as f:
+                head = f.readline()
+        except FileNotFoundError:
+            return None
+        try:
+            status_code, headers, url, expires = loads(head)
+        except ValueError:
+            return None
+        return _Entry(status_code, [tuple(x) for x in headers], url, expires, len(head))
+
+    def _store(self, path: str, entry: _Entry, body: bytes) -> None:
+        head = dump_bytes([entry.status_code, entry.headers, entry.url, entry.expires]) + b"\n"
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(head)
+                f.write(body)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def _body(self, path: str, entry: _Entry) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(entry.body_offset)
+            body = f.read()
+        # Reading an entry makes it the most recently used one.
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return body
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.is_file() and ".tmp" not in e.name:
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                    total += st.st_size
+        if total <= self.max_size:
+            return
+        for _, size, path in sorted(entries):
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            total -= size
+            if total <= self.max_size:
+                break
+
+    def clear(self) -> None:
+        """Remove every stored response."""
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.is_file():
+                    with contextlib.suppress(OSError):
+                        os.remove(e.path)
+
+    def request(self, **kwargs: Unpack[_CompleteRequestArgs]) -> CachedResponse:
+        if kwargs["method"] != "GET":
+            return self._fetch(kwargs, None, None)
+        path = self._path(kwargs)
+        entry = self._load(path)
+        if entry is not None and time.time() < entry.expires:
+            body = self._body(path, entry)
+            return CachedResponse(
+                entry.status_code, _message(entry.headers), body, entry.url, from_cache=True
+            )
+        return self._fetch(kwargs, entry, path)
+
+    def _fetch(
+        self, kwargs: _CompleteRequestArgs, entry: _Entry | None, path: str | None
+    ) -> CachedResponse:
+        request_args = kwargs
+        if entry is not None:
+            cached = _message(entry.headers)
+            conditional = {}
+            if cached.get("ETag"):
+                conditional["If-None-Match"] = cached["ETag"]
+            if cached.get("Last-Modified"):
+                conditional["If-Modified-Since"] = cached["Last-Modified"]
+            request_args = {**kwargs, "headers": {**(kwargs.get("headers") or {}), **conditional}}
+        try:
+            response = self.client.request(**request_args)
+            status_code: int = response.status_code
+        except Exception as e:
+            # urllib reports 304 as an HTTPError, which is itself a response.
+            if entry is None or getattr(e, "code", None) != 304:  # noqa: PLR2004
+                raise
+            response, status_code = e, 304
+        headers = _message(list(response.headers.items()))
+        if status_code == 304 and entry is not None and path is not None:  # noqa: PLR2004
+            return self._not_modified(path, entry, headers)
+
+        read = getattr(response, "read", None)
+        body = read() if callable(read) else response.content
+        url = str(getattr(response, "url", None) or kwargs["url"])
+        if path is not None and status_code in _CACHEABLE_STATUS:
+            now = time.time()
+            expires = _expires(headers, now, self.default_ttl)
+            validators = "ETag" in headers or "Last-Modified" in headers
+            if expires is not None and (expires > now or validators):
+                self._store(path, _Entry(status_code, list(headers.items()), url, expires, 0), body)
+        return CachedResponse(status_code, headers, body, url, from_cache=False)
+
+    def _not_modified(
+        self, path: str, entry: _Entry, headers: http.client.HTTPMessage
+    ) -> CachedResponse:
+        """Serve the stored body after a 304, refreshing the stored headers and freshness."""
+        body = self._body(path, entry)
+        merged = _message(entry.headers)
+        for k, v in headers.items():
+            if k.lower() in _BODY_HEADERS:
+                continue
+            del merged[k]
+            merged[k] = v
+        expires = _expires(merged, time.time(), self.default_ttl)
+        if expires is not None:
+            self._store(path, entry._replace(headers=list(merged.items()), expires=expires), body)
+        return CachedResponse(entry.status_code, merged, body, entry.url, from_cache=True)
@@ -0,0 +1,234 @@
+"""Content-Encoding negotiation and streaming decompression of response bodies."""
+
+from __future__ import annotations
+
+import functools
+import io
+import zlib
+from http.client import HTTPMessage
+from typing import TYPE_CHECKING
+from typing import Any
+
+if TYPE_CHECKING:
+    from http.client import HTTPResponse
+
+    from typing_extensions import Protocol
+
+    class _Decoder(Protocol):
+        def decode(self, data: bytes, max_length: int) -> bytes: ...
+
+        def needs_input(self) -> bool: ...
+
+        def flush(self) -> bytes: ...
+
+
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def _brotli() -> Any:  # noqa: ANN401
+    try:
+        import brotli  # type: ignore[import-not-found,import-untyped,unused-ignore]
+    except ImportError:
+        import brotlicffi as brotli  # type: ignore[import-not-found,unused-ignore]
+    return brotli
+
+
+@functools.cache
+def accept_encoding() -> str:
+    """The ``Accept-Encoding`` value for the codecs that can be decoded here."""
+    try:
+        _brotli()
+    except ImportError:
+        return "gzip, deflate"
+    return "gzip, deflate, br"
+
+
+class _ZlibDecoder:
+    """gzip (possibly multi-member) or deflate, with or without the zlib wrapper."""
+
+    __slots__ = ("_d", "_started", "_wbits")
+
+    def __init__(self, wbits: int) -> None:
+        self._wbits = wbits
+        self._d = zlib.decompressobj(wbits)
+        self._started = False
+
+    def _more_members(self) -> bool:
+        return self._d.eof and self._wbits == _GZIP_WBITS
+
+    def decode(self, data: bytes, max_length: int) -> bytes:
+        d = self._d
+        if d.eof:
+            if not self._more_members():
+                return b""
+            # Another gzip member follows the one that just ended.
+            data = d.unused_data + data
+            d = self._d = zlib.decompressobj(self._wbits)
+            if not data.strip(b"\0"):
+                return b""
+        try:
+            ret = d.decompress(d.unconsumed_tail + data, max_length)
+        except zlib.error:
+            if self._started or self._wbits != zlib.MAX_WBITS:
+                raise
+            # Some servers send raw deflate data for "deflate".
+            self._wbits = -zlib.MAX_WBITS
+            d = self._d = zlib.decompressobj(self._wbits)
+            ret = d.decompress(data, max_length)
+        self._started = True
+        return ret
+
+    def needs_input(self) -> bool:
+        return not self._d.unconsumed_tail and not (self._more_members() and self._d.unused_data)
+
+    def flush(self) -> bytes:
+        return self._d.flush()
+
+
+class _BrotliDecoder:
+    """
+    brotli, bounded by about ``max_length`` when ``Decompressor.process`` takes an
+    ``output_buffer_limit`` (brotli 1.2+). Older brotli and brotlicffi decompress each chunk of
+    input in full, so their output is unbounded.
+    """
+
+    __slots__ = ("_bounded", "_d", "_pending")
+
+    def __init__(self) -> None:
+        self._d = _brotli().Decompressor()
+        self._bounded = hasattr(self._d, "can_accept_more_data")
+        self._pending = False
+
+    def decode(self, data: bytes, max_length: int) -> bytes:
+        d = self._d
+        if not self._bounded:
+            return (getattr(d, "process", None) or d.decompress)(data)  # type: ignore[no-any-return,unused-ignore]
+        if max_length:
+            ret: bytes = d.process(data, output_buffer_limit=max_length)
+        else:
+            ret = d.process(data)
+        # Output stopped at the limit may have more behind it, even once all input is consumed.
+        self._pending = bool(ret) and not d.is_finished()
+        return ret
+
+    def needs_input(self) -> bool:
+        return not self._bounded or (not self._pending and self._d.can_accept_more_data())
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def _decoder(content_encoding: str | None) -> _Decoder | None:
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return _ZlibDecoder(_GZIP_WBITS)
+    if encoding == "deflate":
+        return _ZlibDecoder(zlib.MAX_WBITS)
+    if encoding == "br":
+        return _BrotliDecoder()
+    return None
+
+
+class _DecodingReader(io.RawIOBase):
+    """Raw stream of the decompressed body, read from the response ``read_size`` bytes at a time."""
+
+    def __init__(self, source: HTTPResponse, decoder: _Decoder, read_size: int) -> None:
+        self._source = source
+        self._decoder = decoder
+        self._read_size = read_size
+        self._buf = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: memoryview) -> int:  # type: ignore[override]
+        while not self._buf:
+            if self._decoder.needs_input():
+                data = self._source.read(self._read_size)
+                if not data:
+                    self._buf = self._decoder.flush()
+                    if not self._buf:
+                        return 0
+                    break
+            else:
+                data = b""
+            # Bounding the output keeps memory flat even for highly compressed bodies.
+            self._buf = self._decoder.decode(data, len(buffer))
+        n = min(len(buffer), len(self._buf))
+        buffer[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+    def close(self) -> None:
+        try:
+            self._source.close()
+        finally:
+            super().close()
+
+
+class DecodedResponse(io.BufferedReader):
+    """
+    An ``HTTPResponse`` look-alike whose body is decompressed while it is read.
+
+    ``Content-Encoding`` and ``Content-Length`` are dropped from ``headers`` since they describe
+    the compressed body.
+    """
+
+    def __init__(
+        self, response: HTTPResponse, decoder: _Decoder, buffer_size: int = 1 << 16
+    ) -> None:
+        super().__init__(_DecodingReader(response, decoder, buffer_size), buffer_size)
+        self.response = response
+        self.status = response.status
+        self.reason = response.reason
+        self.url: str | None = getattr(response, "url", None)
+        self.content_encoding = response.headers.get("Content-Encoding")
+        self.headers = self.msg = decoded_headers(response.headers)
+
+    @property
+    def code(self) -> int:
+        return self.status
+
+    def getcode(self) -> int:
+        return self.status
+
+    def geturl(self) -> str | None:
+        return self.url
+
+    def getheader(self, name: str, default: str | None = None) -> str | None:
+        return self.headers.get(name, default)
+
+    def getheaders(self) -> list[tuple[str, str]]:
+        return list(self.headers.items())
+
+    def isclosed(self) -> bool:
+        return self.response.isclosed()
+
+
+def decoded_headers(headers: HTTPMessage) -> HTTPMessage:
+    """Copy of ``headers`` without the ones describing the compressed body."""
+    ret = HTTPMessage()
+    for k, v in headers.items():
+        if k.lower() not in ("content-encoding", "content-length"):
+            ret[k] = v
+    return ret
+
+
+def decode_response(response: HTTPResponse) -> HTTPResponse:
+    """Return ``response`` itself, or a ``DecodedResponse`` when its body is compressed."""
+    decoder = _decoder(response.headers.get("Content-Encoding"))
+    if decoder is None:
+        return response
+    return DecodedResponse(response, decoder)  # type: ignore[return-value]
+
+
+def decode_body(body: bytes, content_encoding: str | None) -> bytes:
+    """Decompress a complete body according to its ``Content-Encoding``."""
+    decoder = _decoder(content_encoding)
+    if decoder is None:
+        return body
+    chunks = [decoder.decode(body, 0)]
+    while not decoder.needs_input():
+        chunks.append(decoder.decode(b"", 0))
+    chunks.append(decoder.flush())
+    return b"".join(chunks)
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import http.client
+
+
+class HTTPError(Exception):
+    """Raised by ``raise_for_status`` for 4xx and 5xx responses."""
+
+    def __init__(
+        self,
+        status_code: int,
+        reason: str,
+        url: str | None,
+        headers: http.client.HTTPMessage | None = None,
+    ) -> None:
+        kind = "Client Error" if status_code < 500 else "Server Error"  # noqa: PLR2004
+        super().__init__(f"{status_code} {kind}: {reason} for url: {url}")
+        self.status_code = status_code
+        self.reason = reason
+        self.url = url
+        self.headers = headers if headers is not None else http.client.HTTPMessage()
+
+    @property
+    def code(self) -> int:
+        """Same as ``status_code``, like ``urllib.error.HTTPError``."""
+        return self.status_code
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host whose circuit breaker is open."""
+
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(f"Circuit open for {host}, retry in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def _raise_for_status(
+    status_code: int,
+    reason: str,
+    url: str | None,
+    headers: http.client.HTTPMessage | None = None,
+) -> None:
+    if 400 <= status_code < 600:  # noqa: PLR2004
+        raise HTTPError(status_code, reason, url, headers)
@@ -0,0 +1,218 @@
+"""
+Sans-IO HTTP/1.1 client protocol: request serialization and an incremental response parser.
+
+The parser is fed whatever bytes arrive from the socket and returns the responses completed so
+far, so it works the same with blocking sockets, selectors and asyncio streams, and handles
+several pipelined responses in one buffer.
+"""
+
+from __future__ import annotations
+
+import http.client
+from collections import deque
+from typing import TYPE_CHECKING
+from typing import NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+_MAX_HEAD = 1 << 16
+
+# Parser states.
+_HEAD = 0
+_LENGTH = 1
+_CHUNK_SIZE = 2
+_CHUNK_DATA = 3
+_TRAILER = 4
+_UNTIL_EOF = 5
+
+
+class RawResponse(NamedTuple):
+    status: int
+    reason: str
+    headers: http.client.HTTPMessage
+    body: bytes
+    keep_alive: bool
+
+
+def build_request(
+    method: str,
+    target: str,
+    host: str,
+    headers: Mapping[str, str] | None = None,
+    body: bytes | None = None,
+) -> bytes:
+    """Serialize a request. ``Host`` and ``Content-Length`` are added unless already set."""
+    given = {k.lower() for k in headers or ()}
+    lines = [f"{method} {target} HTTP/1.1"]
+    if "host" not in given:
+        lines.append(f"Host: {host}")
+    lines.extend(f"{k}: {v}" for k, v in (headers or {}).items())
+    if body is not None and "content-length" not in given:
+        lines.append(f"Content-Length: {len(body)}")
+    head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    return head + body if body else head
+
+
+def _parse_head(head: bytes) -> tuple[str, int, str, http.client.HTTPMessage]:
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    version, _, rest = status_line.partition(" ")
+    code, _, reason = rest.partition(" ")
+    if not version.startswith("HTTP/") or not code.isdigit():
+        raise http.client.BadStatusLine(status_line)
+    headers = http.client.HTTPMessage()
+    for line in header_lines:
+        name, sep, value = line.partition(":")
+        if not sep:
+            msg = f"Malformed header line {line!r}"
+            raise http.client.HTTPException(msg)
+        headers[name.strip()] = value.strip()
+    return version, int(code), reason, headers
+
+
+class ResponseParser:
+    """
+    Incremental parser for the responses to the requests sent on one connection.
+
+    Call ``expect`` with the method of every request in the order they were sent (responses to
+    ``HEAD`` have no body), then ``feed`` the received bytes. Bodies delimited by
+    ``Content-Length``, chunked transfer encoding or the end of the connection are supported.
+    """
+
+    __slots__ = ("_body", "_buf", "_head", "_methods", "_remaining", "_state")
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._methods: deque[str] = deque()
+        self._state = _HEAD
+        self._head: tuple[str, int, str, http.client.HTTPMessage] | None = None
+        self._body: list[bytes] = []
+        self._remaining = 0
+
+    def expect(self, method: str) -> None:
+        self._methods.append(method)
+
+    @property
+    def idle(self) -> bool:
+        """True when no response is partially received."""
+        return self._state == _HEAD and not self._buf
+
+    def feed(self, data: bytes) -> list[RawResponse]:
+        """Consume ``data`` and return the responses it completed."""
+        self._buf += data
+        out: list[RawResponse] = []
+        while self._STEPS[self._state](self, out):
+            pass
+        return out
+
+    # One step per parser state, each returns False when it needs more data.
+
+    def _step_head(self, _: list[RawResponse]) -> bool:
+        buf = self._buf
+        end = buf.find(b"\r\n\r\n")
+        if end < 0:
+            if len(buf) > _MAX_HEAD:
+                msg = "Response head too long"
+                raise http.client.HTTPException(msg)
+            return False
+        self._start(bytes(buf[:end]))
+        del buf[: end + 4]
+        return True
+
+    def _step_length(self, out: list[RawResponse]) -> bool:
+        buf = self._buf
+        n = min(self._remaining, len(buf))
+        if n:
+            self._body.append(bytes(buf[:n]))
+            del buf[:n]
+            self._remaining -= n
+        if self._remaining:
+            return False
+        out.append(self._finish(keep_alive=True))
+        return True
+
+    def _step_chunk_size(self, _: list[RawResponse]) -> bool:
+        buf = self._buf
+        end = buf.find(b"\r\n")
+        if end < 0:
+            return False
+        size = int(bytes(buf[:end]).split(b";", 1)[0], 16)
+        del buf[: end + 2]
+        self._remaining = size
+        self._state = _CHUNK_DATA if size else _TRAILER
+        return True
+
+    def _step_chunk_data(self, _: list[RawResponse]) -> bool:
+        buf = self._buf
+        if len(buf) < self._remaining + 2:
+            return False
+        self._body.append(bytes(buf[: self._remaining]))
+        del buf[: self._remaining + 2]
+        self._state = _CHUNK_SIZE
+        return True
+
+    def _step_trailer(self, out: list[RawResponse]) -> bool:
+        buf = self._buf
+        end = buf.find(b"\r\n")
+        if end < 0:
+            return False
+        del buf[: end + 2]
+        if not end:
+            out.append(self._finish(keep_alive=True))
+        return True
+
+    def _step_until_eof(self, _: list[RawResponse]) -> bool:
+        self._body.append(bytes(self._buf))
+        self._buf.clear()
+        return False
+
+    _STEPS = (
+        _step_head,
+        _step_length,
+        _step_chunk_size,
+        _step_chunk_data,
+        _step_trailer,
+        _step_until_eof,
+    )
+
+    def feed_eof(self) -> list[RawResponse]:
+        """Signal that the server closed the connection."""
+        if self._state == _UNTIL_EOF:
+            return [self._finish(keep_alive=False)]
+        if self.idle and not self._methods:
+            return []
+        if self._state == _HEAD and not self._buf:
+            msg = "Remote end closed connection without response"
+            raise http.client.RemoteDisconnected(msg)
+        raise http.client.IncompleteRead(b"".join(self._body))
+
+    def _start(self, head: bytes) -> None:
+        version, status, reason, headers = _parse_head(head)
+        if 100 <= status < 200:  # noqa: PLR2004
+            # Interim response (100 Continue...), the real one follows.
+            return
+        method = self._methods.popleft() if self._methods else "GET"
+        self._head = (version, status, reason, headers)
+        self._body = []
+        transfer_encoding = headers.get("Transfer-Encoding", "").lower()
+        content_length = headers.get("Content-Length")
+        if method == "HEAD" or status in (204, 304):
+            self._state, self._remaining = _LENGTH, 0
+        elif "chunked" in transfer_encoding:
+            self._state = _CHUNK_SIZE
+        elif content_length is not None:
+            self._state, self._remaining = _LENGTH, int(content_length)
+        else:
+            self._state = _UNTIL_EOF
+
+    def _finish(self, *, keep_alive: bool) -> RawResponse:
+        assert self._head is not None  # noqa: S101
+        version, status, reason, headers = self._head
+        connection = headers.get("Connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = keep_alive and connection == "keep-alive"
+        else:
+            keep_alive = keep_alive and connection != "close"
+        body = b"".join(self._body)
+        self._head, self._body, self._state = None, [], _HEAD
+        return RawResponse(status, reason, headers, body, keep_alive)
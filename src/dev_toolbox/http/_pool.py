@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import asyncio
+import http.client
+import select
+import socket
+import threading
+import time
+import urllib.parse
+from typing import TYPE_CHECKING
+
+from dev_toolbox.http._http11 import ResponseParser
+from dev_toolbox.http._http11 import build_request
+from dev_toolbox.http._trace import TracedHTTPConnection
+from dev_toolbox.http._trace import TracedHTTPSConnection
+
+if TYPE_CHECKING:
+    import ssl
+    from collections.abc import Mapping
+    from types import TracebackType
+
+    from typing_extensions import Self
+
+    from dev_toolbox.http._http11 import RawResponse
+    from dev_toolbox.http._trace import RequestTrace
+
+    _Key = tuple[str, str, int]
+    _Stream = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_IDEMPOTENT = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"))
+# Errors meaning the server closed a kept-alive connection before we reused it.
+_DISCONNECTED = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+def _split_url(url: str) -> tuple[_Key, str, str]:
+    """Return the pool key, request target and ``Host`` header of ``url``."""
+    parts = urllib.parse.urlsplit(url)
+    key = (parts.scheme, parts.hostname or "", parts.port or _DEFAULT_PORTS.get(parts.scheme, 0))
+    target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+    return key, target, parts.netloc.rpartition("@")[2]
+
+
+class _Slot:
+    __slots__ = ("broken", "busy", "conn", "last_used")
+
+    def __init__(self, conn: TracedHTTPConnection) -> None:
+        self.conn = conn
+        self.busy = True
+        self.broken = False
+        self.last_used = time.monotonic()
+
+    def available(self) -> bool:
+        return not self.busy and not self.broken
+
+    def end(self, complete: bool) -> None:  # noqa: FBT001
+        """
+        ``on_response_end`` of the connection: a connection can only send a new request once its
+        last response was read to the end, one closed or dropped before that is thrown away.
+
+        It may run from a garbage collector pass, so it only sets flags, without taking locks.
+        """
+        if complete:
+            self.last_used = time.monotonic()
+            self.busy = False
+        else:
+            self.broken = True
+
+
+def _is_stale(conn: http.client.HTTPConnection) -> bool:
+    """An idle connection is stale if it was closed or has unexpected data waiting to be read."""
+    if conn.sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of keep-alive ``http.client`` connections, per scheme, host and port.
+
+    Up to ``max_size`` connections are kept per host. A connection goes back to the pool once
+    its response has been read to the end, and is dropped when it has been idle for longer than
+    ``idle_timeout`` seconds or the server closed it. Requests that find every pooled connection
+    busy get a one-off connection. Idempotent requests that fail because a reused connection was
+    closed by the server are retried once on a fresh connection.
+    """
+
+    __slots__ = ("_lock", "_slots", "context", "idle_timeout", "max_size")
+
+    def __init__(
+        self,
+        max_size: int = 10,
+        idle_timeout: float = 60.0,
+        context: ssl.SSLContext | None = None,
+    ) -> None:
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.context = context
+        self._lock = threading.Lock()
+        self._slots: dict[_Key, list[_Slot]] = {}
+
+    def _connect(self, key: _Key, timeout: float | None) -> TracedHTTPConnection:
+        scheme, host, port = key
+        if scheme == "https":
+            return TracedHTTPSConnection(host, port, timeout=timeout, context=self.context)
+        if scheme == "http":
+            return TracedHTTPConnection(host, port, timeout=timeout)
+        msg = f"Unsupported URL scheme {scheme!r}"
+        raise ValueError(msg)
+
+    def _acquire(
+        self, key: _Key, timeout: float | None
+    ) -> tuple[TracedHTTPConnection, _Slot | None, bool]:
+        """Return a connection, its pool slot (None when not pooled) and whether it is reused."""
+        now = time.monotonic()
+        with self._lock:
+            slots = self._slots.setdefault(key, [])
+            for slot in [s for s in slots if s.broken]:
+                slots.remove(slot)
+                slot.conn.close()
+            for slot in [s for s in slots if s.available()]:
+                if now - slot.last_used > self.idle_timeout or _is_stale(slot.conn):
+                    slots.remove(slot)
+                    slot.conn.close()
+                    continue
+                slot.busy = True
+                slot.conn.timeout = timeout
+                slot.conn.sock.settimeout(timeout)
+                return slot.conn, slot, True
+            conn = self._connect(key, timeout)
+            if len(slots) >= self.max_size:
+                return conn, None, False
+            slot = _Slot(conn)
+            slots.append(slot)
+            return conn, slot, False
+
+    def _discard(self, key: _Key, slot: _Slot | None, conn: TracedHTTPConnection) -> None:
+        conn.close()
+        if slot is not None:
+            with self._lock:
+                self._slots[key].remove(slot)
+
+    def urlopen(  # noqa: PLR0913
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: Mapping[str, str] | None = None,
+        timeout: float | None = None,
+        *,
+        trace: RequestTrace | None = None,
+    ) -> http.client.HTTPResponse:
+        """
+        Send a request on a pooled connection and return the response, whatever its status.
+
+        ``trace`` is filled in and finished once the response body has been read.
+        """
+        parts = urllib.parse.urlsplit(url)
+        key = (
+            parts.scheme,
+            parts.hostname or "",
+            parts.port or _DEFAULT_PORTS.get(parts.scheme, 0),
+        )
+        target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        while True:
+            conn, slot, reused = self._acquire(key, timeout)
+            conn.trace = trace
+            conn.on_response_end = None if slot is None else slot.end
+            if trace is not None:
+                trace.begin(reused=reused)
+            request_headers = dict(headers or {})
+            if slot is None:
+                # One-off connection, let the server close it once the response is sent.
+                request_headers["Connection"] = "close"
+            try:
+                if conn.sock is None:
+                    conn.connect()
+                    # Headers and body go out in separate writes, don't let Nagle delay the body.
+                    conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # type: ignore[attr-defined]
+                conn.request(method, target, body=body, headers=request_headers)
+                response = conn.getresponse()
+            except BaseException as e:
+                self._discard(key, slot, conn)
+                if isinstance(e, _DISCONNECTED) and reused and method in _IDEMPOTENT:
+                    continue
+                if trace is not None:
+                    trace.finish(e)
+                raise
+            response.url = url
+            return response
+
+    def close(self) -> None:
+        """Close every idle connection and forget the busy ones."""
+        with self._lock:
+            for slots in self._slots.values():
+                for slot in slots:
+                    if slot.available() or slot.broken:
+                        slot.conn.close()
+            self._slots.clear()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        with self._lock:
+            counts = {f"{s}://{h}:{p}": len(v) for (s, h, p), v in self._slots.items()}
+        return f"{type(self).__name__}(max_size={self.max_size}, connections={counts})"
+
+
+async def _read_response(
+    reader: asyncio.StreamReader, parser: ResponseParser, trace: RequestTrace | None
+) -> RawResponse:
+    responses: list[RawResponse] = []
+    while not responses:
+        data = await reader.read(1 << 16)
+        if trace is not None and data:
+            if trace.ttfb is None:
+                trace.ttfb = time.perf_counter() - trace.start
+            trace.bytes_received += len(data)
+        responses = parser.feed(data) if data else parser.feed_eof()
+    return responses[0]
+
+
+class AsyncConnectionPool:
+    """
+    asyncio counterpart of ``ConnectionPool``, built on ``asyncio.open_connection``.
+
+    Keeps up to ``max_size`` idle keep-alive connections per host and lets at most ``limit``
+    requests be in flight at once across all hosts, so thousands of requests can be gathered
+    without opening thousands of sockets. Responses are read in full before the connection is
+    released. Connections belong to the event loop that opened them, a pool used from a new loop
+    starts over with no connections.
+    """
+
+    __slots__ = ("_idle", "_loop", "_semaphore", "context", "idle_timeout", "limit", "max_size")
+
+    def __init__(
+        self,
+        max_size: int = 10,
+        idle_timeout: float = 60.0,
+        limit: int = 100,
+        context: ssl.SSLContext | None = None,
+    ) -> None:
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.limit = limit
+        self.context = context
+        self._idle: dict[_Key, list[tuple[asyncio.StreamReader, asyncio.StreamWriter, float]]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def _bind(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._semaphore is None:
+            self._idle = {}
+            self._semaphore = asyncio.Semaphore(self.limit)
+            self._loop = loop
+        return self._semaphore
+
+    async def _acquire(self, key: _Key) -> tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]:
+        """Return an open connection to ``key`` and whether it is reused."""
+        idle = self._idle.get(key)
+        now = time.monotonic()
+        while idle:
+            reader, writer, last_used = idle.pop()
+            if now - last_used > self.idle_timeout or reader.at_eof() or writer.is_closing():
+                writer.close()
+                continue
+            return reader, writer, True
+        scheme, host, port = key
+        if scheme == "https":
+            import ssl
+
+            context = self.context or ssl.create_default_context()
+            reader, writer = await asyncio.open_connection(host, port, ssl=context)
+        elif scheme == "http":
+            reader, writer = await asyncio.open_connection(host, port)
+        else:
+            msg = f"Unsupported URL scheme {scheme!r}"
+            raise ValueError(msg)
+        return reader, writer, False
+
+    def _release(
+        self, key: _Key, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_size:
+            idle.append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+
+    async def urlopen(  # noqa: PLR0913
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: Mapping[str, str] | None = None,
+        timeout: float | None = None,
+        *,
+        trace: RequestTrace | None = None,
+    ) -> RawResponse:
+        """
+        Send a request on a pooled connection and return the complete response.
+
+        ``trace`` is filled in and finished with the response. Name resolution, connection and
+        TLS handshake are done in one step by ``asyncio.open_connection``, so ``connect`` covers
+        all three and ``dns`` and ``tls`` stay None.
+        """
+        key, target, host = _split_url(url)
+        request = build_request(method, target, host, headers, body)
+        async with self._bind():
+            try:
+                return await asyncio.wait_for(self._exchange(key, method, request, trace), timeout)
+            except BaseException as e:
+                if trace is not None:
+                    trace.finish(e)
+                raise
+
+    async def _exchange(
+        self, key: _Key, method: str, request: bytes, trace: RequestTrace | None
+    ) -> RawResponse:
+        while True:
+            start = time.perf_counter()
+            reader, writer, reused = await self._acquire(key)
+            if trace is not None:
+                trace.begin(reused=reused)
+                if not reused:
+                    trace.connect = time.perf_counter() - start
+            parser = ResponseParser()
+            parser.expect(method)
+            try:
+                writer.write(request)
+                await writer.drain()
+                if trace is not None:
+                    trace.bytes_sent = len(request)
+                response = await _read_response(reader, parser, trace)
+            except _DISCONNECTED:
+                writer.close()
+                if reused and method in _IDEMPOTENT:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if response.keep_alive:
+                self._release(key, reader, writer)
+            else:
+                writer.close()
+            if trace is not None:
+                trace.status = response.status
+                trace.finish()
+            return response
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        for idle in self._idle.values():
+            for _, writer, _ in idle:
+                writer.close()
+        self._idle.clear()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        counts = {f"{s}://{h}:{p}": len(v) for (s, h, p), v in self._idle.items()}
+        return f"{type(self).__name__}(limit={self.limit}, idle={counts})"
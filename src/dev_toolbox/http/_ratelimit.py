@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import urllib.parse
+from typing import TYPE_CHECKING
+from typing import Generic
+
+from typing_extensions import TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Mapping
+
+    from _typeshed import Incomplete
+    from typing_extensions import Unpack
+
+    from dev_toolbox.http._types import RequestLike
+    from dev_toolbox.http._types import RequestLikeAsync
+    from dev_toolbox.http._types import _CompleteRequestArgs
+
+R = TypeVar("R", default="Incomplete")
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` acquisitions per second on average, with bursts of up to ``capacity``.
+
+    Callers reserve their tokens under a lock and then wait outside of it for as long as the
+    reservation needs, so concurrent callers queue up in order instead of polling, and the
+    bucket can be shared by threads and event loops alike. ``clock`` returns the time in
+    seconds, ``time.monotonic`` unless tests need another one.
+    """
+
+    __slots__ = ("_lock", "_tokens", "_updated", "capacity", "clock", "rate")
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0:
+            msg = f"rate must be positive, got {rate}"
+            raise ValueError(msg)
+        self.rate = rate
+        self.capacity = max(1.0, rate) if capacity is None else capacity
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(rate={self.rate}, capacity={self.capacity})"
+
+    def _reserve(self, tokens: float, timeout: float | None) -> float | None:
+        """Take ``tokens`` and return how long to wait for them, or None past ``timeout``."""
+        with self._lock:
+            now = self.clock()
+            available = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (tokens - available) / self.rate)
+            if timeout is not None and wait > timeout:
+                self._tokens = available
+                return None
+            # The balance goes negative while callers are waiting for their turn.
+            self._tokens = available - tokens
+            return wait
+
+    def _refund(self, tokens: float) -> None:
+        """Give back tokens reserved by a caller that stopped waiting for them."""
+        with self._lock:
+            self._tokens += tokens
+
+    def acquire(self, tokens: float = 1, timeout: float | None = None) -> bool:
+        """Block until ``tokens`` are available, False if that would take over ``timeout``."""
+        wait = self._reserve(tokens, timeout)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    async def aacquire(self, tokens: float = 1, timeout: float | None = None) -> bool:
+        """Same as ``acquire`` without blocking the event loop."""
+        wait = self._reserve(tokens, timeout)
+        if wait is None:
+            return False
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._refund(tokens)
+                raise
+        return True
+
+
+class RateLimiter:
+    """
+    One ``TokenBucket`` per host, ``rate`` requests per second unless set in ``per_host``.
+
+    ``per_host`` maps a host (``netloc`` of the url, e.g. ``pypi.org`` or ``localhost:8080``)
+    to its rate or to a ``(rate, capacity)`` pair.
+    """
+
+    __slots__ = ("_buckets", "_lock", "capacity", "per_host", "rate")
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        *,
+        per_host: Mapping[str, float | tuple[float, float]] | None = None,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.per_host = dict(per_host or {})
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(rate={self.rate}, capacity={self.capacity}, "
+            f"per_host={self.per_host!r})"
+        )
+
+    def bucket(self, url: str) -> TokenBucket:
+        """The bucket of the host of ``url``, which may also be a bare host."""
+        host = urllib.parse.urlsplit(url).netloc or url
+        bucket = self._buckets.get(host)
+        if bucket is not None:
+            return bucket
+        with self._lock:
+            if host not in self._buckets:
+                limit = self.per_host.get(host, self.rate)
+                rate, capacity = limit if isinstance(limit, tuple) else (limit, self.capacity)
+                self._buckets[host] = TokenBucket(rate, capacity)
+            return self._buckets[host]
+
+    def acquire(self, url: str, tokens: float = 1, timeout: float | None = None) -> bool:
+        return self.bucket(url).acquire(tokens, timeout)
+
+    async def aacquire(self, url: str, tokens: float = 1, timeout: float | None = None) -> bool:
+        return await self.bucket(url).aacquire(tokens, timeout)
+
+
+class _RateLimited(Generic[R]):
+    __slots__ = ("client", "limiter")
+
+    def __init__(self, client: Incomplete, limiter: RateLimiter) -> None:
+        self.client = client
+        self.limiter = limiter
+
+    def __getattr__(self, name: str) -> Incomplete:
+        return getattr(self.client, name)
+
+    def _url(self, url: str) -> str:
+        base_url = getattr(self.client, "base_url", None)
+        return urllib.parse.urljoin(base_url or "", url)
+
+
+class RateLimitedClient(_RateLimited[R]):
+    """
+    Wraps a ``RequestLike`` client so requests wait for a token of their host's bucket.
+
+    Wrap it in a ``RetryingClient`` rather than the other way around so that retries are
+    rate limited too. Other attributes are passed through to the wrapped client.
+    """
+
+    __slots__ = ()
+
+    client: RequestLike[R]
+
+    def __init__(self, client: RequestLike[R], limiter: RateLimiter) -> None:
+        super().__init__(client, limiter)
+
+    def request(self, **kwargs: Unpack[_CompleteRequestArgs]) -> R:
+        self.limiter.acquire(self._url(kwargs["url"]))
+        return self.client.request(**kwargs)
+
+
+class AsyncRateLimitedClient(_RateLimited[R]):
+    """``RateLimitedClient`` for ``RequestLikeAsync`` clients."""
+
+    __slots__ = ()
+
+    client: RequestLikeAsync[R]
+
+    def __init__(self, client: RequestLikeAsync[R], limiter: RateLimiter) -> None:
+        super().__init__(client, limiter)
+
+    async def request(self, **kwargs: Unpack[_CompleteRequestArgs]) -> R:
+        await self.limiter.aacquire(self._url(kwargs["url"]))
+        return await self.client.request(**kwargs)
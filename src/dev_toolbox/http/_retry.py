@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import http.client
+import random
+import threading
+import time
+import urllib.parse
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Generic
+from typing import NamedTuple
+
+from typing_extensions import TypeVar
+
+from dev_toolbox.http._cache import _http_date
+from dev_toolbox.http._errors import CircuitOpenError
+from dev_toolbox.http._pool import _IDEMPOTENT
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from _typeshed import Incomplete
+    from typing_extensions import Unpack
+
+    from dev_toolbox.http._types import RequestLike
+    from dev_toolbox.http._types import RequestLikeAsync
+    from dev_toolbox.http._types import _CompleteRequestArgs
+
+R = TypeVar("R", default="Incomplete")
+
+# Errors raised before any response was received, worth trying again.
+_TRANSIENT = (OSError, http.client.HTTPException)
+
+
+class RetryPolicy(NamedTuple):
+    """
+    When and how long to wait before sending a failed request again.
+
+    Requests whose method is in ``methods`` are retried up to ``total`` times after a connection
+    error or a response with a status in ``statuses``. The wait before retry ``n`` (from 0) is
+    ``backoff_factor * 2 ** n`` capped at ``backoff_max``, drawn uniformly from ``[0, wait]``
+    when ``jitter`` is set so that clients failing together do not retry together. A
+    ``Retry-After`` header takes precedence, and a server asking to wait longer than
+    ``retry_after_max`` seconds is not retried at all.
+    """
+
+    total: int = 3
+    backoff_factor: float = 0.5
+    backoff_max: float = 30.0
+    jitter: bool = True
+    statuses: frozenset[int] = frozenset((429, 502, 503, 504))
+    methods: frozenset[str] = _IDEMPOTENT
+    retry_after_max: float = 120.0
+
+    def backoff(self, attempt: int) -> float:
+        wait = min(self.backoff_max, self.backoff_factor * 2**attempt)
+        return random.uniform(0, wait) if self.jitter else wait  # noqa: S311
+
+    def retry_after(self, headers: http.client.HTTPMessage | None) -> float | None:
+        """Seconds to wait according to ``Retry-After``, or None without a valid one."""
+        value = (headers.get("Retry-After") or "").strip() if headers is not None else ""
+        if value.isdigit():
+            return float(value)
+        date = _http_date(value)
+        return None if date is None else max(0.0, date - time.time())
+
+    def delay(self, attempt: int, headers: http.client.HTTPMessage | None = None) -> float | None:
+        """Seconds to wait before retry ``attempt``, or None when it should not be retried."""
+        if attempt >= self.total:
+            return None
+        retry_after = self.retry_after(headers)
+        if retry_after is None:
+            return self.backoff(attempt)
+        return retry_after if retry_after <= self.retry_after_max else None
+
+
+class _Circuit:
+    __slots__ = ("failures", "opened_at", "probing")
+
+    def __init__(self) -> None:
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+
+class CircuitBreaker:
+    """
+    Per host circuit breaker, shared between threads and event loops.
+
+    After ``failure_threshold`` consecutive failures the circuit of a host opens and requests to
+    it fail fast with ``CircuitOpenError`` for ``reset_timeout`` seconds. Then a single request
+    is let through: the circuit closes if it succeeds and opens again if it fails. ``clock``
+    returns the time in seconds, ``time.monotonic`` unless tests need another one.
+    """
+
+    __slots__ = ("_circuits", "_lock", "clock", "failure_threshold", "reset_timeout")
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._circuits: dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(failure_threshold={self.failure_threshold}, "
+            f"reset_timeout={self.reset_timeout})"
+        )
+
+    def state(self, host: str) -> str:
+        """``"closed"``, ``"open"`` or ``"half-open"``."""
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or circuit.opened_at is None:
+                return "closed"
+            if circuit.probing or self.clock() - circuit.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_request(self, host: str) -> bool:
+        """
+        Raise ``CircuitOpenError`` unless a request to ``host`` may be sent now.
+
+        Returns True when the request is the probe of a half-open circuit, whose caller must
+        ``record`` its outcome or ``release`` it.
+        """
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or circuit.opened_at is None:
+                return False
+            retry_in = circuit.opened_at + self.reset_timeout - self.clock()
+            if retry_in > 0 or circuit.probing:
+                raise CircuitOpenError(host, max(retry_in, 0.0))
+            circuit.probing = True
+            return True
+
+    def release(self, host: str) -> None:
+        """Let another probe through after one that ended without a verdict on the host."""
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is not None:
+                circuit.probing = False
+
+    def record(self, host: str, *, success: bool) -> None:
+        with self._lock:
+            circuit = self._circuits.setdefault(host, _Circuit())
+            circuit.probing = False
+            if success:
+                circuit.failures = 0
+                circuit.opened_at = None
+                return
+            circuit.failures += 1
+            if circuit.opened_at is not None or circuit.failures >= self.failure_threshold:
+                circuit.opened_at = self.clock()
+
+
+def _status(response: Any, error: BaseException | None) -> tuple[int | None, Any]:  # noqa: ANN401
+    source = response if error is None else error
+    status = getattr(source, "status_code", None) or getattr(source, "code", None)
+    return (status if isinstance(status, int) else None), getattr(source, "headers", None)
+
+
+def _discard(response: Any, error: BaseException | None) -> None:  # noqa: ANN401
+    """Consume a response that will be retried, so a pooled connection can be reused."""
+    read = getattr(response if error is None else error, "read", None)
+    if callable(read):
+        with contextlib.suppress(Exception):
+            read()
+
+
+class _Retrying(Generic[R]):
+    __slots__ = ("breaker", "client", "policy")
+
+    def __init__(
+        self,
+        client: Any,  # noqa: ANN401
+        policy: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.client = client
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        return getattr(self.client, name)
+
+    def _host(self, url: str) -> str:
+        base_url = getattr(self.client, "base_url", None)
+        return urllib.parse.urlsplit(urllib.parse.urljoin(base_url or "", url)).netloc
+
+    def _outcome(
+        self,
+        host: str,
+        method: str,
+        attempt: int,
+        response: R | None,
+        error: Exception | None,
+    ) -> float | None:
+        """Record the outcome of an attempt, return the delay before the next one or None."""
+        status, headers = _status(response, error)
+        if error is not None and status is None and not isinstance(error, _TRANSIENT):
+            return None
+        retryable = status is None or status in self.policy.statuses
+        if self.breaker is not None:
+            self.breaker.record(host, success=not retryable and (status or 0) < 500)  # noqa: PLR2004
+        if not retryable or method not in self.policy.methods:
+            return None
+        delay = self.policy.delay(attempt, headers)
+        if delay is not None:
+            _discard(response, error)
+        return delay
+
+
+class RetryingClient(_Retrying[R]):
+    """
+    Wraps a ``RequestLike`` client to retry failed requests according to a ``RetryPolicy``.
+
+    With a ``CircuitBreaker``, connection errors and 5xx or retryable statuses count as failures
+    of the request's host, and requests to a host whose circuit is open raise
+    ``CircuitOpenError`` without being sent. Once retries are exhausted the last response is
+    returned, use ``raise_for_status`` to turn it into an ``HTTPError``, or the last error is
+    raised. Other attributes are passed through to the wrapped client.
+    """
+
+    __slots__ = ()
+
+    client: RequestLike[R]
+
+    def __init__(
+        self,
+        client: RequestLike[R],
+        policy: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        super().__init__(client, policy, breaker)
+
+    def request(self, **kwargs: Unpack[_CompleteRequestArgs]) -> R:
+        host = self._host(kwargs["url"])
+        attempt = 0
+        while True:
+            probe = self.breaker is not None and self.breaker.before_request(host)
+            response, error = None, None
+            try:
+                try:
+                    response = self.client.request(**kwargs)
+                except Exception as e:  # noqa: BLE001
+                    error = e
+                delay = self._outcome(host, kwargs["method"], attempt, response, error)
+            finally:
+                # Errors that say nothing about the host, and cancellation, must not leave the
+                # circuit half-open with a probe that never reports back.
+                if probe:
+                    self.breaker.release(host)  # type: ignore[union-attr]
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response  # type: ignore[return-value]
+            time.sleep(delay)
+            attempt += 1
+
+
+class AsyncRetryingClient(_Retrying[R]):
+    """``RetryingClient`` for ``RequestLikeAsync`` clients, waiting with ``asyncio.sleep``."""
+
+    __slots__ = ()
+
+    client: RequestLikeAsync[R]
+
+    def __init__(
+        self,
+        client: RequestLikeAsync[R],
+        policy: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        super().__init__(client, policy, breaker)
+
+    async def request(self, **kwargs: Unpack[_CompleteRequestArgs]) -> R:
+        host = self._host(kwargs["url"])
+        attempt = 0
+        while True:
+            probe = self.breaker is not None and self.breaker.before_request(host)
+            response, error = None, None
+            try:
+                try:
+                    response = await self.client.request(**kwargs)
+                except Exception as e:  # noqa: BLE001
+                    error = e
+                delay = self._outcome(host, kwargs["method"], attempt, response, error)
+            finally:
+                # Errors that say nothing about the host, and cancellation, must not leave the
+                # circuit half-open with a probe that never reports back.
+                if probe:
+                    self.breaker.release(host)  # type: ignore[union-attr]
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response  # type: ignore[return-value]
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,468 @@
+"""
+Per request timings and byte counts, reported to hooks once the response body has been read.
+
+``RequestTrace`` is filled in by the ``http.client`` connection and response classes defined
+here, used by ``ConnectionPool`` and by ``GreatValueRequests`` when it has hooks.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import contextvars
+import functools
+import http.client
+import io
+import logging
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from collections.abc import Sequence
+
+    TraceHook = Callable[["RequestTrace"], None]
+
+logger = logging.getLogger(__name__)
+
+_active_hooks: contextvars.ContextVar[tuple[TraceHook, ...]] = contextvars.ContextVar(
+    "dev_toolbox_http_trace_hooks", default=()
+)
+
+PHASES = ("dns", "connect", "tls", "ttfb", "total")
+
+
+class RequestTrace:
+    """
+    Where the time of one HTTP exchange went.
+
+    ``dns``, ``connect`` and ``tls`` are the durations of those steps, None when the connection
+    was reused (or for ``tls``, not encrypted). ``ttfb`` (time to first byte) and ``total`` are
+    measured from the start of the request, ``total`` ending when the body has been read to the
+    end or the response closed. ``bytes_sent`` and ``bytes_received`` count what went through
+    the socket, headers included. Durations are in seconds.
+    """
+
+    __slots__ = (
+        "_finished",
+        "bytes_received",
+        "bytes_sent",
+        "connect",
+        "dns",
+        "error",
+        "hooks",
+        "method",
+        "reused",
+        "start",
+        "status",
+        "tls",
+        "total",
+        "ttfb",
+        "url",
+    )
+
+    def __init__(self, method: str, url: str, hooks: Sequence[TraceHook]) -> None:
+        self.method = method
+        self.url = url
+        self.hooks = tuple(hooks)
+        self.start = time.perf_counter()
+        self.status: int | None = None
+        self.error: BaseException | None = None
+        self.total: float | None = None
+        self._finished = False
+        self.begin(reused=False)
+
+    def begin(self, *, reused: bool) -> None:
+        """Reset what is measured per attempt, before (re)sending the request."""
+        self.reused = reused
+        self.dns: float | None = None
+        self.connect: float | None = None
+        self.tls: float | None = None
+        self.ttfb: float | None = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    @property
+    def host(self) -> str:
+        return urllib.parse.urlsplit(self.url).netloc
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "method": self.method,
+            "url": self.url,
+            "status": self.status,
+            "reused": self.reused,
+            **{phase: getattr(self, phase) for phase in PHASES},
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "error": None if self.error is None else repr(self.error),
+        }
+
+    def __repr__(self) -> str:
+        args = ", ".join(f"{k}={v!r}" for k, v in self.as_dict().items())
+        return f"{type(self).__name__}({args})"
+
+    def finish(self, error: BaseException | None = None) -> None:
+        """Record the end of the exchange and call the hooks, only the first time."""
+        if self._finished:
+            return
+        self._finished = True
+        self.total = time.perf_counter() - self.start
+        self.error = error
+        for hook in self.hooks:
+            try:
+                hook(self)
+            except Exception:  # noqa: PERF203
+                logger.exception("Trace hook %r failed", hook)
+
+
+def active_hooks() -> tuple[TraceHook, ...]:
+    return _active_hooks.get()
+
+
+@contextlib.contextmanager
+def trace_requests(*hooks: TraceHook) -> Iterator[None]:
+    """Report every request traced in this context (thread or task) to ``hooks`` as well."""
+    token = _active_hooks.set((*_active_hooks.get(), *hooks))
+    try:
+        yield
+    finally:
+        _active_hooks.reset(token)
+
+
+class _CountingReader(io.RawIOBase):
+    """Raw socket reader recording the first byte and the bytes received, finishes on close."""
+
+    def __init__(self, raw: io.RawIOBase, trace: RequestTrace) -> None:
+        self._raw = raw
+        self._trace = trace
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: memoryview) -> int | None:  # type: ignore[override]
+        n = self._raw.readinto(buffer)
+        trace = self._trace
+        if n:
+            if trace.ttfb is None:
+                trace.ttfb = time.perf_counter() - trace.start
+            trace.bytes_received += n
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self._raw.close()
+            finally:
+                super().close()
+                self._trace.finish()
+
+
+class _Response(http.client.HTTPResponse):
+    """``HTTPResponse`` calling ``on_end`` once, with whether its body was read to the end."""
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        debuglevel: int = 0,
+        method: str | None = None,
+        url: str | None = None,
+        *,
+        on_end: Callable[[bool], None] | None = None,
+    ) -> None:
+        super().__init__(sock, debuglevel, method, url)
+        self.on_end = on_end
+
+    def _end(self, *, complete: bool) -> None:
+        on_end, self.on_end = self.on_end, None
+        if on_end is not None:
+            on_end(complete)
+
+    def _close_conn(self) -> None:
+        # Called by the read methods once the body has been received, and by ``close``.
+        super()._close_conn()  # type: ignore[misc]
+        self._end(complete=True)
+
+    def close(self) -> None:
+        # Also reached when the response is garbage collected unread.
+        self._end(complete=self.fp is None or (not self.chunked and self.length == 0))
+        super().close()
+
+
+class _TracedResponse(_Response):
+    def __init__(  # noqa: PLR0913
+        self,
+        sock: socket.socket,
+        debuglevel: int = 0,
+        method: str | None = None,
+        url: str | None = None,
+        *,
+        trace: RequestTrace,
+        on_end: Callable[[bool], None] | None = None,
+    ) -> None:
+        super().__init__(sock, debuglevel, method, url, on_end=on_end)
+        self.trace = trace
+        self.fp.close()
+        raw = sock.makefile("rb", buffering=0)
+        self.fp = io.BufferedReader(_CountingReader(raw, trace))
+
+    def begin(self) -> None:
+        super().begin()
+        self.trace.status = self.status
+
+
+class TracedHTTPConnection(http.client.HTTPConnection):
+    """
+    ``HTTPConnection`` filling in its ``trace`` attribute when one is set.
+
+    ``on_response_end`` is passed to the next response, see ``_Response``. When it is set the
+    connection does not keep a reference to that response, so an abandoned response can be
+    garbage collected and report itself.
+    """
+
+    trace: RequestTrace | None = None
+    on_response_end: Callable[[bool], None] | None = None
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(*args, **kwargs)
+        self._create_connection = self._timed_create_connection
+
+    def _timed_create_connection(
+        self,
+        address: tuple[str, int],
+        timeout: float | None,
+        source_address: tuple[str, int] | None = None,
+    ) -> socket.socket:
+        trace = self.trace
+        if trace is None:
+            return socket.create_connection(address, timeout, source_address)
+        host, port = address
+        start = time.perf_counter()
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        trace.dns = resolved - start
+        error: OSError | None = None
+        for *_, sockaddr in infos:
+            try:
+                sock = socket.create_connection(sockaddr[:2], timeout, source_address)  # type: ignore[arg-type]
+            except OSError as e:  # noqa: PERF203
+                error = e
+            else:
+                trace.connect = time.perf_counter() - resolved
+                return sock
+        raise error or OSError(f"getaddrinfo returned nothing for {host}")
+
+    def connect(self) -> None:
+        trace = self.trace
+        start = time.perf_counter()
+        super().connect()
+        if trace is not None and isinstance(self, http.client.HTTPSConnection):
+            elapsed = time.perf_counter() - start
+            trace.tls = elapsed - (trace.dns or 0) - (trace.connect or 0)
+
+    def send(self, data: Any) -> None:  # noqa: ANN401
+        if self.trace is not None and isinstance(data, (bytes, bytearray, memoryview)):
+            self.trace.bytes_sent += len(data)
+        super().send(data)
+
+    def getresponse(self) -> http.client.HTTPResponse:
+        trace, on_end = self.trace, self.on_response_end
+        response_class: Any = (
+            functools.partial(_Response, on_end=on_end)
+            if trace is None
+            else functools.partial(_TracedResponse, trace=trace, on_end=on_end)
+        )
+        self.response_class = response_class
+        response = super().getresponse()
+        if on_end is not None:
+            # Sending the next request is up to the owner of on_end, once the response ended.
+            self._HTTPConnection__response = None
+        return response
+
+
+class TracedHTTPSConnection(TracedHTTPConnection, http.client.HTTPSConnection):
+    pass
+
+
+def _traced(cls: type[TracedHTTPConnection], trace: RequestTrace) -> Callable[..., Any]:
+    def factory(*args: Any, **kwargs: Any) -> TracedHTTPConnection:  # noqa: ANN401
+        conn = cls(*args, **kwargs)
+        conn.trace = trace
+        return conn
+
+    return factory
+
+
+def _opening(
+    handler: urllib.request.AbstractHTTPHandler,
+    cls: type[TracedHTTPConnection],
+    req: urllib.request.Request,
+    hooks: Sequence[TraceHook],
+    **kwargs: Any,  # noqa: ANN401
+) -> http.client.HTTPResponse:
+    # Redirects come back through the opener, so every request gets its own trace.
+    trace = RequestTrace(req.get_method(), req.full_url, hooks)
+    try:
+        return handler.do_open(_traced(cls, trace), req, **kwargs)
+    except BaseException as e:
+        trace.finish(e)
+        raise
+
+
+def traced_opener(hooks: Sequence[TraceHook]) -> urllib.request.OpenerDirector:
+    """An ``urlopen`` equivalent tracing every request to ``hooks``."""
+
+    class _HTTPHandler(urllib.request.HTTPHandler):
+        def http_open(self, req: urllib.request.Request) -> http.client.HTTPResponse:
+            return _opening(self, TracedHTTPConnection, req, hooks)
+
+    class _HTTPSHandler(urllib.request.HTTPSHandler):
+        def https_open(self, req: urllib.request.Request) -> http.client.HTTPResponse:
+            return _opening(
+                self,
+                TracedHTTPSConnection,
+                req,
+                hooks,
+                context=self._context,  # type: ignore[attr-defined]
+                check_hostname=self._check_hostname,  # type: ignore[attr-defined]
+            )
+
+    return urllib.request.build_opener(_HTTPHandler, _HTTPSHandler)
+
+
+_DEFAULT_BOUNDS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class _Series:
+    __slots__ = ("counts", "max", "sum")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class TraceHistogram:
+    """
+    Hook aggregating traces into in-memory histograms, per host and phase.
+
+    Each phase of ``PHASES`` gets counts per bucket of ``bounds`` (upper bounds in seconds, the
+    last bucket catches everything slower). ``summary`` estimates percentiles for a quick
+    table, ``export`` returns the raw counts in a JSON friendly form.
+    """
+
+    __slots__ = ("_bytes", "_errors", "_lock", "_series", "bounds")
+
+    def __init__(self, bounds: Sequence[float] = _DEFAULT_BOUNDS) -> None:
+        self.bounds = tuple(sorted(bounds))
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, str], _Series] = {}
+        self._bytes: dict[str, list[int]] = {}
+        self._errors: dict[str, int] = {}
+
+    def __repr__(self) -> str:
+        with self._lock:
+            return f"{type(self).__name__}(series={len(self._series)})"
+
+    def __call__(self, trace: RequestTrace) -> None:
+        host = trace.host
+        with self._lock:
+            for phase in PHASES:
+                value = getattr(trace, phase)
+                if value is None:
+                    continue
+                series = self._series.get((host, phase))
+                if series is None:
+                    series = self._series[host, phase] = _Series(len(self.bounds) + 1)
+                series.counts[bisect.bisect_left(self.bounds, value)] += 1
+                series.sum += value
+                series.max = max(series.max, value)
+            sent_received = self._bytes.setdefault(host, [0, 0])
+            sent_received[0] += trace.bytes_sent
+            sent_received[1] += trace.bytes_received
+            if trace.error is not None:
+                self._errors[host] = self._errors.get(host, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._bytes.clear()
+            self._errors.clear()
+
+    def _quantile(self, series: _Series, q: float) -> float:
+        """The ``q`` quantile, interpolated linearly within the bucket holding it."""
+        rank = q * sum(series.counts)
+        seen = 0
+        lower = 0.0
+        for bound, count in zip((*self.bounds, series.max), series.counts):
+            if count and seen + count >= rank:
+                upper = min(bound, series.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return series.max
+
+    def summary(self) -> list[dict[str, Any]]:
+        """One row per host and phase with count, mean and estimated percentiles in ms."""
+        rows = []
+        with self._lock:
+            for (host, phase), series in sorted(
+                self._series.items(), key=lambda x: (x[0][0], PHASES.index(x[0][1]))
+            ):
+                count = sum(series.counts)
+                rows.append(
+                    {
+                        "host": host,
+                        "phase": phase,
+                        "count": count,
+                        "mean_ms": round(series.sum / count * 1e3, 3),
+                        **{
+                            f"p{q}_ms": round(self._quantile(series, q / 100) * 1e3, 3)
+                            for q in (50, 90, 99)
+                        },
+                        "max_ms": round(series.max * 1e3, 3),
+                    }
+                )
+        return rows
+
+    def export(self) -> dict[str, Any]:
+        """Bucket bounds, then counts, sum and max per host and phase, plus bytes and errors."""
+        with self._lock:
+            return {
+                "bounds": list(self.bounds),
+                "hosts": {
+                    host: {
+                        "phases": {
+                            phase: {"counts": s.counts[:], "sum": s.sum, "max": s.max}
+                            for (h, phase), s in self._series.items()
+                            if h == host
+                        },
+                        "bytes_sent": sent,
+                        "bytes_received": received,
+                        "errors": self._errors.get(host, 0),
+                    }
+                    for host, (sent, received) in self._bytes.items()
+                },
+            }
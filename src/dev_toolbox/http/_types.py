@@ -37,6 +37,18 @@ if TYPE_CHECKING:
         params: NotRequired[_Params]
         timeout: NotRequired[float | None]
 
+    class _RequestOverrides(TypedDict, total=False):  # noqa: PYI049
+        url: str
+        method: HTTP_METHOD
+        auth: tuple[str, str] | None
+        cookies: dict[str, str] | None
+        data: Mapping[str, Any] | None
+        files: Mapping[str, _FileSpec]
+        headers: Mapping[str, Any] | None
+        json: Any | None
+        params: _Params
+        timeout: float | None
+
     class ResponseLike(Protocol):
         def json(self) -> Any: ...  # noqa: ANN401
 
@@ -1,80 +1,237 @@
 from __future__ import annotations
 
-import json
+import contextlib
+import os
+import tempfile
 import urllib.parse
 from typing import TYPE_CHECKING
 from typing import NamedTuple
 
+from dev_toolbox.http._encoding import accept_encoding
+from dev_toolbox.http._encoding import decode_body
+from dev_toolbox.http._encoding import decode_response
+from dev_toolbox.http._encoding import decoded_headers
+from dev_toolbox.http._errors import _raise_for_status
+from dev_toolbox.http._trace import RequestTrace
+from dev_toolbox.http._trace import active_hooks
+from dev_toolbox.http._trace import traced_opener
+from dev_toolbox.json_backend import dump_bytes
+from dev_toolbox.json_backend import loads
+
 if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+    from http.client import HTTPMessage
     from http.client import HTTPResponse
 
     from _typeshed import Incomplete
     from typing_extensions import Unpack
 
+    from dev_toolbox.http._bulk import BulkResult
+    from dev_toolbox.http._http11 import RawResponse
+    from dev_toolbox.http._pool import ConnectionPool
+    from dev_toolbox.http._trace import TraceHook
     from dev_toolbox.http._types import _CompleteRequestArgs
     from dev_toolbox.http._types import _Params
 
+_MAX_REDIRECTS = 10
+_REDIRECT_CODES = frozenset((301, 302, 303, 307, 308))
+
+
+def _construct_url(base_url: str | None, endpoint: str, params: _Params) -> str:
+    if base_url is not None and not endpoint.startswith("http"):
+        endpoint = urllib.parse.urljoin(base_url, endpoint)
+    if params is not None:
+        encoded = urllib.parse.urlencode(params)
+        endpoint += "?" + encoded
+    return endpoint
+
+
+def _prepare(
+    base_url: str | None,
+    default_headers: dict[str, str] | None,
+    kwargs: _CompleteRequestArgs,
+    construct_url: Callable[[str | None, str, _Params], str] = _construct_url,
+) -> tuple[str, str, dict[str, str], bytes | None]:
+    """Return the final url, method, headers and body of a request."""
+    final_url = construct_url(base_url, kwargs["url"], kwargs.get("params"))
+
+    headers = {
+        k.upper(): v
+        for k, v in (*(default_headers or {}).items(), *(kwargs.get("headers") or {}).items())
+    }
+    if "ACCEPT-ENCODING" not in headers:
+        headers["ACCEPT-ENCODING"] = accept_encoding()
+
+    if kwargs.get("data") and kwargs.get("json"):
+        msg = "Cannot set both 'data' and 'json'"
+        raise ValueError(msg)
+
+    data = kwargs.get("data")
+
+    json_content = kwargs.get("json")
+    if json_content is not None:
+        if "CONTENT-TYPE" not in headers:
+            headers["CONTENT-TYPE"] = "application/json"
+        data = dump_bytes(json_content)  # type: ignore[assignment]
+
+    return final_url, kwargs["method"], headers, data  # type: ignore[return-value]
+
+
+def _redirect(
+    status: int,
+    location: str | None,
+    request: tuple[str, str, dict[str, str], bytes | None],
+) -> tuple[str, str, dict[str, str], bytes | None] | None:
+    """
+    Return the request to send next when a response is a redirect, like ``urlopen`` does.
+
+    Requests are ``(url, method, headers, data)`` tuples as returned by ``_prepare``.
+    """
+    url, method, headers, data = request
+    if status not in _REDIRECT_CODES or location is None:
+        return None
+    url = urllib.parse.urljoin(url, location)
+    if status == 303 or (status in (301, 302) and method == "POST"):  # noqa: PLR2004
+        method, data = "GET", None
+        headers = {k: v for k, v in headers.items() if k not in ("CONTENT-TYPE", "CONTENT-LENGTH")}
+    return url, method, headers, data
+
 
 class GreatValueResponse(NamedTuple):
     response: HTTPResponse
 
+    @property
+    def status_code(self) -> int:
+        return self.response.status
+
+    @property
+    def headers(self) -> HTTPMessage:
+        return self.response.headers
+
+    def read(self) -> bytes:
+        return self.response.read()
+
     def json(self) -> Incomplete:
         content = self.response.read()
-        return json.loads(content)
+        return loads(content)
+
+    def iter_bytes(self, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """Yield the body in chunks of at most ``chunk_size`` bytes as it is received."""
+        read = self.response.read
+        while chunk := read(chunk_size):
+            yield chunk
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """Yield the lines of the body as they are received, without their line endings."""
+        for line in self.response:
+            yield line.rstrip(b"\r\n")
+
+    def save_to(self, path: str | os.PathLike[str], chunk_size: int = 1 << 20) -> int:
+        """
+        Stream the body to ``path`` and return the number of bytes written.
+
+        The body goes through one reusable ``chunk_size`` buffer, so memory use does not depend
+        on the size of the download. It is written to a temporary file renamed over ``path`` once
+        complete, so ``path`` never holds a partial download.
+        """
+        buffer = memoryview(bytearray(chunk_size))
+        readinto = self.response.readinto
+        total = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while n := readinto(buffer):
+                    f.write(buffer[:n])
+                    total += n
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        return total
 
     def raise_for_status(self) -> None:
-        status_code = self.response.status
-        http_error_msg = ""
-        if 400 <= status_code < 500:  # noqa: PLR2004
-            http_error_msg = (
-                f"{status_code} Client Error: {self.response.reason} for url: {self.response.url}"
-            )
+        response = self.response
+        _raise_for_status(response.status, response.reason, response.url, response.headers)
 
-        elif 500 <= status_code < 600:  # noqa: PLR2004
-            http_error_msg = (
-                f"{status_code} Server Error: {self.response.reason} for url: {self.response.url}"
-            )
 
-        if http_error_msg:
-            raise Exception(http_error_msg)  # noqa: TRY002
+class BufferedResponse(NamedTuple):
+    """A response whose body has been read in full, and decompressed."""
+
+    status: int
+    reason: str
+    headers: HTTPMessage
+    content: bytes
+    url: str
+
+    @property
+    def status_code(self) -> int:
+        return self.status
+
+    def read(self) -> bytes:
+        return self.content
+
+    def json(self) -> Incomplete:
+        return loads(self.content)
+
+    def raise_for_status(self) -> None:
+        _raise_for_status(self.status, self.reason, self.url, self.headers)
+
+    @classmethod
+    def from_raw(cls, raw: RawResponse, url: str) -> BufferedResponse:
+        """Build the response from a parsed one, decompressing its body if needed."""
+        encoding = raw.headers.get("Content-Encoding")
+        if encoding is None:
+            return cls(raw.status, raw.reason, raw.headers, raw.body, url)
+        body = decode_body(raw.body, encoding)
+        return cls(raw.status, raw.reason, decoded_headers(raw.headers), body, url)
 
 
 class GreatValueRequests(NamedTuple):
+    """
+    Minimal HTTP client on top of the standard library.
+
+    Compressed responses are negotiated with ``Accept-Encoding`` (gzip, deflate, and brotli when
+    installed) and decompressed while the body is read, unless the request sets its own
+    ``Accept-Encoding``.
+
+    Without a ``pool`` every request goes through ``urllib.request.urlopen``, which opens a new
+    connection each time and raises ``HTTPError`` on 4xx and 5xx statuses. With a
+    ``ConnectionPool`` connections are kept alive and reused between requests to the same host,
+    and every response is returned as is, use ``raise_for_status`` to check it.
+
+    Every request is traced to ``hooks``, and to those of ``trace_requests`` contexts, with a
+    ``RequestTrace`` once its body has been read.
+    """
+
     base_url: str | None = None
     unverifiable: bool = True
     headers: dict[str, str] | None = None
+    pool: ConnectionPool | None = None
+    hooks: tuple[TraceHook, ...] = ()
 
     def construct_url(self, base_url: str | None, endpoint: str, params: _Params) -> str:
-        if base_url is not None and not endpoint.startswith("http"):
-            endpoint = urllib.parse.urljoin(base_url, endpoint)
-        if params is not None:
-            encoded = urllib.parse.urlencode(params)
-            endpoint += "?" + encoded
-        return endpoint
+        return _construct_url(base_url, endpoint, params)
+
+    def prepare(
+        self, **kwargs: Unpack[_CompleteRequestArgs]
+    ) -> tuple[str, str, dict[str, str], bytes | None]:
+        """Return the final url, method, headers and body of a request."""
+        return _prepare(self.base_url, self.headers, kwargs, self.construct_url)
 
     def request(self, **kwargs: Unpack[_CompleteRequestArgs]) -> GreatValueResponse:
-        url = kwargs["url"]
-        method = kwargs["method"]
-        final_url = self.construct_url(self.base_url, url, kwargs.get("params"))
+        final_url, method, headers, data = self.prepare(**kwargs)
+        hooks = (*self.hooks, *active_hooks())
+        if self.pool is not None:
+            response = self._pooled_request(
+                method, final_url, headers, data, kwargs.get("timeout"), hooks=hooks
+            )
+            return GreatValueResponse(response=decode_response(response))
+        import urllib.error
         import urllib.request
 
-        headers = {
-            k.upper(): v
-            for k, v in (*(self.headers or {}).items(), *(kwargs.get("headers") or {}).items())
-        }
-
-        if kwargs.get("data") and kwargs.get("json"):
-            msg = "Cannot set both 'data' and 'json'"
-            raise ValueError(msg)
-
-        data = kwargs.get("data")
-
-        json_content = kwargs.get("json")
-        if json_content is not None:
-            if "CONTENT-TYPE" not in headers:
-                headers["CONTENT-TYPE"] = "application/json"
-            data = json.dumps(json_content).encode("utf-8")  # type: ignore[assignment]
-
         req = urllib.request.Request(  # noqa: S310
             url=final_url,
             data=None,
@@ -83,17 +240,82 @@ class GreatValueRequests(NamedTuple):
             unverifiable=self.unverifiable,
             method=method,
         )
-        response: HTTPResponse = urllib.request.urlopen(  # noqa: S310
-            url=req,
-            data=data,  # type: ignore[arg-type]
-            timeout=kwargs.get("timeout"),
-            # cafile=None,
-            # capath=None,
-            # cadefault=False,
-            # context=None,
+        try:
+            if hooks:
+                response = traced_opener(hooks).open(req, data, kwargs.get("timeout"))
+            else:
+                response = urllib.request.urlopen(  # noqa: S310
+                    url=req,
+                    data=data,
+                    timeout=kwargs.get("timeout"),
+                    # cafile=None,
+                    # capath=None,
+                    # cadefault=False,
+                    # context=None,
+                )
+        except urllib.error.HTTPError as e:
+            # Error statuses raise the same HTTPError as raise_for_status does.
+            e.close()
+            _raise_for_status(e.code, str(e.reason), e.filename, e.headers)  # type: ignore[arg-type]
+            raise
+
+        return GreatValueResponse(response=decode_response(response))
+
+    def bulk_get(
+        self,
+        urls: Iterable[str],
+        *,
+        connections: int = 4,
+        pipeline: int = 8,
+        headers: dict[str, str] | None = None,
+        timeout: float | None = 30.0,
+    ) -> Iterator[BulkResult]:
+        """
+        GET many urls over a few persistent connections per host, driven from one thread.
+
+        Up to ``connections`` connections are opened per host and each carries up to
+        ``pipeline`` requests at once (HTTP/1.1 pipelining, ``pipeline=1`` disables it). Urls
+        and headers go through ``prepare`` like any request, ``urls`` is consumed lazily. Yields
+        a ``BulkResult`` per url as responses complete, ``position`` being the index of the url
+        in ``urls``. A url that could not be fetched gets a result with its ``error`` instead of
+        stopping the others. Redirects are not followed.
+        """
+        from dev_toolbox.http._bulk import bulk_get
+
+        prepared = (self.prepare(method="GET", url=url, headers=headers) for url in urls)
+        return bulk_get(
+            ((final_url, final_headers) for final_url, _, final_headers, _ in prepared),
+            connections=connections,
+            pipeline=pipeline,
+            timeout=timeout,
+            context=self.pool.context if self.pool is not None else None,
         )
 
-        return GreatValueResponse(response=response)
+    def _pooled_request(  # noqa: PLR0913
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        data: bytes | None,
+        timeout: float | None,
+        *,
+        hooks: tuple[TraceHook, ...],
+    ) -> HTTPResponse:
+        """Send the request through ``self.pool``, following redirects like ``urlopen`` does."""
+        assert self.pool is not None  # noqa: S101
+        for _ in range(_MAX_REDIRECTS + 1):
+            trace = RequestTrace(method, url, hooks) if hooks else None
+            response = self.pool.urlopen(method, url, data, headers, timeout, trace=trace)
+            follow = _redirect(
+                response.status, response.getheader("Location"), (url, method, headers, data)
+            )
+            if follow is None:
+                return response
+            # Drain the body so the connection goes back to the pool.
+            response.read()
+            url, method, headers, data = follow
+        msg = f"Too many redirects, last url: {url}"
+        raise ValueError(msg)
 
 
 gv_request = GreatValueRequests()
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from typing import NamedTuple
+
+from dev_toolbox.http._pool import AsyncConnectionPool
+from dev_toolbox.http._trace import RequestTrace
+from dev_toolbox.http._trace import active_hooks
+from dev_toolbox.http.great_value import _MAX_REDIRECTS
+from dev_toolbox.http.great_value import BufferedResponse
+from dev_toolbox.http.great_value import _prepare
+from dev_toolbox.http.great_value import _redirect
+
+if TYPE_CHECKING:
+    from typing_extensions import Unpack
+
+    from dev_toolbox.http._trace import TraceHook
+    from dev_toolbox.http._types import _CompleteRequestArgs
+
+
+# Responses of the async client are read in full, like those of ``bulk_get``.
+GreatValueAsyncResponse = BufferedResponse
+
+
+class AsyncGreatValueRequests(NamedTuple):
+    """
+    asyncio counterpart of ``GreatValueRequests``, satisfying ``RequestLikeAsync``.
+
+    Requests go through ``pool``, or a pool shared by every client created without one, which
+    keeps connections alive and caps the number of requests in flight. Redirects are followed
+    and every response is returned as is, use ``raise_for_status`` to check it.
+
+    Every request is traced to ``hooks``, and to those of ``trace_requests`` contexts, with a
+    ``RequestTrace``. Followed redirects are traced as separate requests.
+    """
+
+    base_url: str | None = None
+    headers: dict[str, str] | None = None
+    pool: AsyncConnectionPool | None = None
+    hooks: tuple[TraceHook, ...] = ()
+
+    async def request(self, **kwargs: Unpack[_CompleteRequestArgs]) -> GreatValueAsyncResponse:
+        url, method, headers, data = _prepare(self.base_url, self.headers, kwargs)
+        pool = self.pool or _shared_pool
+        hooks = (*self.hooks, *active_hooks())
+        for _ in range(_MAX_REDIRECTS + 1):
+            trace = RequestTrace(method, url, hooks) if hooks else None
+            raw = await pool.urlopen(method, url, data, headers, kwargs.get("timeout"), trace=trace)
+            follow = _redirect(
+                raw.status, raw.headers.get("Location"), (url, method, headers, data)
+            )
+            if follow is None:
+                return GreatValueAsyncResponse.from_raw(raw, url)
+            url, method, headers, data = follow
+        msg = f"Too many redirects, last url: {url}"
+        raise ValueError(msg)
+
+
+_shared_pool = AsyncConnectionPool()
+agv_request = AsyncGreatValueRequests()
@@ -0,0 +1,185 @@
+"""
+One JSON layer for the whole package.
+
+``loads``, ``dumps`` and ``dump_bytes`` use the fastest backend that is installed (orjson, msgspec,
+ujson, then the standard library). Set ``DEV_TOOLBOX_JSON_BACKEND`` or call ``set_backend`` to
+force one. Every backend raises a ``ValueError`` subclass on invalid input, and ``indent=True``
+pretty prints with two spaces.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import NamedTuple
+
+if TYPE_CHECKING:
+    from typing_extensions import Protocol
+
+    class _Dumps(Protocol):
+        def __call__(self, obj: Any, *, indent: bool = ..., sort_keys: bool = ...) -> bytes: ...  # noqa: ANN401
+
+
+ENV_VAR = "DEV_TOOLBOX_JSON_BACKEND"
+
+
+class JsonBackend(NamedTuple):
+    name: str
+    loads: Callable[[str | bytes | bytearray], Any]
+    dump_bytes: _Dumps
+
+    def dumps(self, obj: Any, *, indent: bool = False, sort_keys: bool = False) -> str:  # noqa: ANN401
+        return self.dump_bytes(obj, indent=indent, sort_keys=sort_keys).decode("utf-8")
+
+
+def _stdlib() -> JsonBackend:
+    import json
+
+    def dump_bytes(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:  # noqa: ANN401
+        return json.dumps(
+            obj, indent=2 if indent else None, sort_keys=sort_keys, ensure_ascii=False
+        ).encode("utf-8")
+
+    return JsonBackend("json", json.loads, dump_bytes)
+
+
+def _orjson() -> JsonBackend:
+    import orjson  # type: ignore[import-not-found,unused-ignore]
+
+    def dump_bytes(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:  # noqa: ANN401
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option)  # type: ignore[no-any-return,unused-ignore]
+
+    return JsonBackend("orjson", orjson.loads, dump_bytes)
+
+
+def _msgspec() -> JsonBackend:
+    import msgspec  # type: ignore[import-not-found,unused-ignore]
+
+    encoders = {
+        False: msgspec.json.Encoder(),
+        True: msgspec.json.Encoder(order="sorted"),
+    }
+
+    decode = msgspec.json.Decoder().decode
+
+    def loads(data: str | bytes | bytearray) -> Any:  # noqa: ANN401
+        try:
+            return decode(data)
+        except msgspec.DecodeError as e:
+            # msgspec errors do not derive from ValueError like the other backends.
+            raise ValueError(str(e)) from e
+
+    def dump_bytes(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:  # noqa: ANN401
+        ret: bytes = encoders[sort_keys].encode(obj)
+        return msgspec.json.format(ret, indent=2) if indent else ret  # type: ignore[no-any-return,unused-ignore]
+
+    return JsonBackend("msgspec", loads, dump_bytes)
+
+
+def _ujson() -> JsonBackend:
+    import ujson  # type: ignore[import-not-found,unused-ignore]
+
+    def dump_bytes(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:  # noqa: ANN401
+        return ujson.dumps(  # type: ignore[no-any-return,unused-ignore]
+            obj,
+            indent=2 if indent else 0,
+            sort_keys=sort_keys,
+            ensure_ascii=False,
+            escape_forward_slashes=False,
+        ).encode("utf-8")
+
+    return JsonBackend("ujson", ujson.loads, dump_bytes)
+
+
+# Candidates in order of preference when no backend is requested.
+_REGISTRY: dict[str, Callable[[], JsonBackend]] = {
+    "orjson": _orjson,
+    "msgspec": _msgspec,
+    "ujson": _ujson,
+    "json": _stdlib,
+}
+_default: JsonBackend | None = None
+
+
+def register_backend(
+    name: str, factory: Callable[[], JsonBackend], *, preferred: bool = False
+) -> None:
+    """
+    Make a backend available by name.
+
+    ``factory`` is only called when the backend is selected and may raise ``ImportError`` when
+    its library is missing. With ``preferred=True`` it is tried before the built-in backends.
+    """
+    global _REGISTRY, _default  # noqa: PLW0603
+    if preferred:
+        _REGISTRY = {name: factory, **{k: v for k, v in _REGISTRY.items() if k != name}}
+    else:
+        _REGISTRY[name] = factory
+    _default = None
+
+
+def available_backends() -> list[str]:
+    """Names of the registered backends whose library can be imported, in preference order."""
+    ret = []
+    for name, factory in _REGISTRY.items():
+        try:
+            factory()
+        except ImportError:
+            continue
+        ret.append(name)
+    return ret
+
+
+def get_backend(name: str | None = None) -> JsonBackend:
+    """
+    Return the backend called ``name``, or the default one.
+
+    The default is the backend named by ``DEV_TOOLBOX_JSON_BACKEND`` when set, otherwise the first
+    registered backend whose library is installed.
+    """
+    global _default  # noqa: PLW0603
+    if name is not None:
+        try:
+            return _REGISTRY[name]()
+        except KeyError:
+            msg = f"Unknown JSON backend {name!r}, choose from {list(_REGISTRY)}"
+            raise ValueError(msg) from None
+    if _default is None:
+        env = os.environ.get(ENV_VAR)
+        if env:
+            _default = get_backend(env)
+        else:
+            for factory in _REGISTRY.values():
+                try:
+                    _default = factory()
+                    break
+                except ImportError:
+                    continue
+            else:  # pragma: no cover - the stdlib backend is always importable
+                _default = _stdlib()
+    return _default
+
+
+def set_backend(name: str | None) -> None:
+    """Select the default backend by name. ``None`` goes back to automatic selection."""
+    global _default  # noqa: PLW0603
+    _default = None if name is None else get_backend(name)
+
+
+def loads(data: str | bytes | bytearray) -> Any:  # noqa: ANN401
+    return get_backend().loads(data)
+
+
+def dumps(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> str:  # noqa: ANN401
+    return get_backend().dumps(obj, indent=indent, sort_keys=sort_keys)
+
+
+def dump_bytes(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:  # noqa: ANN401
+    return get_backend().dump_bytes(obj, indent=indent, sort_keys=sort_keys)
@@ -1,27 +1,45 @@
 from __future__ import annotations
 
+import asyncio
+import email.policy
+import functools
+import hashlib
+import html
 import io
-import json
+import itertools
 import logging
+import os
 import re
-import tempfile
+import sqlite3
+import sys
+import threading
+import time
 import zipfile
 from email.parser import BytesParser
 from typing import TYPE_CHECKING
 from typing import NamedTuple
+from typing import Optional
 from typing import TypedDict
-from typing import TypeVar
+from typing import Union
 from urllib.parse import urljoin
 from urllib.parse import urlparse
 
+from dev_toolbox.json_backend import dump_bytes
+from dev_toolbox.json_backend import loads
+
 if TYPE_CHECKING:
-    from collections.abc import Mapping
+    from collections.abc import AsyncIterator
+    from collections.abc import Callable
+    from collections.abc import Iterable
+    from collections.abc import Iterator
     from email.message import Message
 
     import httpx
     import requests
+    from typing_extensions import Buffer
+    from typing_extensions import Self
 
-    T = TypeVar("T", bound=Mapping)  # type: ignore[type-arg]
+    from dev_toolbox.http import RateLimiter
 
     class Metadata(TypedDict):
         author: str
@@ -62,22 +80,90 @@ logger = logging.getLogger(__name__)
 # )
 
 
+_SDIST_SUFFIXES = (".tar.gz", ".tar.bz2", ".tar.xz", ".tgz", ".zip")
+
+
 def _extract_version_from_filename(x: str) -> str:
-    x = x.split("/")[-1]
-    return x.split(".tar.gz")[0].split("-")[-1] if x.endswith(".tar.gz") else x.split("-")[1]
+    x = x.rsplit("/", 1)[-1]
+    for suffix in _SDIST_SUFFIXES:
+        if x.endswith(suffix):
+            return x[: -len(suffix)].rsplit("-", 1)[-1]
+    # Wheels and eggs: <name>-<version>-..., with any "-" of the name escaped as "_".
+    return x.split("-")[1]
 
 
 def _parsed_version(x: str) -> tuple[int, ...]:
     return tuple(map(int, re.findall(r"\d+", x)))
 
 
+# PEP 440 appendix B, the canonical pattern.
+_PEP440 = re.compile(
+    r"""
+    v?
+    (?:(?P<epoch>[0-9]+)!)?
+    (?P<release>[0-9]+(?:\.[0-9]+)*)
+    (?P<pre>[-_.]?(?P<pre_l>alpha|a|beta|b|preview|pre|c|rc)[-_.]?(?P<pre_n>[0-9]+)?)?
+    (?P<post>(?:-(?P<post_n1>[0-9]+))|(?:[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>[0-9]+)?))?
+    (?P<dev>[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>[0-9]+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+_PRE_RANK = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "c": 2, "rc": 2, "pre": 2, "preview": 2}
+# Stands in for +infinity in the ``dev`` slot of a key: releases sort after their dev releases.
+_NO_DEV = sys.maxsize
+
+VersionKey = tuple[
+    int,  # 1 for a PEP 440 version, 0 for anything else, which sorts first
+    int,  # epoch
+    tuple[int, ...],  # release, without trailing zeros
+    tuple[int, int],  # pre-release (rank, number), (-1, 0) dev only, (3, 0) none
+    int,  # post-release, -1 if none
+    int,  # dev release, _NO_DEV if none
+    tuple[tuple[int, int, str], ...],  # local segments, numbers after strings
+]
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def version_key(version: str) -> VersionKey:
+    """
+    Sort key of ``version`` that orders as PEP 440 (and ``packaging.version.Version``) does.
+
+    Strings that are not PEP 440 versions sort before every version, by their digits. Keys are
+    cached since the same versions come up again across the files and projects of an index.
+    """
+    match = _PEP440.fullmatch(version.strip())
+    if match is None:
+        return (0, 0, _parsed_version(version), (3, 0), -1, _NO_DEV, ())
+    release = [int(x) for x in match["release"].split(".")]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    dev = _NO_DEV if match["dev"] is None else int(match["dev_n"] or 0)
+    if match["pre"] is not None:
+        pre = (_PRE_RANK[match["pre_l"].lower()], int(match["pre_n"] or 0))
+    else:
+        pre = (-1, 0) if match["post"] is None and match["dev"] is not None else (3, 0)
+    post = -1 if match["post"] is None else int(match["post_n1"] or match["post_n2"] or 0)
+    local = tuple(
+        (1, int(x), "") if x.isdigit() else (0, 0, x.lower())
+        for x in re.split(r"[-_.]", match["local"] or "")
+        if x
+    )
+    return (1, int(match["epoch"] or 0), tuple(release), pre, post, dev, local)
+
+
 def _normalize_string(x: str) -> str:
     return x.strip().lower().replace("-", "_")
 
 
+# METADATA is UTF-8, the default compat32 policy would leave non-ASCII values as ``Header``s.
+_METADATA_PARSER = BytesParser(policy=email.policy.default)
+
+
 def _parse_message(x: Message[str, str]) -> Metadata:
     metadata = {}  # type: ignore[var-annotated]
-    for key, value in x.items():
+    for key, header in x.items():
+        value = str(header)
         if key in metadata:
             if isinstance(metadata[key], list):
                 metadata[key].append(value)
@@ -99,88 +185,777 @@ def _parse_message(x: Message[str, str]) -> Metadata:
     return ret  # type: ignore[return-value]
 
 
-def _json_clean(obj: T) -> T:
-    return json.loads(
-        json.dumps({k: v for k, v in obj.items() if v is not None}, sort_keys=True, skipkeys=True)
+def _clean_and_store(
+    cache: MetadataCache | None, base_url: str, package_name: str, metadata: Metadata
+) -> Metadata:
+    """``metadata`` without None values, through JSON and so stored in ``cache`` on the way."""
+    data = dump_bytes({k: v for k, v in metadata.items() if v is not None}, sort_keys=True)
+    if cache is not None:
+        cache.put(base_url, "metadata", package_name, data)
+    return loads(data)
+
+
+def _dump_distributions(files: list[_Distribution]) -> bytes:
+    return dump_bytes([list(x) for x in files])
+
+
+def _load_distributions(data: bytes) -> list[_Distribution]:
+    return [
+        _Distribution(url, tuple(meta) if isinstance(meta, list) else meta)
+        for url, meta in loads(data)
+    ]
+
+
+_NAME_SEPARATORS = re.compile(r"[-_.]+")
+
+
+def _normalize_name(name: str) -> str:
+    """PEP 503 normalized project name."""
+    return _NAME_SEPARATORS.sub("-", name).lower()
+
+
+def _parse_project_serials(text: str) -> list[tuple[str, int | None]]:
+    """Project names of ``/simple/`` with their PEP 691 ``_last-serial`` when the index has it."""
+    try:
+        return [(x["name"], x.get("_last-serial")) for x in loads(text)["projects"]]
+    except ValueError:
+        logger.debug("Not JSON, trying to parse as HTML")
+
+    pattern = re.compile(r'<a href="([^"]+)">([^<]+)</a>')
+    return [(x.group(2), None) for x in pattern.finditer(text)]
+
+
+def _parse_projects(text: str) -> list[str]:
+    return [name for name, _ in _parse_project_serials(text)]
+
+
+class _Distribution(NamedTuple):
+    url: str
+    # PEP 658: ``<url>.metadata`` holds the METADATA of the distribution when this is set, to
+    # True or to the hash of that file as ``(name, hexdigest)``.
+    core_metadata: Union[bool, tuple[str, str]] = False  # noqa: UP007
+
+
+def _metadata_attribute(value: object) -> bool | tuple[str, str]:
+    """A PEP 658/714 ``core-metadata`` value of the JSON or HTML index as a ``_Distribution``'s."""
+    if isinstance(value, dict):
+        return next(iter(value.items()), True)
+    if isinstance(value, str) and "=" in value:
+        name, digest = value.split("=", 1)
+        return name, digest
+    return value not in (None, False, "false")
+
+
+_ANCHOR = re.compile(r"<a\s([^>]*)>")
+_ATTRIBUTE = re.compile(r'([\w-]+)="([^"]*)"')
+
+
+def _parse_distribution_files(base_url: str, text: str) -> list[_Distribution]:
+    try:
+        return [
+            _Distribution(
+                urljoin(base_url, x["url"]),
+                _metadata_attribute(x.get("core-metadata", x.get("dist-info-metadata"))),
+            )
+            for x in loads(text)["files"]
+        ]
+    except ValueError:
+        logger.debug("Not JSON, trying to parse as HTML")
+
+    ret = []
+    for anchor in _ANCHOR.finditer(text):
+        attributes = {k: html.unescape(v) for k, v in _ATTRIBUTE.findall(anchor.group(1))}
+        if "href" not in attributes:
+            continue
+        metadata = attributes.get("data-core-metadata", attributes.get("data-dist-info-metadata"))
+        ret.append(
+            _Distribution(
+                urlparse(urljoin(base_url, attributes["href"]))._replace(fragment="").geturl(),
+                _metadata_attribute(metadata),
+            )
+        )
+    return ret
+
+
+def _parse_json_metadata(text: str) -> Metadata:
+    """The ``info`` of a ``/pypi/<name>/json`` response, raises ValueError if it is not JSON."""
+    ret = dict(loads(text)["info"])
+    ret.pop("description", None)
+    ret.pop("license", None)
+    ret.pop("downloads", None)
+    return ret  # type: ignore[return-value]
+
+
+def _latest_wheel(distributions: list[_Distribution]) -> _Distribution:
+    return max(
+        (x for x in distributions if x.url.endswith(".whl")),
+        key=lambda x: version_key(_extract_version_from_filename(x.url)),
     )
 
 
-_header: dict[str, str] = {  # format
-    # "Accept": "application/vnd.pypi.simple.v1+json"
+def _parse_core_metadata(distribution: _Distribution, content: bytes) -> Metadata:
+    """The METADATA of a PEP 658 ``.metadata`` file, checked against its hash if there is one."""
+    if isinstance(distribution.core_metadata, tuple):
+        name, expected = distribution.core_metadata
+        if hashlib.new(name, content).hexdigest() != expected:
+            msg = f"{name} of {distribution.url}.metadata does not match the index's"
+            raise ValueError(msg)
+    ret = _parse_message(_METADATA_PARSER.parsebytes(content))
+    ret.pop("license", None)  # type: ignore[misc]
+    return ret
+
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class _RangeFile(io.RawIOBase):
+    """
+    Read-only, seekable file over ``url`` that downloads only the parts that are read.
+
+    Parts are fetched with ``Range`` requests through ``get(url, headers)`` and kept, so a
+    ``zipfile.ZipFile`` over it costs a request for the central directory at the end of the
+    archive and one per member read. Servers that ignore ``Range`` send the whole file once.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        get: Callable[[str, dict[str, str]], requests.Response | httpx.Response],
+        chunk_size: int = 1 << 16,
+    ) -> None:
+        super().__init__()
+        self.url = url
+        self._get = get
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._position = 0
+        self._parts: list[tuple[int, bytes]] = []
+        # A suffix range returns the size along with the tail, where the central directory is.
+        self._fetch(f"bytes=-{chunk_size}")
+
+    def _fetch(self, byte_range: str) -> None:
+        # Compressed responses would make the offsets meaningless.
+        response = self._get(self.url, {"Range": byte_range, "Accept-Encoding": "identity"})
+        response.raise_for_status()
+        match = _CONTENT_RANGE.fullmatch(response.headers.get("Content-Range", ""))
+        if response.status_code == 206 and match:  # noqa: PLR2004
+            start, _, size = map(int, match.groups())
+            self.size = size
+            self._parts.append((start, response.content))
+        else:
+            self.size = len(response.content)
+            self._parts = [(0, response.content)]
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self.size}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def readinto(self, buffer: Buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        n = max(0, min(len(view), self.size - self._position))
+        done = 0
+        while done < n:
+            position = self._position + done
+            part = next(
+                (p for p in self._parts if p[0] <= position < p[0] + len(p[1])),
+                None,
+            )
+            if part is None:
+                end = min(self.size, position + max(n - done, self.chunk_size))
+                self._fetch(f"bytes={position}-{end - 1}")
+                continue
+            start, data = part
+            chunk = data[position - start : position - start + n - done]
+            view[done : done + len(chunk)] = chunk
+            done += len(chunk)
+        self._position += done
+        return done
+
+
+# The wheel's own METADATA, not one of a package vendored inside it.
+_WHEEL_METADATA_PATH = re.compile(r"[^/]+\.dist-info/METADATA")
+
+
+def _parse_wheel_metadata(url: str, wheel: _RangeFile) -> Metadata:
+    with zipfile.ZipFile(wheel) as zf:
+        metadata_path = next(
+            (x for x in zf.namelist() if _WHEEL_METADATA_PATH.fullmatch(x)),
+            None,
+        )
+        if not metadata_path:
+            msg = f"METADATA file not found in {url}"
+            raise FileNotFoundError(msg)
+        with zf.open(metadata_path) as metadata_file:
+            ret = _parse_message(_METADATA_PARSER.parse(metadata_file))
+            ret.pop("license", None)  # type: ignore[misc]
+            return ret
+
+
+class MetadataResult(NamedTuple):
+    """Outcome of one package of ``get_metadata_many``: either ``metadata`` or ``error`` is set."""
+
+    name: str
+    metadata: Optional[Metadata]  # noqa: UP045
+    error: Optional[Exception]  # noqa: UP045
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# PEP 691: JSON when the index has it, HTML otherwise, both are parsed.
+_header: dict[str, str] = {
+    "Accept": (
+        "application/vnd.pypi.simple.v1+json, "
+        "application/vnd.pypi.simple.v1+html;q=0.2, "
+        "text/html;q=0.01"
+    ),
 }
 
 
+class OfflineError(ConnectionError):
+    """A lookup missed the ``MetadataCache`` of an api that is not allowed to go online."""
+
+
+_METADATA_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    base_url TEXT NOT NULL,
+    kind TEXT NOT NULL,  -- "metadata" or "files"
+    name TEXT NOT NULL,  -- PEP 503 normalized
+    value BLOB NOT NULL,  -- JSON
+    stored REAL NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (base_url, kind, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+-- Running total of length(value), kept by the triggers for every process sharing the file.
+CREATE TABLE IF NOT EXISTS size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+INSERT OR IGNORE INTO size SELECT 0, coalesce(sum(length(value)), 0) FROM entries;
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE size SET total = total + length(new.value);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF value ON entries BEGIN
+    UPDATE size SET total = total + length(new.value) - length(old.value);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE size SET total = total - length(old.value);
+END;
+"""
+
+
+class MetadataCache:
+    """
+    SQLite cache of ``get_metadata`` and ``get_distributions`` results, keyed by index and name.
+
+    Entries are served for ``ttl`` seconds after they were stored, the least recently used ones
+    are evicted once the values add up to more than ``max_size`` bytes. An ``offline`` cache
+    serves entries of any age, and any request of an api using it that would go to the network
+    raises ``OfflineError`` instead: lookups it cannot answer, ``get_all_projects`` and
+    ``http_get``. One cache can be shared by several apis and threads.
+
+    Args:
+    ----
+        path (str | None, optional): Database file, defaults to
+            ``$XDG_CACHE_HOME/dev-toolbox/pypi/metadata.sqlite3``.
+        ttl (float, optional): Seconds an entry stays fresh.
+        max_size (int, optional): Bytes of values kept.
+        offline (bool, optional): Never go to the network.
+
+    """
+
+    __slots__ = ("_lock", "db", "max_size", "offline", "path", "ttl")
+
+    def __init__(
+        self,
+        path: str | None = None,
+        *,
+        ttl: float = 24 * 60 * 60,
+        max_size: int = 64 << 20,
+        offline: bool = False,
+    ) -> None:
+        from dev_toolbox.http._cache import default_cache_dir
+
+        pypi_dir = os.path.join(os.path.dirname(default_cache_dir()), "pypi")
+        self.path = path or os.path.join(pypi_dir, "metadata.sqlite3")
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        # A lost write only costs a refetch, no need to wait for the disk on each one.
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_METADATA_CACHE_SCHEMA)
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}({self.path!r}, ttl={self.ttl}, max_size={self.max_size}, "
+            f"offline={self.offline})"
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def get(self, base_url: str, kind: str, name: str) -> bytes | None:
+        """The stored value, None if there is none fresh, raises ``OfflineError`` if offline."""
+        key = (base_url, kind, _normalize_name(name))
+        with self._lock:
+            row = self.db.execute(
+                "SELECT value, stored FROM entries WHERE base_url = ? AND kind = ? AND name = ?",
+                key,
+            ).fetchone()
+            now = time.time()
+            if row is not None and (self.offline or now - row[1] <= self.ttl):
+                with self.db:
+                    self.db.execute(
+                        "UPDATE entries SET used = ? WHERE base_url = ? AND kind = ? AND name = ?",
+                        (now, *key),
+                    )
+                return row[0]
+        if self.offline:
+            msg = f"{kind} of {name!r} from {base_url} is not cached"
+            raise OfflineError(msg)
+        return None
+
+    def put(self, base_url: str, kind: str, name: str, value: bytes) -> None:
+        key = (base_url, kind, _normalize_name(name))
+        now = time.time()
+        with self._lock, self.db:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete fires no trigger.
+            self.db.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (base_url, kind, name) DO UPDATE SET "
+                "value = excluded.value, stored = excluded.stored, used = excluded.used",
+                (*key, value, now, now),
+            )
+            (size,) = self.db.execute("SELECT total FROM size").fetchone()
+            if size > self.max_size:
+                self._evict(size)
+
+    def _evict(self, size: int) -> None:
+        evicted = []
+        for *key, value_size in self.db.execute(
+            "SELECT base_url, kind, name, length(value) FROM entries ORDER BY used"
+        ):
+            if size <= self.max_size:
+                break
+            evicted.append(key)
+            size -= value_size
+        self.db.executemany(
+            "DELETE FROM entries WHERE base_url = ? AND kind = ? AND name = ?", evicted
+        )
+
+    def clear(self) -> None:
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM entries")
+
+
+def _check_online(cache: MetadataCache | None, url: str) -> None:
+    if cache is not None and cache.offline:
+        msg = f"{url} is not cached and the cache is offline"
+        raise OfflineError(msg)
+
+
 class PypiIndexApi(NamedTuple):
     client: requests.Session | httpx.Client
     base_url: str = "https://pypi.org"
+    # Shared by every thread using this api, keeps requests under the index's quota.
+    rate_limiter: RateLimiter | None = None
+    # Answers get_metadata and get_distributions from disk while fresh, see MetadataCache.
+    cache: MetadataCache | None = None
+
+    def _get(
+        self, url: str, headers: dict[str, str] | None = None
+    ) -> requests.Response | httpx.Response:
+        _check_online(self.cache, url)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(url)
+        return self.client.get(url, headers=headers)
 
     def http_get(self, path: str) -> str:
         url = urljoin(self.base_url, path)
-        response = self.client.get(url, headers=_header)
+        response = self._get(url, headers=_header)
         response.raise_for_status()
         return response.text
 
     def get_all_projects(self) -> list[str]:
-        response = self.http_get("/simple/")
-        try:
-            return [x["name"] for x in json.loads(response)["projects"]]
-        except json.JSONDecodeError:
-            logger.debug("Not JSON, trying to parse as HTML")
-
-        pattern = re.compile(r'<a href="([^"]+)">([^<]+)</a>')
-        return [x.group(2) for x in pattern.finditer(response)]
+        return _parse_projects(self.http_get("/simple/"))
 
     def get_distributions(self, package_name: str) -> list[str]:
-        response = self.http_get(f"/simple/{package_name}/")
-        urls: list[str] = []
-        try:
-            urls.extend(x["url"] for x in json.loads(response)["files"])
-        except json.JSONDecodeError:
-            logger.debug("Not JSON, trying to parse as HTML")
-
-            pattern = re.compile(r'href="([^"]+)"')
-            urls.extend(
-                urlparse(urljoin(self.base_url, x.group(1)))._replace(fragment="").geturl()
-                for x in pattern.finditer(response)
-            )
-        return urls
+        return [x.url for x in self._get_distribution_files(package_name)]
+
+    def _get_distribution_files(self, package_name: str) -> list[_Distribution]:
+        cached = self.cache and self.cache.get(self.base_url, "files", package_name)
+        if cached:
+            return _load_distributions(cached)
+        text = self.http_get(f"/simple/{package_name}/")
+        ret = _parse_distribution_files(self.base_url, text)
+        if self.cache is not None:
+            self.cache.put(self.base_url, "files", package_name, _dump_distributions(ret))
+        return ret
 
     def get_versions(self, package_name: str) -> list[str]:
         files = self.get_distributions(package_name)
         return sorted(
             {_extract_version_from_filename(x) for x in files},
-            key=lambda x: _parsed_version(x),
+            key=version_key,
         )
 
     def get_metadata(self, package_name: str) -> Metadata:
+        cached = self.cache and self.cache.get(self.base_url, "metadata", package_name)
+        if cached:
+            return loads(cached)
         response = self.http_get(f"/pypi/{package_name}/json")
-        ret = {}
         try:
-            ret.update(json.loads(response)["info"])
-            ret.pop("description", None)
-            ret.pop("license", None)
-            ret.pop("downloads", None)
-        except json.JSONDecodeError:
-            ret.update(self._get_metadata_from_whl(package_name))
-
-        return _json_clean(ret)  # type: ignore[return-value]
+            ret = _parse_json_metadata(response)
+        except ValueError:
+            ret = self._get_metadata_from_whl(package_name)
+
+        return _clean_and_store(self.cache, self.base_url, package_name, ret)
+
+    def get_metadata_many(
+        self, names: Iterable[str], *, concurrency: int = 10
+    ) -> Iterator[MetadataResult]:
+        """
+        ``get_metadata`` of every package of ``names`` from a pool of ``concurrency`` threads.
+
+        Results are yielded as they complete, a package that fails has its exception in
+        ``error`` instead of stopping the others. ``names`` is consumed lazily. A
+        ``requests.Session`` keeps 10 connections per host by default, mount an adapter with a
+        larger ``pool_maxsize`` to go beyond that.
+        """
+        from concurrent.futures import FIRST_COMPLETED
+        from concurrent.futures import ThreadPoolExecutor
+        from concurrent.futures import wait
+
+        def run(name: str) -> MetadataResult:
+            try:
+                return MetadataResult(name, self.get_metadata(name), None)
+            except Exception as e:  # noqa: BLE001
+                return MetadataResult(name, None, e)
+
+        todo = iter(names)
+        with ThreadPoolExecutor(concurrency) as executor:
+            pending = {executor.submit(run, name) for name in itertools.islice(todo, concurrency)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                    pending.update(executor.submit(run, name) for name in itertools.islice(todo, 1))
 
     def _get_metadata_from_whl(self, package_name: str) -> Metadata:
-        latest_wheel_url = max(
-            (x for x in self.get_distributions(package_name) if x.endswith(".whl")),
-            key=lambda x: _parsed_version(_extract_version_from_filename(x)),
+        wheel = _latest_wheel(self._get_distribution_files(package_name))
+        if wheel.core_metadata:
+            response = self._get(f"{wheel.url}.metadata")
+            response.raise_for_status()
+            return _parse_core_metadata(wheel, response.content)
+        with _RangeFile(wheel.url, self._get) as f:
+            return _parse_wheel_metadata(wheel.url, f)
+
+
+class AsyncPypiIndexApi(NamedTuple):
+    """``PypiIndexApi`` for an ``httpx.AsyncClient``."""
+
+    client: httpx.AsyncClient
+    base_url: str = "https://pypi.org"
+    rate_limiter: RateLimiter | None = None
+    cache: MetadataCache | None = None
+
+    async def _get(self, url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+        _check_online(self.cache, url)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire(url)
+        return await self.client.get(url, headers=headers)
+
+    async def http_get(self, path: str) -> str:
+        url = urljoin(self.base_url, path)
+        response = await self._get(url, headers=_header)
+        response.raise_for_status()
+        return response.text
+
+    async def get_all_projects(self) -> list[str]:
+        return _parse_projects(await self.http_get("/simple/"))
+
+    async def get_distributions(self, package_name: str) -> list[str]:
+        return [x.url for x in await self._get_distribution_files(package_name)]
+
+    async def _get_distribution_files(self, package_name: str) -> list[_Distribution]:
+        cached = self.cache and self.cache.get(self.base_url, "files", package_name)
+        if cached:
+            return _load_distributions(cached)
+        text = await self.http_get(f"/simple/{package_name}/")
+        ret = _parse_distribution_files(self.base_url, text)
+        if self.cache is not None:
+            self.cache.put(self.base_url, "files", package_name, _dump_distributions(ret))
+        return ret
+
+    async def get_versions(self, package_name: str) -> list[str]:
+        files = await self.get_distributions(package_name)
+        return sorted(
+            {_extract_version_from_filename(x) for x in files},
+            key=version_key,
         )
-        with tempfile.TemporaryDirectory():
-            response = self.client.get(latest_wheel_url)
-            with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
-                metadata_path = next(
-                    (x for x in zf.namelist() if x.endswith("METADATA")),
-                    None,
-                )
-                if not metadata_path:
-                    msg = f"METADATA file not found in {latest_wheel_url}"
-                    raise FileNotFoundError(msg)
-                with zf.open(metadata_path) as metadata_file:
-                    ret = _parse_message(BytesParser().parse(metadata_file))
-                    ret.pop("license", None)  # type: ignore[misc]
-                    return ret
+
+    async def get_metadata(self, package_name: str) -> Metadata:
+        cached = self.cache and self.cache.get(self.base_url, "metadata", package_name)
+        if cached:
+            return loads(cached)
+        response = await self.http_get(f"/pypi/{package_name}/json")
+        try:
+            ret = _parse_json_metadata(response)
+        except ValueError:
+            ret = await self._get_metadata_from_whl(package_name)
+
+        return _clean_and_store(self.cache, self.base_url, package_name, ret)
+
+    async def get_metadata_many(
+        self, names: Iterable[str], *, concurrency: int = 32
+    ) -> AsyncIterator[MetadataResult]:
+        """Same as ``PypiIndexApi.get_metadata_many`` with up to ``concurrency`` tasks."""
+
+        async def run(name: str) -> MetadataResult:
+            try:
+                return MetadataResult(name, await self.get_metadata(name), None)
+            except Exception as e:  # noqa: BLE001
+                return MetadataResult(name, None, e)
+
+        todo = iter(names)
+        pending = {asyncio.ensure_future(run(name)) for name in itertools.islice(todo, concurrency)}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+                    pending.update(asyncio.ensure_future(run(n)) for n in itertools.islice(todo, 1))
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _get_metadata_from_whl(self, package_name: str) -> Metadata:
+        wheel = _latest_wheel(await self._get_distribution_files(package_name))
+        if wheel.core_metadata:
+            response = await self._get(f"{wheel.url}.metadata")
+            response.raise_for_status()
+            return _parse_core_metadata(wheel, response.content)
+
+        # zipfile reads synchronously: run it in a thread that fetches through this loop.
+        loop = asyncio.get_running_loop()
+
+        def get(url: str, headers: dict[str, str]) -> httpx.Response:
+            return asyncio.run_coroutine_threadsafe(self._get(url, headers), loop).result()
+
+        def parse() -> Metadata:
+            with _RangeFile(wheel.url, get) as f:
+                return _parse_wheel_metadata(wheel.url, f)
+
+        return await asyncio.to_thread(parse)
+
+
+def default_mirror_path(base_url: str) -> str:
+    """``$XDG_CACHE_HOME/dev-toolbox/pypi/<host>.sqlite3``, see ``default_cache_dir``."""
+    from dev_toolbox.http._cache import default_cache_dir
+
+    host = urlparse(base_url).netloc.replace(":", "_")
+    return os.path.join(os.path.dirname(default_cache_dir()), "pypi", f"{host}.sqlite3")
+
+
+_MIRROR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,  -- PEP 503 normalized
+    display_name TEXT NOT NULL,
+    serial INTEGER,  -- _last-serial of the project in /simple/, NULL if the index has none
+    files BLOB,  -- JSON [[url, core_metadata], ...], NULL until the project page is mirrored
+    files_serial INTEGER,
+    files_etag TEXT
+) WITHOUT ROWID;
+"""
+
+
+class PypiMirror:
+    """
+    Local SQLite copy of an index's project list and of the file lists of projects looked up.
+
+    ``sync`` downloads ``/simple/`` again only when its ``ETag`` changed, and then refreshes
+    the mirrored file lists of the projects whose ``_last-serial`` moved. Indexes without
+    serials get a conditional request per mirrored project instead. Lookups are local, a file
+    list is fetched the first time its project is asked for.
+
+    Args:
+    ----
+        api (PypiIndexApi): Used for the requests, with its client and rate limiter.
+        path (str | None, optional): Database file, see ``default_mirror_path``.
+
+    """
+
+    __slots__ = ("api", "db", "path")
+
+    def __init__(self, api: PypiIndexApi, path: str | None = None) -> None:
+        self.api = api
+        self.path = path or default_mirror_path(api.base_url)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_MIRROR_SCHEMA)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.api.base_url!r}, path={self.path!r})"
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT count(*) FROM projects").fetchone()[0]
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        query = "SELECT 1 FROM projects WHERE name = ?"
+        return self.db.execute(query, (_normalize_name(name),)).fetchone() is not None
+
+    def _conditional_get(self, path: str, etag: str | None) -> tuple[str | None, str | None]:
+        """Body and ETag of ``path``, no body when ``etag`` still matches."""
+        headers = dict(_header)
+        if etag:
+            headers["If-None-Match"] = etag
+        response = self.api._get(urljoin(self.api.base_url, path), headers=headers)  # noqa: SLF001
+        if response.status_code == 304:  # noqa: PLR2004
+            return None, etag
+        response.raise_for_status()
+        return response.text, response.headers.get("ETag")
+
+    def sync(self, *, concurrency: int = 10) -> list[str]:
+        """Bring the mirror up to date with the index, return the projects refreshed."""
+        changed = self.sync_projects()
+        return self.sync_files(changed, concurrency=concurrency)
+
+    def sync_projects(self) -> list[str] | None:
+        """
+        Refresh the project list, return the mirrored projects that changed since the last sync.
+
+        None means the index has no serials, so any mirrored project may have changed.
+        """
+        meta = dict(self.db.execute("SELECT key, value FROM meta"))
+        text, etag = self._conditional_get("/simple/", meta.get("etag"))
+        if text is None:
+            # An unchanged list says nothing about the file lists of an index without serials.
+            return [] if meta.get("has_serials") == "1" else None
+        projects = _parse_project_serials(text)
+        has_serials = all(serial is not None for _, serial in projects)
+        with self.db:
+            # Only rows whose serial or display name changed are written. A project can be
+            # renamed to another spelling of its normalized name without its serial moving.
+            self.db.executemany(
+                "INSERT INTO projects (name, display_name, serial) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET "
+                "display_name = excluded.display_name, serial = excluded.serial "
+                "WHERE display_name IS NOT excluded.display_name OR serial IS NOT excluded.serial",
+                ((_normalize_name(name), name, serial) for name, serial in projects),
+            )
+            # Every listed project is stored now, any extra one was removed from the index.
+            if len(self) != len(projects):
+                listed = {_normalize_name(name) for name, _ in projects}
+                removed = [
+                    k for (k,) in self.db.execute("SELECT name FROM projects") if k not in listed
+                ]
+                self.db.executemany("DELETE FROM projects WHERE name = ?", ((k,) for k in removed))
+            self.db.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                (("etag", etag or ""), ("has_serials", "1" if has_serials else "0")),
+            )
+        if not has_serials:
+            return None
+        query = "SELECT name FROM projects WHERE files IS NOT NULL AND files_serial IS NOT serial"
+        return [k for (k,) in self.db.execute(query)]
+
+    def sync_files(self, names: Iterable[str] | None = None, *, concurrency: int = 10) -> list[str]:
+        """
+        Fetch the file lists of ``names``, by default of every mirrored project, return those
+        that changed. Projects answering ``304 Not Modified`` are kept as they are.
+        """
+        if names is None:
+            names = [
+                x for (x,) in self.db.execute("SELECT name FROM projects WHERE files IS NOT NULL")
+            ]
+        todo = [
+            (row[0], row[1], row[2])
+            for name in names
+            for row in self.db.execute(
+                "SELECT name, serial, files_etag FROM projects WHERE name = ?",
+                (_normalize_name(name),),
+            )
+        ]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        def fetch(name: str, etag: str | None) -> tuple[str | None, str | None]:
+            return self._conditional_get(f"/simple/{name}/", etag)
+
+        changed = []
+        with ThreadPoolExecutor(concurrency) as executor:
+            pages = executor.map(fetch, (x[0] for x in todo), (x[2] for x in todo))
+            # One short transaction per page once it is fetched, so the database is not locked
+            # while requests are in flight.
+            for (name, serial, _), (text, etag) in zip(todo, pages):
+                if text is None:
+                    with self.db:
+                        self.db.execute(
+                            "UPDATE projects SET files_serial = ? WHERE name = ?", (serial, name)
+                        )
+                    continue
+                files = _dump_distributions(_parse_distribution_files(self.api.base_url, text))
+                with self.db:
+                    self.db.execute(
+                        "UPDATE projects SET files = ?, files_etag = ?, files_serial = ? "
+                        "WHERE name = ?",
+                        (files, etag, serial, name),
+                    )
+                changed.append(name)
+        return changed
+
+    def get_all_projects(self) -> list[str]:
+        return [x for (x,) in self.db.execute("SELECT display_name FROM projects ORDER BY name")]
+
+    def _get_distribution_files(self, package_name: str) -> list[_Distribution]:
+        name = _normalize_name(package_name)
+        query = "SELECT files FROM projects WHERE name = ?"
+        row = self.db.execute(query, (name,)).fetchone()
+        if row is None:
+            msg = f"{package_name!r} is not in the index"
+            raise KeyError(msg)
+        if row[0] is None:
+            self.sync_files([name])
+            row = self.db.execute(query, (name,)).fetchone()
+        return _load_distributions(row[0])
+
+    def get_distributions(self, package_name: str) -> list[str]:
+        return [x.url for x in self._get_distribution_files(package_name)]
+
+    def get_versions(self, package_name: str) -> list[str]:
+        files = self.get_distributions(package_name)
+        return sorted({_extract_version_from_filename(x) for x in files}, key=version_key)
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import csv
 import dataclasses
-import json
 import typing
 from dataclasses import is_dataclass
 from typing import TYPE_CHECKING
@@ -13,6 +12,7 @@ from typing import TypeVar
 
 from dev_toolbox._types import is_list_of
 from dev_toolbox._types import is_namedtuple
+from dev_toolbox.json_backend import dump_bytes
 
 if TYPE_CHECKING:
     from collections.abc import Mapping
@@ -108,5 +108,5 @@ def to_csv(data: _Table, filename: str) -> None:
 
 def to_json(data: _Table, filename: str) -> None:
     _data = asdicts(data)
-    with open(filename, "w") as f:
-        json.dump(_data, f, indent=2)
+    with open(filename, "wb") as f:
+        f.write(dump_bytes(_data, indent=True))
@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+
+from dev_toolbox import json_backend
+from dev_toolbox.file_utils import Checkpoint
+from dev_toolbox.file_utils import FileSlice
+from dev_toolbox.file_utils import JsonIndex
+from dev_toolbox.file_utils import JsonProjector
+from dev_toolbox.file_utils import astream_json_objects
+from dev_toolbox.file_utils import open_decompressed
+from dev_toolbox.file_utils import scan_json_objects
+from dev_toolbox.file_utils import stream_json_objects
+from dev_toolbox.file_utils import stream_json_objects_parallel
+from dev_toolbox.file_utils import stream_json_objects_with_offsets
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from pathlib import Path
+
+    from _typeshed import Incomplete
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.fixture
+def lines_file(tmp_path: Path) -> Path:
+    path = tmp_path / "lines.txt"
+    path.write_bytes(b"".join(f"line {i}\n".encode() for i in range(1000)))
+    return path
+
+
+def test_file_slice_window(lines_file: Path) -> None:
+    with FileSlice(str(lines_file), 7, 21) as fs:
+        assert len(fs) == 14  # noqa: PLR2004
+        assert bytes(fs[:6]) == b"line 1"
+        assert fs[0] == ord("l")
+        assert fs.find(b"line 2") == 7  # noqa: PLR2004
+        assert fs.find(b"line 3") == -1
+        assert [bytes(x) for x in fs] == [b"line 1\n", b"line 2\n"]
+
+
+def test_file_slice_unaligned_offset(lines_file: Path) -> None:
+    data = lines_file.read_bytes()
+    start = len(data) - 20
+    with FileSlice(str(lines_file), start) as fs:
+        assert bytes(fs.view) == data[start:]
+        assert bytes(fs.readline()) == data[start : data.index(b"\n", start) + 1]
+
+
+def test_file_slice_split(lines_file: Path) -> None:
+    data = lines_file.read_bytes()
+    slices = FileSlice.split(str(lines_file), 7)
+    try:
+        assert b"".join(bytes(s.view) for s in slices) == data
+        assert all(bytes(s.view).endswith(b"\n") for s in slices)
+    finally:
+        for s in slices:
+            s.close()
+
+
+def test_file_slice_close_with_live_view(lines_file: Path) -> None:
+    fs = FileSlice(str(lines_file), 7, 21)
+    line = fs.readline()
+    with pytest.raises(BufferError):
+        fs.close()
+    assert bytes(fs[:6]) == b"line 1"
+    assert [bytes(x) for x in fs] == [b"line 2\n"]
+    line.release()
+    fs.close()
+
+
+def test_json_index_close_with_live_view(json_file: Path) -> None:
+    index = JsonIndex.build(str(json_file))
+    first = index.raw(0)
+    with pytest.raises(BufferError):
+        index.close()
+    assert index[1] == json.loads(bytes(index.raw(1)))
+    first.release()
+    index.close()
+
+
+def test_file_slice_empty(tmp_path: Path) -> None:
+    path = tmp_path / "empty.txt"
+    path.touch()
+    with FileSlice(str(path)) as fs:
+        assert len(fs) == 0
+        assert list(fs) == []
+        assert fs.find(b"x") == -1
+
+
+@pytest.fixture
+def json_file(tmp_path: Path) -> Path:
+    path = tmp_path / "records.json"
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(500):
+            if i % 3:
+                f.write(json.dumps({"id": i, "name": f"नमस्ते {i}"}) + "\n")
+            else:
+                f.write(json.dumps({"id": i, "tags": ["hello", "你好"]}, indent=2) + "\n")
+    return path
+
+
+def test_json_index_random_access(json_file: Path) -> None:
+    expected = list(stream_json_objects(str(json_file)))
+    with JsonIndex.build(str(json_file)) as index:
+        assert len(index) == len(expected)
+        assert index[0] == expected[0]
+        assert index[-1] == expected[-1]
+        assert index[10:20] == expected[10:20]
+        with pytest.raises(IndexError):
+            index.get(len(expected))
+
+
+def test_json_index_sidecar(json_file: Path) -> None:
+    expected = list(stream_json_objects(str(json_file)))
+    JsonIndex.build(str(json_file)).save()
+    with JsonIndex.load(str(json_file)) as index:
+        assert list(index) == expected
+
+    json_file.write_text('{"id": "changed"}\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="stale"):
+        JsonIndex.load(str(json_file))
+    with JsonIndex.open(str(json_file)) as index:
+        assert list(index) == [{"id": "changed"}]
+
+
+def test_stream_json_objects_parallel(json_file: Path) -> None:
+    expected = list(stream_json_objects(str(json_file)))
+    ordered = stream_json_objects_parallel(str(json_file), workers=2, chunk_size=1024)
+    assert list(ordered) == expected
+    unordered = stream_json_objects_parallel(
+        str(json_file), workers=2, ordered=False, chunk_size=1024
+    )
+    assert sorted(unordered, key=lambda x: x["id"]) == expected
+
+
+def _backend_name(raw: bytes) -> str:  # noqa: ARG001
+    return json_backend.get_backend().name
+
+
+def test_stream_json_objects_parallel_backend(
+    json_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import concurrent.futures
+    import functools
+    import multiprocessing
+
+    # Spawned workers start from a fresh interpreter instead of a copy of this one.
+    spawn = multiprocessing.get_context("spawn")
+    executor = functools.partial(concurrent.futures.ProcessPoolExecutor, mp_context=spawn)
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", executor)
+    json_backend.set_backend("json")
+    try:
+        names = stream_json_objects_parallel(str(json_file), _backend_name, workers=2)
+        assert set(names) == {"json"}
+    finally:
+        json_backend.set_backend(None)
+
+
+def test_stream_json_objects_buffered(json_file: Path) -> None:
+    expected = list(stream_json_objects(str(json_file)))
+    assert list(stream_json_objects(str(json_file), buffered=True)) == expected
+    assert list(stream_json_objects(str(json_file), buffered=True, block_size=7)) == expected
+
+
+def test_scan_json_objects_layouts() -> None:
+    records = [
+        {"text": 'braces } and { quotes \\" inside', "n": 1},
+        {"escape": "\\", "nested": {"a": [{"b": "}"}]}},
+        {"greeting": "नमस्ते", "city": "北京"},
+    ]
+    compact = "".join(json.dumps(r, ensure_ascii=False) for r in records).encode()
+    array_of_objects = json.dumps(records, indent=2).encode()
+    for data in (compact, array_of_objects):
+        for size in (1, 3, len(data)):
+            blocks = [data[i : i + size] for i in range(0, len(data), size)]
+            assert [json.loads(x) for x in scan_json_objects(blocks)] == records
+
+    with pytest.raises(ValueError, match="Unterminated"):
+        list(scan_json_objects([b'{"a": {"b": 1}']))
+    with pytest.raises(ValueError, match="Unterminated JSON string"):
+        list(scan_json_objects([b'{"a": 1}\n"', b'{"b": 2}\n', b'{"c": 3}\n']))
+
+
+@pytest.mark.parametrize("codec", ["gzip", "bz2", "lzma"])
+def test_stream_json_objects_compressed(json_file: Path, codec: str) -> None:
+    import importlib
+
+    module = importlib.import_module(codec)
+    compressed = json_file.with_suffix(".bin")  # the codec is sniffed, not taken from the name
+    compressed.write_bytes(module.compress(json_file.read_bytes()))
+
+    expected = list(stream_json_objects(str(json_file)))
+    assert list(stream_json_objects(str(compressed))) == expected
+    assert list(stream_json_objects(str(compressed), buffered=True, block_size=64)) == expected
+    with open_decompressed(str(compressed), buffer_size=16) as f:
+        assert f.read() == json_file.read_bytes()
+
+
+@pytest.fixture
+def json_payload(json_file: Path) -> tuple[bytes, list[Incomplete]]:
+    return json_file.read_bytes(), list(stream_json_objects(str(json_file)))
+
+
+@pytest.mark.asyncio
+async def test_astream_json_objects(json_payload: tuple[bytes, list[Incomplete]]) -> None:
+    import asyncio
+
+    data, expected = json_payload
+
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    assert [x async for x in astream_json_objects(reader)] == expected
+
+    async def blocks(size: int) -> AsyncIterator[bytes]:
+        for i in range(0, len(data), size):
+            await asyncio.sleep(0)
+            yield data[i : i + size]
+
+    assert [x async for x in astream_json_objects(blocks(5), offload_size=100)] == expected
+    with pytest.raises(ValueError, match="limit"):
+        [x async for x in astream_json_objects(blocks(64), limit=32)]
+
+
+@pytest.mark.asyncio
+async def test_astream_json_objects_long_lines() -> None:
+    import asyncio
+
+    record = {"id": 1, "text": "x" * (1 << 17)}
+    reader = asyncio.StreamReader()
+    reader.feed_data(json.dumps(record).encode() + b"\n" + b'{"id": 2}\n')
+    reader.feed_eof()
+    assert [x async for x in astream_json_objects(reader)] == [record, {"id": 2}]
+
+    reader = asyncio.StreamReader()
+    reader.feed_data(json.dumps(record).encode())
+    reader.feed_eof()
+    with pytest.raises(ValueError, match="limit"):
+        [x async for x in astream_json_objects(reader, limit=1 << 16)]
+
+
+def test_stream_json_objects_fields(json_file: Path) -> None:
+    expected = [(x["id"], x.get("tags")) for x in stream_json_objects(str(json_file))]
+    assert list(stream_json_objects(str(json_file), fields=["id", "tags"])) == expected
+    assert list(stream_json_objects(str(json_file), buffered=True, fields=["id", "tags"])) == (
+        expected
+    )
+    with pytest.raises(ValueError, match="Cannot set both"):
+        list(stream_json_objects(str(json_file), json.loads, fields=["id"]))  # type: ignore[call-overload]
+
+
+@pytest.mark.parametrize("scan_limit", [0.0, 1.0])
+def test_json_projector(scan_limit: float) -> None:
+    import pickle
+
+    record = {
+        "skip": [{"a": "]}"}, 'quotes \\" and \\\\'],
+        "user": {"name": "José", "city": {"name": "北京"}},
+        "id": 12.5e3,
+        "empty": {},
+    }
+    projector = JsonProjector(["user.city.name", ("id",), "missing", "user.missing"], scan_limit)
+    expected = ("北京", 12.5e3, None, None)
+    assert projector(json.dumps(record).encode()) == expected
+    assert projector(json.dumps(record, indent=4, ensure_ascii=False)) == expected
+    assert pickle.loads(pickle.dumps(projector))(json.dumps(record)) == expected  # noqa: S301
+    if scan_limit:
+        # Containers that were not requested are skipped without being decoded.
+        skipped = '{"skip": [undefined, {"a": tru}], "id": 1}'
+        assert JsonProjector(["id"], scan_limit)(skipped) == (1,)
+
+    # A repeated key counts as one field found.
+    assert JsonProjector(["a", "b"], scan_limit)('{"a": 1, "a": 2, "b": 3}') == (2, 3)
+
+    for bad in ('{"id": }', '{"id": 1', "[1]", '{"id" 1}'):
+        with pytest.raises(json.JSONDecodeError):
+            projector(bad)
+    with pytest.raises(ValueError, match="nested"):
+        JsonProjector(["user", "user.name"])
+
+
+class _CountingWatcher:
+    """Stands in for inotify, counting how many times the reader caught up with the writer."""
+
+    def __init__(self) -> None:
+        self.waits = 0
+        self.cond = threading.Condition()
+
+    def wait(self, timeout: float) -> None:  # noqa: ARG002
+        with self.cond:
+            self.waits += 1
+            self.cond.notify_all()
+        time.sleep(0.001)
+
+    def close(self) -> None:
+        pass
+
+    def caught_up(self) -> None:
+        """Block until the reader has read everything written before the call."""
+        with self.cond:
+            # A wait already under way may predate the last write, the one after it cannot.
+            target = self.waits + 2
+            assert self.cond.wait_for(lambda: self.waits >= target, timeout=10)
+
+
+@pytest.mark.parametrize("buffered", [False, True])
+def test_stream_json_objects_follow(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    buffered: bool,  # noqa: FBT001
+) -> None:
+    from dev_toolbox.file_utils import _follow
+
+    watcher = _CountingWatcher()
+    monkeypatch.setattr(_follow, "_watcher", lambda _: watcher)
+    path = tmp_path / "app.log"
+    records = [
+        {"level": "info", "message": "server started"},
+        {"level": "warn", "message": "磁盘空间不足", "detail": {"free": 3}},
+        {"level": "info", "message": "नया लॉग"},
+        {"level": "error", "message": "x"},
+    ]
+    pretty = json.dumps(records[1], indent=2, ensure_ascii=False).encode() + b"\n"
+    path.write_bytes(json.dumps(records[0]).encode() + b"\n")
+
+    def writer() -> None:
+        with path.open("ab") as f:
+            # A pretty-printed record flushed in two halves must not be yielded early.
+            f.write(pretty[:20])
+            f.flush()
+            watcher.caught_up()
+            f.write(pretty[20:])
+        watcher.caught_up()
+        # Rotation: the old file is moved away and a new one takes its place.
+        path.rename(tmp_path / "app.log.1")
+        path.write_bytes(json.dumps(records[2], ensure_ascii=False).encode() + b"\n")
+        watcher.caught_up()
+        # Truncation: the file is rewritten with less data than was already read.
+        path.write_bytes(json.dumps(records[3]).encode() + b"\n")
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        got = list(stream_json_objects(str(path), follow=True, idle_timeout=0.5, buffered=buffered))
+    finally:
+        thread.join()
+    assert got == records
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_resume_from_checkpoint(json_file: Path, tmp_path: Path, compressed: bool) -> None:  # noqa: FBT001
+    import gzip
+
+    expected = list(stream_json_objects(str(json_file)))
+    if compressed:
+        path = tmp_path / "data.json.gz"
+        path.write_bytes(gzip.compress(json_file.read_bytes()))
+    else:
+        path = json_file
+    ckpt_path = str(tmp_path / "ingest.ckpt")
+
+    def ingest() -> None:
+        with Checkpoint(ckpt_path, every=7) as ckpt:
+            for n, (_, offset) in enumerate(
+                stream_json_objects_with_offsets(str(path), start=ckpt.offset), 1
+            ):
+                ckpt.update(offset)
+                if n == 123:  # noqa: PLR2004
+                    msg = "the process crashed"
+                    raise RuntimeError(msg)
+
+    with pytest.raises(RuntimeError, match="crashed"):
+        ingest()
+
+    ckpt = Checkpoint(ckpt_path)
+    assert ckpt.records == 123  # noqa: PLR2004
+    assert list(stream_json_objects(str(path), start=ckpt.offset)) == expected[123:]
+    assert list(stream_json_objects(str(path), start=ckpt.offset, buffered=True)) == expected[123:]
+    ckpt.reset()
+    assert Checkpoint(ckpt_path).offset == 0
@@ -0,0 +1,876 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import TYPE_CHECKING
+from typing import Any
+
+import pytest
+
+from dev_toolbox.http import AsyncConnectionPool
+from dev_toolbox.http import AsyncRetryingClient
+from dev_toolbox.http import CachedClient
+from dev_toolbox.http import CircuitBreaker
+from dev_toolbox.http import CircuitOpenError
+from dev_toolbox.http import ConnectionPool
+from dev_toolbox.http import HTTPError
+from dev_toolbox.http import RateLimitedClient
+from dev_toolbox.http import RateLimiter
+from dev_toolbox.http import RequestTemplate
+from dev_toolbox.http import RequestTrace
+from dev_toolbox.http import RetryingClient
+from dev_toolbox.http import RetryPolicy
+from dev_toolbox.http import TokenBucket
+from dev_toolbox.http import TraceHistogram
+from dev_toolbox.http import trace_requests
+from dev_toolbox.http._http11 import ResponseParser
+from dev_toolbox.http.great_value import BufferedResponse
+from dev_toolbox.http.great_value import GreatValueRequests
+from dev_toolbox.http.great_value_async import AsyncGreatValueRequests
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+_LARGE_BLOCKS = 200
+
+
+def _large_lines(start: int, stop: int) -> list[bytes]:
+    return [f"line {i:06d} 行 पंक्ति\r\n".encode() for i in range(start, stop)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    # Idle keep-alive connections are closed by the server after this many seconds.
+    timeout = 0.5
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def _send(self, status: int, body: bytes, headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: C901, PLR0911
+        self.server.peers.add(self.client_address)  # type: ignore[attr-defined]
+        self.server.connections[self.client_address] = self.connection  # type: ignore[attr-defined]
+        hits = self.server.hits  # type: ignore[attr-defined]
+        hits[self.path] = hits.get(self.path, 0) + 1
+        if self.path.startswith("/slow"):
+            self._slow()
+            return
+        if self.path == "/chunks":
+            self._chunked([x.encode() for x in ('{"parts": ', '["one", "二", ', '"तीन"]}')])
+            return
+        if self.path.startswith("/large"):
+            self._large(chunked=self.path.endswith("/chunks"))
+            return
+        if self.path.startswith("/cache/"):
+            self._cached()
+            return
+        if self.path.startswith("/compressed/"):
+            self._compressed(self.path.rsplit("/", 1)[1])
+            return
+        if self.path.startswith("/flaky/"):
+            # Fails as many times as the last path segment says, then succeeds.
+            if self.server.hits[self.path] <= int(self.path.rsplit("/", 1)[1]):  # type: ignore[attr-defined]
+                self._send(503, b"{}", {"Retry-After": "0"})
+            else:
+                self._send(200, '{"status": "recovered", "text": "恢复"}'.encode())
+            return
+        if self.path.startswith("/close/"):
+            # Answers, then closes the connection whatever was pipelined after this request.
+            self.close_connection = True
+            self._send(200, json.dumps({"path": self.path}).encode(), {"Connection": "close"})
+            return
+        if self.path == "/fail":
+            self._send(500, b"{}")
+            return
+        if self.path == "/old":
+            self._send(301, b"", {"Location": "/hello?lang=es"})
+            return
+        self._send(200, json.dumps({"path": self.path, "message": "你好"}).encode())
+
+    def _slow(self) -> None:
+        import time
+
+        server = self.server
+        with server.lock:  # type: ignore[attr-defined]
+            server.active += 1  # type: ignore[attr-defined]
+            server.max_active = max(server.max_active, server.active)  # type: ignore[attr-defined]
+        time.sleep(0.02)
+        with server.lock:  # type: ignore[attr-defined]
+            server.active -= 1  # type: ignore[attr-defined]
+        self._send(200, json.dumps({"path": self.path}).encode())
+
+    def _large(self, *, chunked: bool) -> None:
+        block = b"".join(_large_lines(0, 1000))
+        self.send_response(200)
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(len(block) * _LARGE_BLOCKS))
+        self.end_headers()
+        for _ in range(_LARGE_BLOCKS):
+            self.wfile.write(f"{len(block):x}\r\n".encode() + block + b"\r\n" if chunked else block)
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+
+    def _cached(self) -> None:
+        if self.path.startswith("/cache/fresh"):
+            self._send(200, b'{"status": "fresh"}', {"Cache-Control": "max-age=60"})
+        elif self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+        else:
+            headers = {"ETag": '"v1"', "Cache-Control": "no-cache"}
+            self._send(200, '{"status": "validated", "text": "缓存"}'.encode(), headers)
+
+    def _compressed(self, variant: str) -> None:
+        import gzip
+        import zlib
+
+        self.server.accept_encoding = self.headers.get("Accept-Encoding")  # type: ignore[attr-defined]
+        body = b"".join(_large_lines(0, 20_000))
+        if variant == "br":
+            import brotli  # type: ignore[import-not-found,import-untyped,unused-ignore]
+
+            encoding, payload = "br", brotli.compress(body)
+        elif variant.startswith("gzip"):
+            half = len(body) // 2
+            members = (body[:half], body[half:]) if variant == "gzip-members" else (body,)
+            encoding, payload = "gzip", b"".join(gzip.compress(m) for m in members)
+        elif variant == "deflate-raw":
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            encoding, payload = "deflate", compressor.compress(body) + compressor.flush()
+        else:
+            encoding, payload = "deflate", zlib.compress(body)
+        if "chunks" in self.headers.get("X-Test", ""):
+            step = len(payload) // 7 + 1
+            self.send_response(200)
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(payload), step):
+                part = payload[i : i + step]
+                self.wfile.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self._send(200, payload, {"Content-Encoding": encoding})
+
+    def _chunked(self, parts: list[bytes]) -> None:
+        self.send_response(200)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for part in parts:
+            self.wfile.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self) -> None:
+        self.server.peers.add(self.client_address)  # type: ignore[attr-defined]
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self._send(201, body)
+
+
+@pytest.fixture
+def server() -> Iterator[ThreadingHTTPServer]:
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.peers = set()  # type: ignore[attr-defined]
+    httpd.connections = {}  # type: ignore[attr-defined]
+    httpd.lock = threading.Lock()  # type: ignore[attr-defined]
+    httpd.active = httpd.max_active = 0  # type: ignore[attr-defined]
+    httpd.hits = {}  # type: ignore[attr-defined]
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def base_url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def test_pool_reuses_connections(server: ThreadingHTTPServer, base_url: str) -> None:
+    with ConnectionPool(max_size=2) as pool:
+        client = GreatValueRequests(base_url=base_url, pool=pool)
+        for i in range(5):
+            assert client.request(method="GET", url=f"item/{i}").json() == {
+                "path": f"/item/{i}",
+                "message": "你好",
+            }
+        response = client.request(method="POST", url="item", json={"name": "नमस्ते"})
+        assert response.response.status == 201  # noqa: PLR2004
+        assert response.json() == {"name": "नमस्ते"}
+    assert len(server.peers) == 1  # type: ignore[attr-defined]
+
+
+def test_pool_replaces_connections_closed_by_server(
+    server: ThreadingHTTPServer, base_url: str
+) -> None:
+    import socket
+
+    client = GreatValueRequests(base_url=base_url, pool=ConnectionPool())
+    assert client.request(method="GET", url="one").json()["path"] == "/one"
+    # The server drops the idle connection.
+    (connection,) = server.connections.values()  # type: ignore[attr-defined]
+    connection.shutdown(socket.SHUT_RDWR)
+    assert client.request(method="GET", url="two").json()["path"] == "/two"
+    assert len(server.peers) == 2  # type: ignore[attr-defined]  # noqa: PLR2004
+
+
+def test_pool_frees_slots_of_abandoned_responses(
+    server: ThreadingHTTPServer, base_url: str
+) -> None:
+    import gc
+
+    with ConnectionPool(max_size=2) as pool:
+        client = GreatValueRequests(base_url=base_url, pool=pool)
+        for path in ("first", "second"):
+            client.request(method="GET", url=path).raise_for_status()
+        gc.collect()
+        for i in range(5):
+            assert client.request(method="GET", url=f"item/{i}").json()["path"] == f"/item/{i}"
+        # The two abandoned connections are replaced once, then reused.
+        assert len(server.peers) == 3  # type: ignore[attr-defined]  # noqa: PLR2004
+        assert repr(pool).endswith(f"connections={{'{base_url[:-1]}': 1}})")
+
+
+def test_pool_frees_slots_of_closed_responses(server: ThreadingHTTPServer, base_url: str) -> None:
+    with ConnectionPool(max_size=1) as pool:
+        client = GreatValueRequests(base_url=base_url, pool=pool)
+        stream = client.request(method="GET", url="large")
+        stream.response.read(10)
+        stream.response.close()
+        for i in range(3):
+            assert client.request(method="GET", url=f"item/{i}").json()["path"] == f"/item/{i}"
+        assert len(server.peers) == 2  # type: ignore[attr-defined]  # noqa: PLR2004
+
+
+def test_pool_concurrent_requests_and_redirects(base_url: str) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    pool = ConnectionPool(max_size=2)
+    client = GreatValueRequests(base_url=base_url, pool=pool)
+    with ThreadPoolExecutor(4) as executor:
+        results = list(
+            executor.map(lambda i: client.request(method="GET", url=f"x/{i}").json(), range(20))
+        )
+    assert [r["path"] for r in results] == [f"/x/{i}" for i in range(20)]
+    assert client.request(method="GET", url="old").json()["path"] == "/hello?lang=es"
+    assert "connections" in repr(pool)
+    pool.close()
+
+
+def test_response_parser_pipelined_and_chunked() -> None:
+    parser = ResponseParser()
+    for method in ("GET", "HEAD", "GET"):
+        parser.expect(method)
+    stream = (
+        b"HTTP/1.1 200 OK\r\nContent-Length: 6\r\n\r\nhello!"
+        b"HTTP/1.1 200 OK\r\nContent-Length: 99\r\n\r\n"
+        b"HTTP/1.1 100 Continue\r\n\r\n"
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+        b"3;ext=1\r\n\xe4\xbd\xa0\r\n3\r\n\xe5\xa5\xbd\r\n0\r\nX-Done: yes\r\n\r\n"
+    )
+    responses = []
+    for i in range(0, len(stream), 7):
+        responses.extend(parser.feed(stream[i : i + 7]))
+    assert [r.body for r in responses] == [b"hello!", b"", "你好".encode()]
+    assert [r.keep_alive for r in responses] == [True, True, False]
+    assert responses[1].headers["content-length"] == "99"
+    assert parser.idle
+    assert parser.feed_eof() == []
+
+
+@pytest.mark.asyncio
+async def test_async_client_fan_out(server: ThreadingHTTPServer, base_url: str) -> None:
+    import asyncio
+
+    async with AsyncConnectionPool(limit=4) as pool:
+        client = AsyncGreatValueRequests(base_url=base_url, pool=pool)
+        templates = [RequestTemplate(method="GET", url=f"slow/{i}") for i in range(40)]
+        results = await asyncio.gather(*(t.json(client) for t in templates))
+        assert [r["path"] for r in results] == [f"/slow/{i}" for i in range(40)]
+        assert server.max_active <= 4  # type: ignore[attr-defined]  # noqa: PLR2004
+        assert len(server.peers) <= 4  # type: ignore[attr-defined]  # noqa: PLR2004
+
+        response = await client.request(method="GET", url="chunks")
+        assert response.json() == {"parts": ["one", "二", "तीन"]}
+        response = await client.request(method="POST", url="echo", json={"key": "value"})
+        assert response.status == 201  # noqa: PLR2004
+        assert response.json() == {"key": "value"}
+        response = await client.request(method="GET", url="old")
+        assert response.url.endswith("/hello?lang=es")
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_request_template_map(base_url: str, ordered: bool) -> None:  # noqa: FBT001
+    client = GreatValueRequests(base_url=base_url, pool=ConnectionPool())
+    template = RequestTemplate(method="GET", url="slow/0")
+    templates = [
+        *template.expand({"url": f"slow/{i}"} for i in range(30)),
+        template.replace(url="fail"),
+    ]
+    results = list(
+        RequestTemplate.map(client, templates, max_workers=4, ordered=ordered, json=True)
+    )
+
+    assert len(results) == 31  # noqa: PLR2004
+    if ordered:
+        assert [r.position for r in results] == list(range(31))
+    ok = sorted((r for r in results if r.ok), key=lambda r: r.position)
+    assert [r.response["path"] for r in ok] == [f"/slow/{i}" for i in range(30)]  # type: ignore[index]
+    (failed,) = (r for r in results if not r.ok)
+    assert failed.template is templates[-1]
+    assert "500 Server Error" in str(failed.error)
+
+
+@pytest.mark.asyncio
+async def test_request_template_gather(server: ThreadingHTTPServer, base_url: str) -> None:
+    client = AsyncGreatValueRequests(base_url=base_url, pool=AsyncConnectionPool())
+    template = RequestTemplate(method="GET", url="slow")
+    results = [
+        r
+        async for r in RequestTemplate.gather(
+            client,
+            template.expand({"params": {"page": i, "lang": "हिन्दी"}} for i in range(50)),
+            limit=5,
+            ordered=True,
+            json=True,
+        )
+    ]
+    assert [r.position for r in results] == list(range(50))
+    assert all(r.ok for r in results)
+    assert results[7].response["path"].startswith("/slow?page=7&")  # type: ignore[index]
+    assert server.max_active <= 5  # type: ignore[attr-defined]  # noqa: PLR2004
+
+
+@pytest.mark.parametrize("pooled", [True, False])
+def test_cached_client(
+    server: ThreadingHTTPServer,
+    base_url: str,
+    tmp_path: Path,
+    pooled: bool,  # noqa: FBT001
+) -> None:
+    pool = ConnectionPool() if pooled else None
+    client = CachedClient(GreatValueRequests(base_url=base_url, pool=pool), str(tmp_path))
+    hits = server.hits  # type: ignore[attr-defined]
+
+    fresh = RequestTemplate(method="GET", url=f"{base_url}cache/fresh", params={"b": 2, "a": 1})
+    first = fresh.request(client)
+    assert not first.from_cache
+    second = fresh.replace(params=[("a", 1), ("b", 2)]).request(client)
+    assert second.from_cache
+    assert second.json() == {"status": "fresh"}
+    assert hits["/cache/fresh?b=2&a=1"] == 1
+
+    validated = RequestTemplate(method="GET", url=f"{base_url}cache/etag")
+    assert not validated.request(client).from_cache
+    again = validated.request(client)
+    assert again.from_cache
+    assert again.json() == {"status": "validated", "text": "缓存"}
+    assert again.headers["ETag"] == '"v1"'
+    # no-cache: every use is revalidated, but the body is only downloaded once.
+    assert hits["/cache/etag"] == 2  # noqa: PLR2004
+
+
+def test_cached_client_lru_bound(base_url: str, tmp_path: Path) -> None:
+    import os
+
+    client = CachedClient(GreatValueRequests(base_url=base_url), str(tmp_path), max_size=600)
+    for i in range(10):
+        client.request(method="GET", url=f"cache/fresh/{i}")
+    total = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert 0 < total <= 600  # noqa: PLR2004
+    assert client.request(method="GET", url="cache/fresh/9").from_cache
+    assert not client.request(method="GET", url="cache/fresh/0").from_cache
+
+
+def test_cached_client_stacked(base_url: str, tmp_path: Path) -> None:
+    limiter = RateLimiter(1000)
+    cached = CachedClient(GreatValueRequests(base_url=base_url), str(tmp_path))
+    assert cached.base_url == base_url
+    assert callable(cached.bulk_get)
+    client = RetryingClient(RateLimitedClient(cached, limiter))
+    assert client.request(method="GET", url="cache/fresh/0").json() == {"status": "fresh"}
+    # Relative urls are limited under the host of the wrapped client's base url.
+    assert list(limiter._buckets) == [base_url.split("/")[2]]  # noqa: SLF001
+
+
+@pytest.mark.parametrize("url", ["large", "large/chunks"])
+def test_streaming_body(base_url: str, tmp_path: Path, url: str) -> None:
+    import hashlib
+    import tracemalloc
+
+    client = GreatValueRequests(base_url=base_url, pool=ConnectionPool())
+    expected = b"".join(_large_lines(0, 1000)) * _LARGE_BLOCKS
+
+    digest = hashlib.sha256()
+    for chunk in client.request(method="GET", url=url).iter_bytes(10_000):
+        assert len(chunk) <= 10_000  # noqa: PLR2004
+        digest.update(chunk)
+    assert digest.digest() == hashlib.sha256(expected).digest()
+
+    lines = client.request(method="GET", url=url).iter_lines()
+    assert [next(lines) for _ in range(2)] == [x.rstrip() for x in _large_lines(0, 2)]
+    assert sum(1 for _ in lines) == 1000 * _LARGE_BLOCKS - 2
+
+    target = tmp_path / "download.txt"
+    response = client.request(method="GET", url=url)
+    tracemalloc.start()
+    try:
+        written = response.save_to(target, chunk_size=1 << 16)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert written == len(expected)
+    assert target.read_bytes() == expected
+    assert peak < len(expected) // 20
+
+
+@pytest.mark.parametrize("variant", ["gzip", "gzip-members", "deflate", "deflate-raw"])
+@pytest.mark.parametrize("chunked", [True, False])
+@pytest.mark.parametrize("pooled", [True, False])
+def test_compressed_responses(  # noqa: PLR0913, PLR0917
+    server: ThreadingHTTPServer,
+    base_url: str,
+    tmp_path: Path,
+    variant: str,
+    chunked: bool,  # noqa: FBT001
+    pooled: bool,  # noqa: FBT001
+) -> None:
+    expected = b"".join(_large_lines(0, 20_000))
+    client = GreatValueRequests(
+        base_url=base_url,
+        headers={"X-Test": "chunks" if chunked else "whole"},
+        pool=ConnectionPool() if pooled else None,
+    )
+    url = f"compressed/{variant}"
+
+    response = client.request(method="GET", url=url)
+    assert "gzip" in server.accept_encoding  # type: ignore[attr-defined]
+    assert "Content-Encoding" not in response.headers
+    assert response.read() == expected
+
+    lines = list(client.request(method="GET", url=url).iter_lines())
+    assert lines == [x.rstrip() for x in _large_lines(0, 20_000)]
+
+    target = tmp_path / "decompressed.txt"
+    assert client.request(method="GET", url=url).save_to(target, chunk_size=4096) == len(expected)
+    assert target.read_bytes() == expected
+
+
+@pytest.mark.asyncio
+async def test_compressed_responses_async(server: ThreadingHTTPServer, base_url: str) -> None:
+    async with AsyncConnectionPool() as pool:
+        client = AsyncGreatValueRequests(base_url=base_url, pool=pool)
+        for variant in ("gzip", "deflate-raw"):
+            response = await client.request(method="GET", url=f"compressed/{variant}")
+            assert "Content-Encoding" not in response.headers
+            assert response.read() == b"".join(_large_lines(0, 20_000))
+    assert "deflate" in server.accept_encoding  # type: ignore[attr-defined]
+
+
+def test_brotli_response(base_url: str) -> None:
+    pytest.importorskip("brotli")
+    client = GreatValueRequests(base_url=base_url, pool=ConnectionPool())
+    response = client.request(method="GET", url="compressed/br")
+    assert response.read() == b"".join(_large_lines(0, 20_000))
+
+
+def test_brotli_output_is_bounded() -> None:
+    brotli = pytest.importorskip("brotli")
+    if not hasattr(brotli.Decompressor(), "can_accept_more_data"):
+        pytest.skip("brotli < 1.2 does not bound its output")
+    from dev_toolbox.http._encoding import _BrotliDecoder
+
+    body = bytes(16 << 20)
+    decoder = _BrotliDecoder()
+    chunks = [decoder.decode(brotli.compress(body, quality=1), 1 << 16)]
+    while not decoder.needs_input():
+        chunks.append(decoder.decode(b"", 1 << 16))
+    # brotli grows its output buffer in blocks, so it can overshoot the limit by one block.
+    assert max(map(len, chunks)) < 2 << 16
+    assert b"".join(chunks) == body
+
+
+def test_explicit_accept_encoding_is_kept(server: ThreadingHTTPServer, base_url: str) -> None:
+    client = GreatValueRequests(base_url=base_url, headers={"Accept-Encoding": "gzip"})
+    response = client.request(method="GET", url="compressed/gzip")
+    assert server.accept_encoding == "gzip"  # type: ignore[attr-defined]
+    assert response.read() == b"".join(_large_lines(0, 20_000))
+
+
+def test_retry_policy_delays() -> None:
+    import email.utils
+    import http.client
+    import time
+
+    policy = RetryPolicy(total=4, backoff_factor=0.5, backoff_max=1.5, jitter=False)
+    assert [policy.delay(n) for n in range(5)] == [0.5, 1.0, 1.5, 1.5, None]
+    jittered = RetryPolicy(backoff_factor=1.0)
+    assert all(0 <= jittered.delay(2) <= 4.0 for _ in range(100))  # type: ignore[operator]  # noqa: PLR2004
+
+    headers = http.client.HTTPMessage()
+    headers["Retry-After"] = "7"
+    assert policy.delay(0, headers) == 7.0  # noqa: PLR2004
+    del headers["Retry-After"]
+    headers["Retry-After"] = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 < policy.delay(0, headers) <= 30  # type: ignore[operator]  # noqa: PLR2004
+    assert policy._replace(retry_after_max=10).delay(0, headers) is None
+
+
+@pytest.mark.parametrize("pooled", [True, False])
+def test_retrying_client(server: ThreadingHTTPServer, base_url: str, pooled: bool) -> None:  # noqa: FBT001
+    pool = ConnectionPool() if pooled else None
+    client = RetryingClient(
+        GreatValueRequests(base_url=base_url, pool=pool), RetryPolicy(backoff_factor=0.01)
+    )
+    assert RequestTemplate(method="GET", url="flaky/2").json(client)["text"] == "恢复"
+    assert server.hits["/flaky/2"] == 3  # type: ignore[attr-defined]  # noqa: PLR2004
+
+    with pytest.raises(HTTPError) as excinfo:
+        RequestTemplate(method="GET", url="flaky/5").json(client)
+    assert excinfo.value.code == 503  # noqa: PLR2004
+    assert excinfo.value.headers["Retry-After"] == "0"
+    assert server.hits["/flaky/5"] == 4  # type: ignore[attr-defined]  # noqa: PLR2004
+
+    # Not retried, 500 is not one of the policy's statuses.
+    with pytest.raises(HTTPError):
+        RequestTemplate(method="GET", url="fail").json(client)
+    assert server.hits["/fail"] == 1  # type: ignore[attr-defined]
+
+
+def test_http_error_is_structured(base_url: str) -> None:
+    client = GreatValueRequests(base_url=base_url, pool=ConnectionPool())
+    response = client.request(method="GET", url="flaky/1")
+    with pytest.raises(HTTPError, match="503 Server Error") as excinfo:
+        response.raise_for_status()
+    assert excinfo.value.status_code == 503  # noqa: PLR2004
+    assert excinfo.value.url == f"{base_url}flaky/1"
+    assert excinfo.value.headers["Retry-After"] == "0"
+
+
+def test_circuit_breaker(server: ThreadingHTTPServer, base_url: str) -> None:
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    client = RetryingClient(
+        GreatValueRequests(base_url=base_url, pool=ConnectionPool()),
+        RetryPolicy(total=0, statuses=frozenset((500,))),
+        breaker,
+    )
+    host = base_url.split("/")[2]
+    for _ in range(2):
+        assert client.request(method="GET", url="fail").status_code == 500  # noqa: PLR2004
+    assert breaker.state(host) == "open"
+    with pytest.raises(CircuitOpenError):
+        client.request(method="GET", url="hello")
+    assert "/hello" not in server.hits  # type: ignore[attr-defined]
+
+    now[0] += 9.9
+    assert breaker.state(host) == "open"
+    now[0] += 0.1
+    assert breaker.state(host) == "half-open"
+    client.request(method="GET", url="fail")
+    assert breaker.state(host) == "open"
+
+    now[0] += 10
+    assert client.request(method="GET", url="hello").json()["message"] == "你好"
+    assert breaker.state(host) == "closed"
+    assert server.hits == {"/fail": 3, "/hello": 1}  # type: ignore[attr-defined]
+
+
+class _ScriptedClient:
+    """Returns or raises the next item of ``script`` on each request."""
+
+    base_url = "http://scripted.example/"
+
+    def __init__(self, *script: object) -> None:
+        self.script = list(script)
+
+    def _next(self) -> Any:  # noqa: ANN401
+        item = self.script.pop(0)
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    def request(self, **kwargs: object) -> Any:  # noqa: ARG002, ANN401
+        return self._next()
+
+
+class _ScriptedAsyncClient(_ScriptedClient):
+    async def request(self, **kwargs: object) -> Any:  # noqa: ARG002, ANN401
+        return self._next()
+
+
+class _Status:
+    def __init__(self, status_code: int) -> None:
+        self.status_code = status_code
+
+
+def test_circuit_breaker_probe_error() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    client = RetryingClient(
+        _ScriptedClient(_Status(500), ValueError("bad payload"), _Status(200)),
+        RetryPolicy(total=0, statuses=frozenset((500,))),
+        breaker,
+    )
+    assert client.request(method="GET", url="a").status_code == 500  # noqa: PLR2004
+    # The probe fails without telling anything about the host: the next request probes again.
+    with pytest.raises(ValueError, match="bad payload"):
+        client.request(method="GET", url="a")
+    assert client.request(method="GET", url="a").status_code == 200  # noqa: PLR2004
+    assert breaker.state("scripted.example") == "closed"
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_probe_cancelled() -> None:
+    import asyncio
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    client = AsyncRetryingClient(
+        _ScriptedAsyncClient(_Status(500), asyncio.CancelledError(), _Status(200)),
+        RetryPolicy(total=0, statuses=frozenset((500,))),
+        breaker,
+    )
+    assert (await client.request(method="GET", url="a")).status_code == 500  # noqa: PLR2004
+    with pytest.raises(asyncio.CancelledError):
+        await client.request(method="GET", url="a")
+    assert (await client.request(method="GET", url="a")).status_code == 200  # noqa: PLR2004
+    assert breaker.state("scripted.example") == "closed"
+
+
+@pytest.mark.asyncio
+async def test_async_retrying_client(server: ThreadingHTTPServer, base_url: str) -> None:
+    async with AsyncConnectionPool() as pool:
+        client = AsyncRetryingClient(
+            AsyncGreatValueRequests(base_url=base_url, pool=pool),
+            RetryPolicy(backoff_factor=0.01),
+            CircuitBreaker(failure_threshold=10),
+        )
+        data = await RequestTemplate(method="GET", url="flaky/3").json(client)
+    assert data["status"] == "recovered"
+    assert server.hits["/flaky/3"] == 4  # type: ignore[attr-defined]  # noqa: PLR2004
+
+
+def test_token_bucket_threads() -> None:
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    bucket = TokenBucket(rate=500, capacity=10)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(16) as executor:
+        assert all(executor.map(lambda _: bucket.acquire(), range(260)))
+    elapsed = time.perf_counter() - start
+    # 10 tokens of burst, then 250 more at 500 per second.
+    assert elapsed > 0.45  # noqa: PLR2004
+    assert not bucket.acquire(5, timeout=0.001)
+    assert bucket.acquire(timeout=0.01)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_async() -> None:
+    import asyncio
+    import time
+
+    bucket = TokenBucket(rate=400, capacity=1)
+    start = time.perf_counter()
+    assert all(await asyncio.gather(*(bucket.aacquire() for _ in range(101))))
+    assert time.perf_counter() - start > 0.2  # noqa: PLR2004
+
+
+def test_token_bucket_clock() -> None:
+    now = [0.0]
+    bucket = TokenBucket(rate=10, capacity=2, clock=lambda: now[0])
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    # The burst is spent, the next token comes in 0.1s.
+    assert not bucket.acquire(timeout=0.09)
+    now[0] += 0.1
+    assert bucket.acquire(timeout=0)
+    now[0] += 10
+    assert bucket.acquire(2, timeout=0)
+    assert not bucket.acquire(timeout=0)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_cancelled_refund() -> None:
+    import asyncio
+
+    now = [0.0]
+    bucket = TokenBucket(rate=1, capacity=1, clock=lambda: now[0])
+    assert await bucket.aacquire()
+    waiter = asyncio.ensure_future(bucket.aacquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    # The cancelled caller's token goes to the next one.
+    now[0] += 1
+    assert bucket.acquire(timeout=0)
+
+
+def test_rate_limited_client(base_url: str) -> None:
+    import time
+
+    host = base_url.split("/")[2]
+    limiter = RateLimiter(1000, per_host={host: (50, 1)})
+    assert limiter.bucket(base_url) is limiter.bucket(host)
+    assert limiter.bucket("https://pypi.org/simple/").rate == 1000  # noqa: PLR2004
+
+    client = RateLimitedClient(
+        GreatValueRequests(base_url=base_url, pool=ConnectionPool()), limiter
+    )
+    assert client.base_url == base_url
+    start = time.perf_counter()
+    results = RequestTemplate.map(
+        client, (RequestTemplate(method="GET", url=f"path/{i}") for i in range(11)), json=True
+    )
+    assert all(r.ok for r in results)
+    assert time.perf_counter() - start > 0.18  # noqa: PLR2004
+
+
+@pytest.mark.parametrize("pooled", [True, False])
+def test_request_traces(base_url: str, pooled: bool) -> None:  # noqa: FBT001
+    traces: list[RequestTrace] = []
+    client = GreatValueRequests(
+        base_url=base_url, pool=ConnectionPool() if pooled else None, hooks=(traces.append,)
+    )
+    expected = b"".join(_large_lines(0, 1000)) * _LARGE_BLOCKS
+    assert len(client.request(method="GET", url="large").read()) == len(expected)
+    # Followed redirects are traced as separate requests.
+    assert client.request(method="GET", url="old").json()["message"] == "你好"
+
+    first, redirect, final = traces
+    assert (first.method, first.url, first.status) == ("GET", f"{base_url}large", 200)
+    assert not first.reused
+    assert first.dns is not None
+    assert first.connect is not None
+    assert first.tls is None
+    assert 0 < first.ttfb <= first.total  # type: ignore[operator]
+    assert first.bytes_received > len(expected)
+    assert first.bytes_sent > 0
+    assert redirect.status == 301  # noqa: PLR2004
+    assert final.url == f"{base_url}hello?lang=es"
+    assert final.reused == pooled
+    assert (final.dns is None) == pooled
+    assert final.error is None
+
+
+def test_trace_hooks_and_histogram(base_url: str) -> None:
+    histogram = TraceHistogram()
+    seen: list[RequestTrace] = []
+    client = GreatValueRequests(base_url=base_url, pool=ConnectionPool())
+    for i in range(5):
+        RequestTemplate(method="GET", url=f"slow/{i}").request(client, hooks=[histogram]).read()
+    with trace_requests(seen.append):
+        RequestTemplate(method="GET", url="slow/final").json(client)
+    RequestTemplate(method="GET", url="untraced").json(client)
+    assert [t.url for t in seen] == [f"{base_url}slow/final"]
+
+    host = base_url.split("/")[2]
+    rows = {row["phase"]: row for row in histogram.summary()}
+    assert set(rows) == {"dns", "connect", "ttfb", "total"}
+    assert rows["total"]["count"] == 5  # noqa: PLR2004
+    assert rows["dns"]["count"] == 1
+    # The requests take over 20ms, estimates are only as precise as the (10ms, 25ms] bucket.
+    assert 10 <= rows["total"]["p50_ms"] <= rows["total"]["p99_ms"] <= rows["total"]["max_ms"]  # noqa: PLR2004
+    assert rows["total"]["max_ms"] >= 20  # noqa: PLR2004
+
+    exported = histogram.export()
+    assert sum(exported["hosts"][host]["phases"]["ttfb"]["counts"]) == 5  # noqa: PLR2004
+    assert exported["hosts"][host]["bytes_received"] > 0
+    histogram.reset()
+    assert histogram.summary() == []
+
+
+@pytest.mark.asyncio
+async def test_request_traces_async(base_url: str) -> None:
+    traces: list[RequestTrace] = []
+    async with AsyncConnectionPool() as pool:
+        client = AsyncGreatValueRequests(base_url=base_url, pool=pool)
+        first = RequestTemplate(method="GET", url="item/1").request(client, hooks=[traces.append])
+        # The hooks are active when the request is sent, not when the coroutine is created.
+        assert traces == []
+        assert (await first).status == 200  # noqa: PLR2004
+        await RequestTemplate(method="GET", url="item/2").request(client, hooks=[traces.append])
+        await client.request(method="GET", url="untraced")
+
+    first_trace, second_trace = traces
+    assert (first_trace.url, first_trace.status) == (f"{base_url}item/1", 200)
+    assert not first_trace.reused
+    assert first_trace.connect is not None
+    assert 0 < first_trace.ttfb <= first_trace.total  # type: ignore[operator]
+    assert first_trace.bytes_sent > 0
+    assert first_trace.bytes_received > 0
+    assert second_trace.reused
+    assert second_trace.connect is None
+
+
+@pytest.mark.parametrize("pipeline", [1, 8])
+def test_bulk_get(server: ThreadingHTTPServer, base_url: str, pipeline: int) -> None:
+    client = GreatValueRequests(base_url=base_url, headers={"Accept": "application/json"})
+    urls = [f"project/{i}" if i % 50 else f"close/{i}" for i in range(300)]
+    results = {r.position: r for r in client.bulk_get(iter(urls), connections=3, pipeline=pipeline)}
+    assert sorted(results) == list(range(300))
+    for i, result in results.items():
+        assert result.ok
+        assert result.url == f"{base_url}{urls[i]}"
+        response = result.response
+        assert isinstance(response, BufferedResponse)
+        response.raise_for_status()
+        assert response.json()["path"] == f"/{urls[i]}"
+        assert response.url == f"{base_url}{urls[i]}"
+    # Three connections, plus the ones replacing those closed by the server.
+    assert len(server.peers) <= 3 + 6  # type: ignore[attr-defined]
+    assert sum(server.hits.values()) >= 300  # type: ignore[attr-defined]  # noqa: PLR2004
+
+
+def test_bulk_get_reports_failures_per_url(base_url: str) -> None:
+    import socket
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        refused = f"http://127.0.0.1:{s.getsockname()[1]}/"
+
+    class Client(GreatValueRequests):
+        def construct_url(self, base_url: str | None, endpoint: str, params: Any) -> str:  # noqa: ANN401
+            return super().construct_url(base_url, endpoint.replace("old/", "item/"), params)
+
+    urls = ["old/1", f"{refused}item/2", "ftp://127.0.0.1/item/3", "old/4"]
+    results = sorted(Client(base_url=base_url).bulk_get(urls, connections=1, pipeline=1))
+    assert [r.ok for r in results] == [True, False, False, True]
+    assert [r.url for r in results] == [
+        f"{base_url}item/1",
+        f"{refused}item/2",
+        urls[2],
+        f"{base_url}item/4",
+    ]
+    assert results[0].response.json()["path"] == "/item/1"  # type: ignore[union-attr]
+    assert isinstance(results[1].error, ConnectionRefusedError)
+    assert isinstance(results[2].error, ValueError)
+
+
+def test_bulk_get_compressed_and_lazy(base_url: str) -> None:
+    client = GreatValueRequests(base_url=base_url)
+    responses = client.bulk_get(f"compressed/{v}" for v in ("gzip", "deflate-raw", "gzip"))
+    first = next(responses)
+    assert first.response is not None
+    assert first.response.read() == b"".join(_large_lines(0, 20_000))
+    assert "Content-Encoding" not in first.response.headers
+    assert sorted([first.position, *(r.position for r in responses)]) == [0, 1, 2]
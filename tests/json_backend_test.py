@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from dev_toolbox import json_backend
+
+PAYLOAD = {
+    "name": "José",
+    "city": "北京",
+    "greeting": "नमस्ते",
+    "values": [1, 2.5, None, True],
+    "nested": {"b": 1, "a": "x/y"},
+}
+
+
+@pytest.fixture(autouse=True)
+def _reset_backend() -> None:
+    json_backend.set_backend(None)
+
+
+@pytest.mark.parametrize("name", json_backend.available_backends())
+def test_backend_round_trip(name: str) -> None:
+    backend = json_backend.get_backend(name)
+    assert backend.name == name
+    assert backend.loads(backend.dump_bytes(PAYLOAD)) == PAYLOAD
+    assert backend.loads(backend.dumps(PAYLOAD)) == PAYLOAD
+
+    pretty = backend.dumps(PAYLOAD, indent=True, sort_keys=True)
+    assert pretty == json.dumps(PAYLOAD, indent=2, sort_keys=True, ensure_ascii=False)
+
+    with pytest.raises(ValueError):  # noqa: PT011
+        backend.loads(b'{"unterminated": ')
+
+
+def test_backend_selection(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert json_backend.get_backend().name == json_backend.available_backends()[0]
+    json_backend.set_backend("json")
+    assert json_backend.get_backend().name == "json"
+    assert json_backend.loads(json_backend.dump_bytes(PAYLOAD)) == PAYLOAD
+
+    json_backend.set_backend(None)
+    monkeypatch.setenv(json_backend.ENV_VAR, "json")
+    assert json_backend.get_backend().name == "json"
+
+    with pytest.raises(ValueError, match="Unknown JSON backend"):
+        json_backend.get_backend("simdjson-missing")
+
+
+def test_register_backend(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(json_backend, "_REGISTRY", dict(json_backend._REGISTRY))  # noqa: SLF001
+
+    def missing() -> json_backend.JsonBackend:
+        raise ImportError
+
+    json_backend.register_backend("missing", missing, preferred=True)
+    assert "missing" not in json_backend.available_backends()
+
+    stdlib = json_backend.get_backend("json")
+    json_backend.register_backend("custom", lambda: stdlib._replace(name="custom"), preferred=True)
+    assert json_backend.get_backend().name == "custom"
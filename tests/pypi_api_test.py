@@ -0,0 +1,561 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import TYPE_CHECKING
+from typing import Any
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dev_toolbox.http import RateLimiter
+from dev_toolbox.pypi_api import AsyncPypiIndexApi
+from dev_toolbox.pypi_api import MetadataCache
+from dev_toolbox.pypi_api import MetadataResult
+from dev_toolbox.pypi_api import OfflineError
+from dev_toolbox.pypi_api import PypiIndexApi
+from dev_toolbox.pypi_api import PypiMirror
+from dev_toolbox.pypi_api import version_key
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from collections.abc import Mapping
+    from pathlib import Path
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+class _Response:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class _Client:
+    def __init__(self) -> None:
+        self.urls: list[str] = []
+
+    def get(self, url: str, **kwargs: Any) -> _Response:  # noqa: ARG002, ANN401
+        self.urls.append(url)
+        return _Response('{"projects": [{"name": "requests"}, {"name": "naïve-package"}]}')
+
+
+def test_rate_limited_index() -> None:
+    client = _Client()
+    api = PypiIndexApi(client, rate_limiter=RateLimiter(100, 1))  # type: ignore[arg-type,unused-ignore]
+    start = time.perf_counter()
+    for _ in range(6):
+        assert api.get_all_projects() == ["requests", "naïve-package"]
+    assert time.perf_counter() - start > 0.045  # noqa: PLR2004
+    assert client.urls == ["https://pypi.org/simple/"] * 6
+
+
+class _IndexClient:
+    """Answers ``/pypi/<name>/json`` after ``delay``, 404 for names starting with ``missing``."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _in_flight(self) -> Iterator[None]:
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def _response(self, url: str) -> _Response:
+        name = url.split("/")[-2]
+        if name.startswith("missing"):
+            msg = f"404 Not Found: {url}"
+            raise LookupError(msg)
+        return _Response(f'{{"info": {{"name": "{name}", "version": "1.0", "license": "MIT"}}}}')
+
+    def get(self, url: str, **kwargs: Any) -> _Response:  # noqa: ARG002, ANN401
+        with self._in_flight():
+            time.sleep(self.delay)
+        return self._response(url)
+
+
+class _AsyncIndexClient(_IndexClient):
+    async def get(self, url: str, **kwargs: Any) -> _Response:  # type: ignore[override]  # noqa: ARG002, ANN401
+        with self._in_flight():
+            await asyncio.sleep(self.delay)
+        return self._response(url)
+
+
+_NAMES = [f"package-{i}" if i % 10 else f"missing-{i}" for i in range(200)]
+
+
+def _check(results: list[MetadataResult]) -> None:
+    assert sorted(r.name for r in results) == sorted(_NAMES)
+    for result in results:
+        if result.name.startswith("missing"):
+            assert not result.ok
+            assert isinstance(result.error, LookupError)
+        else:
+            assert result.ok
+            assert result.metadata == {"name": result.name, "version": "1.0"}
+
+
+def test_get_metadata_many() -> None:
+    client = _IndexClient(0.02)
+    api = PypiIndexApi(client)  # type: ignore[arg-type,unused-ignore]
+    results = list(api.get_metadata_many(iter(_NAMES), concurrency=20))
+    assert client.peak == 20  # noqa: PLR2004
+    _check(results)
+
+
+@pytest.mark.asyncio
+async def test_get_metadata_many_async() -> None:
+    client = _AsyncIndexClient(0.01)
+    api = AsyncPypiIndexApi(client)  # type: ignore[arg-type,unused-ignore]
+    results = [r async for r in api.get_metadata_many(iter(_NAMES), concurrency=50)]
+    assert client.peak == 50  # noqa: PLR2004
+    _check(results)
+
+
+_WHEEL_METADATA = b"""\
+Metadata-Version: 2.1
+Name: demo
+Version: 2.0
+Summary: Test package \xe2\x80\x94 \xe6\xb5\x8b\xe8\xaf\x95
+Project-URL: Source, https://example.org/demo
+Requires-Dist: httpx
+"""
+
+
+def _wheel() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        # Large and incompressible, the way native extensions make wheels big.
+        zf.writestr("demo/_native.so", random.Random(0).randbytes(4 << 20))  # noqa: S311
+        zf.writestr("demo/_vendor/other-1.0.dist-info/METADATA", b"Name: other\n")
+        zf.writestr("demo-2.0.dist-info/METADATA", _WHEEL_METADATA)
+        zf.writestr("demo-2.0.dist-info/RECORD", b"")
+    return buffer.getvalue()
+
+
+_WHEEL = _wheel()
+
+
+class _IndexHandler(BaseHTTPRequestHandler):
+    """
+    Index with ``sidecar`` offering PEP 658 metadata, ``ranged`` serving wheels with ``Range``
+    support and ``whole`` ignoring ``Range``.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def _send(self, status: int, body: bytes, headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.sent[self.path] = self.server.sent.get(self.path, 0) + len(body)  # type: ignore[attr-defined]
+
+    def do_GET(self) -> None:
+        _, kind, name, *_ = self.path.split("/")
+        if kind == "pypi":
+            self._send(200, b"<html>No JSON</html>")
+        elif kind == "simple":
+            digest = hashlib.sha256(_WHEEL_METADATA).hexdigest()
+            metadata = f' data-core-metadata="sha256={digest}"' if name == "sidecar" else ""
+            links = [
+                f'<a href="/files/{name}/demo-1.0-py3-none-any.whl#sha256=0">1.0</a>',
+                f'<a href="/files/{name}/demo-2.0-py3-none-any.whl"{metadata}>2.0</a>',
+                f'<a href="/files/{name}/demo-2.0.tar.gz">2.0</a>',
+            ]
+            self._send(200, "<html><body>{}</body></html>".format("\n".join(links)).encode())
+        elif self.path.endswith(".metadata"):
+            self._send(200, _WHEEL_METADATA)
+        elif "Range" in self.headers and name == "ranged":
+            start, end = self._range(self.headers["Range"])
+            self._send(
+                206,
+                _WHEEL[start : end + 1],
+                {"Content-Range": f"bytes {start}-{end}/{len(_WHEEL)}"},
+            )
+        else:
+            self._send(200, _WHEEL)
+
+    @staticmethod
+    def _range(value: str) -> tuple[int, int]:
+        first, last = value.removeprefix("bytes=").split("-")
+        if not first:
+            return max(0, len(_WHEEL) - int(last)), len(_WHEEL) - 1
+        return int(first), min(int(last), len(_WHEEL) - 1)
+
+
+@pytest.fixture
+def index() -> Iterator[ThreadingHTTPServer]:
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _IndexHandler)
+    httpd.sent = {}  # type: ignore[attr-defined]
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _check_wheel_metadata(metadata: Mapping[str, object]) -> None:
+    assert metadata["name"] == "demo"
+    assert metadata["version"] == "2.0"
+    assert metadata["summary"] == "Test package — 测试"
+    assert metadata["project_urls"] == {"Source": "https://example.org/demo"}
+    assert metadata["requires_dist"] == "httpx"
+
+
+@pytest.mark.parametrize(
+    ("name", "max_sent"),
+    [
+        pytest.param("sidecar", len(_WHEEL_METADATA), id="pep658"),
+        pytest.param("ranged", 200_000, id="range"),
+        pytest.param("whole", len(_WHEEL), id="no-range"),
+    ],
+)
+def test_metadata_from_wheel(index: ThreadingHTTPServer, name: str, max_sent: int) -> None:
+    with httpx.Client() as client:
+        api = PypiIndexApi(client, base_url=f"http://127.0.0.1:{index.server_address[1]}")
+        _check_wheel_metadata(api.get_metadata(name))
+    sent = sum(v for k, v in index.sent.items() if k.startswith("/files/"))  # type: ignore[attr-defined]
+    assert sent <= max_sent
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", ["sidecar", "ranged"])
+async def test_metadata_from_wheel_async(index: ThreadingHTTPServer, name: str) -> None:
+    async with httpx.AsyncClient() as client:
+        api = AsyncPypiIndexApi(client, base_url=f"http://127.0.0.1:{index.server_address[1]}")
+        _check_wheel_metadata(await api.get_metadata(name))
+    sent = sum(v for k, v in index.sent.items() if k.startswith("/files/"))  # type: ignore[attr-defined]
+    assert sent < len(_WHEEL) // 10
+
+
+class _SimpleHandler(BaseHTTPRequestHandler):
+    """
+    PEP 691 JSON index with ETags, projects and their files are in ``server.projects``. With
+    ``server.html`` set it answers HTML pages without serials instead.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:
+        server: Any = self.server
+        server.hits.append(self.path)
+        assert "application/vnd.pypi.simple.v1+json" in self.headers["Accept"]
+        name = self.path.strip("/").split("/")[-1]
+        if server.html:
+            self._html(server, name)
+            return
+        if name == "simple":
+            serial = max(x["serial"] for x in server.projects.values())
+            page: dict[str, Any] = {
+                "meta": {"api-version": "1.1", "_last-serial": serial},
+                "projects": [
+                    {"name": x["name"], "_last-serial": x["serial"]}
+                    for x in server.projects.values()
+                ],
+            }
+        else:
+            project = server.projects[name]
+            serial = project["serial"]
+            page = {
+                "meta": {"api-version": "1.1", "_last-serial": serial},
+                "name": name,
+                "files": [{"url": f"/files/{x}", "hashes": {}} for x in project["files"]],
+            }
+        self._send(json.dumps(page).encode(), "application/vnd.pypi.simple.v1+json")
+
+    def _html(self, server: Any, name: str) -> None:  # noqa: ANN401
+        if name == "simple":
+            links = [(f"/simple/{k}/", x["name"]) for k, x in server.projects.items()]
+        else:
+            links = [(f"/files/{x}", x) for x in server.projects[name]["files"]]
+        anchors = "\n".join(f'<a href="{href}">{text}</a>' for href, text in links)
+        self._send(f"<html><body>{anchors}</body></html>".encode(), "text/html")
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        etag = f'"{hashlib.sha256(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def simple_index() -> Iterator[ThreadingHTTPServer]:
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _SimpleHandler)
+    httpd.hits = []  # type: ignore[attr-defined]
+    httpd.html = False  # type: ignore[attr-defined]
+    httpd.projects = {  # type: ignore[attr-defined]
+        "package-one": {"name": "Package_One", "serial": 10, "files": ["package_one-1.0.tar.gz"]},
+        "package-two": {"name": "package.two", "serial": 20, "files": ["package.two-2.0.tar.gz"]},
+        "three": {"name": "three", "serial": 30, "files": []},
+    }
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_mirror_incremental_sync(simple_index: Any, tmp_path: Path) -> None:  # noqa: ANN401
+    base_url = f"http://127.0.0.1:{simple_index.server_address[1]}"
+    path = str(tmp_path / "mirror.sqlite3")
+    with httpx.Client() as client, PypiMirror(PypiIndexApi(client, base_url), path) as mirror:
+        assert mirror.sync() == []
+        assert len(mirror) == 3  # noqa: PLR2004
+        assert "package-one" in mirror
+        assert "PACKAGE.TWO" in mirror
+        assert "four" not in mirror
+        assert mirror.get_all_projects() == ["Package_One", "package.two", "three"]
+
+        # File lists are fetched once, on first use.
+        assert mirror.get_versions("package_one") == ["1.0"]
+        assert mirror.get_versions("package_one") == ["1.0"]
+        assert mirror.get_distributions("package-two") == [
+            f"{base_url}/files/package.two-2.0.tar.gz"
+        ]
+        assert simple_index.hits.count("/simple/package-one/") == 1
+
+        # Nothing changed: a single 304 for the project list.
+        simple_index.hits.clear()
+        assert mirror.sync() == []
+        assert simple_index.hits == ["/simple/"]
+
+        # Only the mirrored project whose serial moved is fetched again.
+        simple_index.hits.clear()
+        one = simple_index.projects["package-one"]
+        one.update(serial=40, files=[*one["files"], "package_one-1.1-py3-none-any.whl"])
+        simple_index.projects["three"]["serial"] = 50
+        del simple_index.projects["package-two"]
+        assert mirror.sync() == ["package-one"]
+        assert simple_index.hits == ["/simple/", "/simple/package-one/"]
+        assert mirror.get_versions("package-one") == ["1.0", "1.1"]
+        assert "package-two" not in mirror
+        with pytest.raises(KeyError):
+            mirror.get_distributions("package-two")
+
+        # Renaming a project to another spelling of its name does not move its serial.
+        simple_index.projects["package-one"]["name"] = "package-one"
+        simple_index.projects["three"]["serial"] = 60
+        assert mirror.sync() == []
+        assert mirror.get_all_projects() == ["package-one", "three"]
+
+    # Lookups need no network once mirrored.
+    simple_index.hits.clear()
+    with PypiMirror(PypiIndexApi(None, base_url), path) as mirror:  # type: ignore[arg-type,unused-ignore]
+        assert mirror.get_versions("package-one") == ["1.0", "1.1"]
+    assert simple_index.hits == []
+
+
+def test_mirror_sync_html_index(simple_index: Any, tmp_path: Path) -> None:  # noqa: ANN401
+    simple_index.html = True
+    base_url = f"http://127.0.0.1:{simple_index.server_address[1]}"
+    path = str(tmp_path / "mirror.sqlite3")
+    with httpx.Client() as client, PypiMirror(PypiIndexApi(client, base_url), path) as mirror:
+        assert mirror.sync() == []
+        assert mirror.get_versions("package-one") == ["1.0"]
+
+        # The project list is unchanged, but without serials every mirrored project is checked.
+        simple_index.hits.clear()
+        one = simple_index.projects["package-one"]
+        one["files"] = [*one["files"], "package_one-1.1-py3-none-any.whl"]
+        assert mirror.sync() == ["package-one"]
+        assert simple_index.hits == ["/simple/", "/simple/package-one/"]
+        assert mirror.get_versions("package-one") == ["1.0", "1.1"]
+
+
+_ORDERED_VERSIONS = [
+    "not-a-version",
+    "0.9",
+    "1.0.dev0",
+    "1.0a1.dev3",
+    "1.0a1",
+    "1.0a2",
+    "1.0b1",
+    "1.0rc1",
+    "1.0rc2.post1",
+    "1.0",
+    "1.0+abc.5",
+    "1.0+5",
+    "1.0.post1.dev1",
+    "1.0.post1",
+    "1.0.post2",
+    "1.0.1",
+    "1.10",
+    "2.0.0.dev1",
+    "2!0.1",
+]
+
+
+def test_version_key_order() -> None:
+    shuffled = _ORDERED_VERSIONS[::-1]
+    random.Random(1).shuffle(shuffled)  # noqa: S311
+    assert sorted(shuffled, key=version_key) == _ORDERED_VERSIONS
+    assert version_key("1.0") == version_key("1.0.0") == version_key("V1.0")
+    assert version_key("1.0-0") == version_key("1.0.post0")
+    assert version_key("1.0.post0") != version_key("1.0")
+    assert version_key("1.0-RC-1") == version_key("1.0rc1")
+
+
+def test_version_key_matches_packaging() -> None:
+    version = pytest.importorskip("packaging.version")
+    rng = random.Random(2)  # noqa: S311
+    versions = [
+        "{}{}{}{}{}{}".format(
+            rng.choice(["", "", "1!"]),
+            ".".join(str(rng.randrange(3)) for _ in range(rng.randrange(1, 4))),
+            rng.choice(["", "", "a1", "b2", "rc0", ".pre3"]),
+            rng.choice(["", "", ".post1", "-2"]),
+            rng.choice(["", "", ".dev0", ".dev5"]),
+            rng.choice(["", "", "+local.7", "+7", "+ubuntu"]),
+        )
+        for _ in range(2000)
+    ]
+    assert sorted(versions, key=version_key) == sorted(versions, key=version.Version)
+
+
+def test_get_versions_sorted() -> None:
+    files = [
+        "package-1.0.tar.gz",
+        "package-1.0rc1.zip",
+        "package-1.0.post1-py3-none-any.whl",
+        "package-1.0a2-py3-none-any.whl",
+        "package-0.9.tar.gz",
+    ]
+    text = json.dumps({"files": [{"url": f"https://files.example/{x}"} for x in files]})
+    api = PypiIndexApi(None)  # type: ignore[arg-type,unused-ignore]
+    with patch.object(PypiIndexApi, "http_get", return_value=text):
+        assert api.get_versions("package") == ["0.9", "1.0a2", "1.0rc1", "1.0", "1.0.post1"]
+
+
+class _CountingClient(_IndexClient):
+    """``_IndexClient`` also serving ``/simple/<name>/``, counting the requests made."""
+
+    def __init__(self) -> None:
+        super().__init__(0)
+        self.urls: list[str] = []
+
+    def get(self, url: str, **kwargs: Any) -> _Response:  # noqa: ANN401
+        self.urls.append(url)
+        if "/simple/" in url:
+            name = url.split("/")[-2]
+            files = [{"url": f"https://files.example/{name}-{v}.tar.gz"} for v in ("1.0", "0.9")]
+            return _Response(json.dumps({"files": files}))
+        return super().get(url, **kwargs)
+
+
+def test_metadata_cache(tmp_path: Path) -> None:
+    path = str(tmp_path / "metadata.sqlite3")
+    client = _CountingClient()
+    with MetadataCache(path, ttl=60) as cache:
+        api = PypiIndexApi(client, cache=cache)  # type: ignore[arg-type,unused-ignore]
+        for _ in range(3):
+            assert api.get_metadata("Package_One") == {"name": "Package_One", "version": "1.0"}
+            assert api.get_versions("package-one") == ["0.9", "1.0"]
+        assert client.urls == [
+            "https://pypi.org/pypi/Package_One/json",
+            "https://pypi.org/simple/package-one/",
+        ]
+        # Keyed by index too.
+        other = api._replace(base_url="https://mirror.example")
+        other.get_metadata("package-one")
+        assert len(client.urls) == 3  # noqa: PLR2004
+
+    # Stale entries are fetched again, unless offline.
+    client.urls.clear()
+    with MetadataCache(path, ttl=0) as cache:
+        api = PypiIndexApi(client, cache=cache)  # type: ignore[arg-type,unused-ignore]
+        time.sleep(0.01)
+        api.get_metadata("package-one")
+        assert client.urls == ["https://pypi.org/pypi/package-one/json"]
+    client.urls.clear()
+    with MetadataCache(path, ttl=0, offline=True) as cache:
+        api = PypiIndexApi(client, cache=cache)  # type: ignore[arg-type,unused-ignore]
+        assert api.get_versions("package-one") == ["0.9", "1.0"]
+        with pytest.raises(OfflineError):
+            api.get_metadata("package-two")
+        result = next(api.get_metadata_many(["package-two"]))
+        assert isinstance(result.error, OfflineError)
+        with pytest.raises(OfflineError):
+            api.get_all_projects()
+        with pytest.raises(OfflineError):
+            api.http_get("/simple/package-two/")
+    assert client.urls == []
+
+
+def test_metadata_cache_evicts_least_recently_used() -> None:
+    with MetadataCache(":memory:", max_size=100) as cache:
+        for name in ("a", "b", "c"):
+            cache.put("https://pypi.org", "metadata", name, b"x" * 40)
+            time.sleep(0.001)
+        assert cache.get("https://pypi.org", "metadata", "a") is None
+        assert cache.get("https://pypi.org", "metadata", "b") is not None
+        time.sleep(0.001)
+        cache.put("https://pypi.org", "metadata", "d", b"x" * 40)
+        assert cache.get("https://pypi.org", "metadata", "b") is not None
+        assert cache.get("https://pypi.org", "metadata", "c") is None
+        assert cache.get("https://pypi.org", "metadata", "d") is not None
+
+
+def test_metadata_cache_shared_file_size(tmp_path: Path) -> None:
+    path = str(tmp_path / "metadata.sqlite3")
+    with MetadataCache(path, max_size=100) as first, MetadataCache(path, max_size=100) as second:
+        first.put("https://pypi.org", "metadata", "a", b"x" * 40)
+        time.sleep(0.001)
+        second.put("https://pypi.org", "metadata", "b", b"x" * 40)
+        time.sleep(0.001)
+        # Both caches count the values the other one stored.
+        first.put("https://pypi.org", "metadata", "c", b"x" * 40)
+        assert second.get("https://pypi.org", "metadata", "a") is None
+        assert second.get("https://pypi.org", "metadata", "b") is not None
+
+        # The running total follows inserts, replacements, evictions and clears.
+        second.put("https://pypi.org", "metadata", "b", b"x" * 10)
+        (total,) = first.db.execute("SELECT total FROM size").fetchone()
+        assert total == 50  # noqa: PLR2004
+        second.clear()
+        assert first.db.execute("SELECT total FROM size").fetchone() == (0,)
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_async() -> None:
+    with MetadataCache(":memory:") as cache:
+        api = AsyncPypiIndexApi(_AsyncIndexClient(0), cache=cache)  # type: ignore[arg-type,unused-ignore]
+        first = await api.get_metadata("package-one")
+        cached_only = api._replace(client=None)  # type: ignore[arg-type]
+        assert await cached_only.get_metadata("package-one") == first